@@ -0,0 +1,415 @@
+"""Attribute-aware slot allocation policies.
+
+Slots carry a zone, level, type (standard, compact, ev, accessible) and a
+walking distance to the entrance. Allocator keeps the free slots in one heap
+per (zone, level, type) queue, ordered by the policy's key, so an
+allocation is a scan over the queue tops of the requested type plus one heap
+pop: O(queues + log n), which stays in the microseconds for 50k slots.
+
+    first-free   lowest slot_id (the original behaviour)
+    nearest      shortest distance to the entrance
+    fill-level   lowest level first, nearest within it
+    balanced     least-occupied (zone, level) first, nearest within it
+
+Every policy matches the vehicle type first: a request only falls back to
+the types in FALLBACK (in order) once its own type is full, and accessible
+slots are never handed to other vehicles.
+
+Usage:
+    python allocation.py layout  --db parking.db [--journal DIR] slots.json   # assign zones/levels/types/distances
+    python allocation.py compare [--slots 50000] [--levels 5] [--hours 12]   # policy comparison
+
+slots.json is a list of ranges over Slot-N numbers:
+    [{"from": 1, "to": 40, "zone": "A", "level": 1, "type": "standard", "distance": 10, "step": 1.5},
+     {"from": 41, "to": 48, "zone": "A", "level": 1, "type": "ev", "distance": 5}]
+"""
+import argparse
+import heapq
+import json
+import math
+import os
+import random
+import sqlite3
+import sys
+import time
+
+from journal import JOURNAL_DIR, Journal
+from metrics import percentile
+
+SLOT_TYPES = ("standard", "compact", "ev", "accessible")
+# Slot types a vehicle may take, best first, once its own type is full
+FALLBACK = {
+    'standard': ('compact', 'ev'),
+    'compact': ('standard', 'ev'),
+    'ev': ('standard', 'compact'),
+    'accessible': ('standard', 'compact', 'ev'),
+}
+DEFAULT_POLICY = "first-free"
+POLICY_ENV = "PARKINUP_ALLOCATION"
+
+
+class SlotInfo:
+    __slots__ = ('slot_id', 'slot_number', 'zone', 'level', 'slot_type', 'distance', 'free')
+
+    def __init__(self, slot_id, slot_number, zone, level, slot_type, distance, free):
+        self.slot_id = slot_id
+        self.slot_number = slot_number
+        self.zone = zone
+        self.level = level
+        self.slot_type = slot_type
+        self.distance = distance
+        self.free = free
+
+
+# ---------- Policies ----------
+def _first_free_key(slot: SlotInfo):
+    return slot.slot_id
+
+
+def _nearest_key(slot: SlotInfo):
+    return slot.distance, slot.slot_id
+
+
+def _fill_level_key(slot: SlotInfo):
+    return slot.level, slot.distance, slot.slot_id
+
+
+# name -> (order within a queue, pick the least-loaded area first)
+POLICIES = {
+    'first-free': (_first_free_key, False),
+    'nearest': (_nearest_key, False),
+    'fill-level': (_fill_level_key, False),
+    'balanced': (_nearest_key, True),
+}
+
+
+class Allocator:
+    """Free slots in per-(zone, level, type) heaps ordered by a policy.
+
+    Not locked itself; ParkingService only calls it under its write lock.
+    """
+
+    def __init__(self, policy: str = DEFAULT_POLICY):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown allocation policy {policy!r}; choose from {', '.join(POLICIES)}")
+        self.policy = policy
+        self._key, self._balance = POLICIES[policy]
+        self.slots: dict[int, SlotInfo] = {}
+        # (zone, level, type) -> heap of (key, slot_id); entries of taken slots are dropped lazily
+        self._queues: dict[tuple, list] = {}
+        self._by_type: dict[str, list[tuple]] = {}
+        # (zone, level) -> [used, capacity]
+        self._areas: dict[tuple, list[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def load(self, rows):
+        """Replace the contents with (slot_id, slot_number, zone, level, slot_type, distance, is_occupied) rows."""
+        self.slots.clear()
+        self._queues.clear()
+        self._by_type.clear()
+        self._areas.clear()
+        for row in rows:
+            self._add(SlotInfo(*row[:6], free=not row[6]))
+        for heap in self._queues.values():
+            heapq.heapify(heap)
+
+    def add(self, slot_id, slot_number, zone="A", level=1, slot_type="standard", distance=0.0, occupied=False):
+        self._add(SlotInfo(slot_id, slot_number, zone, level, slot_type, distance, not occupied), push=True)
+
+    def _add(self, slot: SlotInfo, push: bool = False):
+        self.slots[slot.slot_id] = slot
+        name = (slot.zone, slot.level, slot.slot_type)
+        if name not in self._queues:
+            self._queues[name] = []
+            self._by_type.setdefault(slot.slot_type, []).append(name)
+        area = self._areas.setdefault((slot.zone, slot.level), [0, 0])
+        area[1] += 1
+        if slot.free:
+            entry = (self._key(slot), slot.slot_id)
+            if push:
+                heapq.heappush(self._queues[name], entry)
+            else:
+                self._queues[name].append(entry)
+        else:
+            area[0] += 1
+
+    # ---------- Allocation ----------
+    def _top(self, name):
+        """Best free entry of a queue, dropping stale ones, or None."""
+        heap = self._queues[name]
+        slots = self.slots
+        while heap:
+            entry = heap[0]
+            if slots[entry[1]].free:
+                return entry
+            heapq.heappop(heap)
+        return None
+
+    def _pick(self, names):
+        best_name, best_rank = None, None
+        areas = self._areas
+        for name in names:
+            top = self._top(name)
+            if top is None:
+                continue
+            if self._balance:
+                used, capacity = areas[name[0], name[1]]
+                rank = (used / capacity, top[0])
+            else:
+                rank = top[0]
+            if best_rank is None or rank < best_rank:
+                best_name, best_rank = name, rank
+        return best_name
+
+    def acquire(self, vehicle_type: str = "standard", accept=None):
+        """Take the policy's best free slot for vehicle_type. Returns its SlotInfo or None.
+
+        accept(slot_id) may veto candidates (e.g. slots held for a reservation);
+        vetoed slots stay free.
+        """
+        vetoed = []
+        try:
+            for slot_type in (vehicle_type, *FALLBACK.get(vehicle_type, ())):
+                names = self._by_type.get(slot_type)
+                while names:
+                    name = self._pick(names)
+                    if name is None:
+                        break
+                    _, slot_id = heapq.heappop(self._queues[name])
+                    if accept is None or accept(slot_id):
+                        self.take(slot_id)
+                        return self.slots[slot_id]
+                    vetoed.append((name, slot_id))
+                    # Hide the vetoed slot from this search
+                    self.slots[slot_id].free = False
+        finally:
+            for name, slot_id in vetoed:
+                slot = self.slots[slot_id]
+                slot.free = True
+                heapq.heappush(self._queues[name], (self._key(slot), slot_id))
+        return None
+
+    def take(self, slot_id: int) -> bool:
+        """Mark slot_id occupied (allocated here or elsewhere). False if it already was."""
+        slot = self.slots.get(slot_id)
+        if slot is None or not slot.free:
+            return False
+        slot.free = False
+        self._areas[slot.zone, slot.level][0] += 1
+        return True
+
+    def release(self, slot_id: int) -> bool:
+        """Return slot_id to its queue. False if it was already free or unknown."""
+        slot = self.slots.get(slot_id)
+        if slot is None or slot.free:
+            return False
+        slot.free = True
+        self._areas[slot.zone, slot.level][0] -= 1
+        heapq.heappush(self._queues[(slot.zone, slot.level, slot.slot_type)], (self._key(slot), slot_id))
+        return True
+
+    def is_free(self, slot_id: int) -> bool:
+        slot = self.slots.get(slot_id)
+        return slot is not None and slot.free
+
+    def area_stats(self) -> dict:
+        """'zone/Lnn' -> {'used', 'capacity'} per area."""
+        return {f"{zone}/L{level}": {'used': used, 'capacity': capacity}
+                for (zone, level), (used, capacity) in sorted(self._areas.items())}
+
+
+def policy_from_env() -> str:
+    """Policy named by PARKINUP_ALLOCATION, or the default."""
+    policy = os.environ.get(POLICY_ENV, "").strip() or DEFAULT_POLICY
+    if policy not in POLICIES:
+        raise ValueError(f"{POLICY_ENV}={policy!r} is not one of {', '.join(POLICIES)}")
+    return policy
+
+
+# ---------- Layout ----------
+def load_layout(path: str) -> list[dict]:
+    with open(path, encoding='utf-8') as f:
+        layout = json.load(f)
+    if not isinstance(layout, list):
+        raise ValueError("layout must be a JSON list of slot ranges")
+    for entry in layout:
+        if entry.get('type', 'standard') not in SLOT_TYPES:
+            raise ValueError(f"unknown slot type {entry.get('type')!r}; choose from {', '.join(SLOT_TYPES)}")
+    return layout
+
+
+def apply_layout(db_path: str, layout: list[dict], journal=None) -> int:
+    """Write zone/level/type/distance for each Slot-N range in layout. Returns slots updated.
+
+    With a journal.Journal, each updated slot is journaled so replay keeps the layout.
+    """
+    updates = []
+    for entry in layout:
+        distance, step = float(entry.get('distance', 0)), float(entry.get('step', 0))
+        for i, n in enumerate(range(int(entry['from']), int(entry['to']) + 1)):
+            updates.append((entry.get('zone', 'A'), int(entry.get('level', 1)), entry.get('type', 'standard'),
+                            round(distance + i * step, 2), f"Slot-{n}"))
+    conn = sqlite3.connect(db_path)
+    try:
+        cur = conn.cursor()
+        cur.executemany("UPDATE slots SET zone=?, level=?, slot_type=?, distance=? WHERE slot_number=?", updates)
+        conn.commit()
+        if journal is not None:
+            numbers = {u[-1] for u in updates}
+            for slot_id, slot_number, zone, level, slot_type, distance in conn.execute(
+                    "SELECT slot_id, slot_number, zone, level, slot_type, distance FROM slots ORDER BY slot_id"):
+                if slot_number in numbers:
+                    journal.append("slot", slot_id=slot_id, slot_number=slot_number, zone=zone, level=level,
+                                   slot_type=slot_type, distance=distance)
+        return cur.rowcount
+    finally:
+        conn.close()
+
+
+# ---------- Policy comparison ----------
+def synthetic_layout(slots: int, levels: int, zones: int, ev_share: float, accessible_share: float,
+                     seed: int) -> list[tuple]:
+    """Slot rows for a multi-level garage: each level split into zones, special bays nearest the lifts."""
+    rng = random.Random(seed)
+    rows = []
+    per_area = max(1, slots // (levels * zones))
+    slot_id = 0
+    for level in range(1, levels + 1):
+        for z in range(zones):
+            zone = chr(ord('A') + z)
+            n_accessible = round(per_area * accessible_share)
+            n_ev = round(per_area * ev_share)
+            for i in range(per_area):
+                slot_id += 1
+                slot_type = "accessible" if i < n_accessible else "ev" if i < n_accessible + n_ev else "standard"
+                # Ramps make each level ~40 m further, each zone ~25 m; bays spread 60 m deep
+                distance = round((level - 1) * 40 + z * 25 + 60 * i / per_area + rng.random(), 2)
+                rows.append((slot_id, f"Slot-{slot_id}", zone, level, slot_type, distance, 0))
+    return rows
+
+
+def synthetic_traffic(rng: random.Random, slots: int, hours: float, dwell_mean_min: float, target: float,
+                      ev_share: float, accessible_share: float) -> list[tuple]:
+    """(time_s, kind, car_id, vehicle_type) events with arrivals sized to keep about `target` of the lot busy."""
+    rate = slots * target / (dwell_mean_min * 60.0)  # arrivals per second (Little's law)
+    sigma = 0.8
+    mu = math.log(dwell_mean_min * 60.0) - sigma * sigma / 2
+    events, t, car = [], 0.0, 0
+    while True:
+        t += rng.expovariate(rate)
+        if t >= hours * 3600:
+            break
+        r = rng.random()
+        vehicle_type = "accessible" if r < accessible_share else "ev" if r < accessible_share + ev_share else "standard"
+        events.append((t, 1, car, vehicle_type))
+        events.append((t + rng.lognormvariate(mu, sigma), 0, car, vehicle_type))
+        car += 1
+    # Exits (kind 0) sort before arrivals in the same instant
+    events.sort()
+    return events
+
+
+def run_policy(policy: str, rows: list[tuple], events: list[tuple]) -> dict:
+    allocator = Allocator(policy)
+    allocator.load(rows)
+    parked: dict[int, SlotInfo] = {}
+    served = rejected = mismatched = 0
+    walked = 0.0
+    costs = []
+    spread_sum, spread_n = 0.0, 0
+    levels = sorted({row[3] for row in rows})
+    level_capacity = {level: sum(1 for row in rows if row[3] == level) for level in levels}
+    level_used = dict.fromkeys(levels, 0)
+    for i, (_, kind, car, vehicle_type) in enumerate(events):
+        if kind == 0:
+            slot = parked.pop(car, None)
+            if slot is not None:
+                allocator.release(slot.slot_id)
+                level_used[slot.level] -= 1
+            continue
+        start = time.perf_counter()
+        slot = allocator.acquire(vehicle_type)
+        costs.append(time.perf_counter() - start)
+        if slot is None:
+            rejected += 1
+            continue
+        served += 1
+        parked[car] = slot
+        walked += slot.distance
+        mismatched += slot.slot_type != vehicle_type
+        level_used[slot.level] += 1
+        if i % 64 == 0:
+            ratios = [level_used[level] / level_capacity[level] for level in levels]
+            spread_sum += max(ratios) - min(ratios)
+            spread_n += 1
+    costs.sort()
+    return {
+        'policy': policy,
+        'served': served,
+        'rejected': rejected,
+        'type_mismatches': mismatched,
+        'mean_distance_m': round(walked / served, 1) if served else 0.0,
+        'mean_level_spread': round(spread_sum / spread_n, 3) if spread_n else 0.0,
+        'alloc_mean_us': round(sum(costs) / len(costs) * 1e6, 2) if costs else 0.0,
+        'alloc_p99_us': round(percentile(costs, 99) * 1e6, 2) if costs else 0.0,
+    }
+
+
+def compare(args) -> list[dict]:
+    rows = synthetic_layout(args.slots, args.levels, args.zones, args.ev_share, args.accessible_share, args.seed)
+    events = synthetic_traffic(random.Random(args.seed), len(rows), args.hours, args.dwell_mean, args.target,
+                               args.ev_share, args.accessible_share)
+    return [run_policy(policy, rows, events) for policy in args.policies.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ParkinUP slot allocation tools.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    lay = sub.add_parser("layout", help="assign zone/level/type/distance to slots from a JSON file")
+    lay.add_argument("file")
+    lay.add_argument("--db", required=True)
+    lay.add_argument("--journal", metavar="DIR", default=JOURNAL_DIR if os.path.isdir(JOURNAL_DIR) else None,
+                     help="journal the new layout here (default: the GUI's journal, if there is one)")
+    cmp_ = sub.add_parser("compare", help="compare allocation policies on synthetic traffic")
+    cmp_.add_argument("--policies", default=",".join(POLICIES))
+    cmp_.add_argument("--slots", type=int, default=50000)
+    cmp_.add_argument("--levels", type=int, default=5)
+    cmp_.add_argument("--zones", type=int, default=4, help="zones per level")
+    cmp_.add_argument("--hours", type=float, default=12.0)
+    cmp_.add_argument("--dwell-mean", type=float, default=120.0, help="mean stay in minutes")
+    cmp_.add_argument("--target", type=float, default=0.9, help="average share of the lot in use")
+    cmp_.add_argument("--ev-share", type=float, default=0.08)
+    cmp_.add_argument("--accessible-share", type=float, default=0.03)
+    cmp_.add_argument("--seed", type=int, default=1)
+    cmp_.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.command == "layout":
+        journal = Journal(args.journal) if args.journal else None
+        try:
+            updated = apply_layout(args.db, load_layout(args.file), journal)
+        finally:
+            if journal is not None:
+                journal.close()
+        print(f"Updated {updated} slots")
+        return 0
+    for policy in args.policies.split(","):
+        if policy not in POLICIES:
+            parser.error(f"unknown policy {policy!r}; choose from {', '.join(POLICIES)}")
+    results = compare(args)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    print(f"{'policy':<12}{'served':>9}{'rejected':>10}{'mismatch':>10}{'distance m':>12}"
+          f"{'level spread':>14}{'mean us':>9}{'p99 us':>9}")
+    for r in results:
+        print(f"{r['policy']:<12}{r['served']:>9}{r['rejected']:>10}{r['type_mismatches']:>10}"
+              f"{r['mean_distance_m']:>12.1f}{r['mean_level_spread']:>14.3f}{r['alloc_mean_us']:>9.2f}"
+              f"{r['alloc_p99_us']:>9.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+"""Occupancy, dwell, turnover and revenue analytics over any date range.
+
+    from analytics import compute
+    report = compute("parking.db", "2025-01-01 00:00:00", "2025-02-01 00:00:00", bucket="hour")
+    report.summary          # totals, averages and the peak
+    report.rows()           # one dict per time bucket
+    report.slot_rows()      # per-slot sessions, occupied hours, utilization, turnover
+
+Sessions and payments are loaded once into NumPy epoch-second arrays and
+every statistic is vectorized:
+  * occupied seconds per bucket come from the integral of the occupancy
+    step function, evaluated at the bucket edges with searchsorted over the
+    sorted entry and exit times (O((n + buckets) log n), no per-car loop);
+  * peak occupancy per bucket is a sweep line: occupancy after every entry or
+    exit inside the range, reduced per bucket with np.maximum.reduceat;
+  * arrivals, departures, dwell and revenue per bucket are weighted bincounts.
+
+Open sessions count as parked until the report end or now, whichever comes
+first. A year with a million sessions takes a couple of seconds, most of it
+spent fetching rows from SQLite.
+
+Usage:
+    python analytics.py --db parking.db --from 2025-01-01 --to 2026-01-01 [--bucket hour|day|15]
+                        [--csv buckets.csv] [--slots-csv slots.csv]
+"""
+import argparse
+import csv
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from clock import get_clock
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+BUCKETS = {'hour': 3600, 'day': 86400}
+BUCKET_FIELDS = ['bucket_start', 'arrivals', 'departures', 'avg_occupancy', 'peak_occupancy',
+                 'occupancy_pct', 'avg_dwell_min', 'revenue']
+SLOT_FIELDS = ['slot_number', 'sessions', 'occupied_hours', 'utilization_pct', 'turnover_per_day']
+
+
+def _epoch(value: str) -> int:
+    return int(np.datetime64(value.replace(" ", "T"), 's').astype(np.int64))
+
+
+def _to_epochs(strings) -> np.ndarray:
+    """Timestamp strings (None allowed) to int64 epoch seconds; None becomes -1."""
+    arr = np.array(strings, dtype='datetime64[s]')
+    out = arr.astype(np.int64)
+    out[np.isnat(arr)] = -1
+    return out
+
+
+def _stamp(epoch: int) -> str:
+    return str(np.datetime64(int(epoch), 's')).replace("T", " ")
+
+
+def bucket_seconds(bucket) -> int:
+    """'hour', 'day' or a number of minutes."""
+    if isinstance(bucket, str) and bucket in BUCKETS:
+        return BUCKETS[bucket]
+    minutes = int(bucket)
+    if minutes <= 0:
+        raise ValueError("bucket must be 'hour', 'day' or a positive number of minutes")
+    return minutes * 60
+
+
+# ---------- Loading ----------
+def load_sessions(conn, start: str, end: str):
+    """(entry, exit, slot_id) arrays for sessions overlapping [start, end); open exits are -1."""
+    rows = conn.execute(
+        "SELECT entry_time, exit_time, slot_id FROM vehicles "
+        "WHERE entry_time < ? AND (exit_time IS NULL OR exit_time >= ?)", (end, start)).fetchall()
+    if not rows:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty.copy(), empty.copy()
+    # Column comprehensions are several times faster than zip(*rows) on a million rows
+    return (_to_epochs([r[0] for r in rows]), _to_epochs([r[1] for r in rows]),
+            np.fromiter((-1 if r[2] is None else r[2] for r in rows), dtype=np.int64, count=len(rows)))
+
+
+def load_payments(conn, start: str, end: str):
+    rows = conn.execute("SELECT payment_time, amount FROM payments WHERE payment_time >= ? AND payment_time < ?",
+                        (start, end)).fetchall()
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    return (_to_epochs([r[0] for r in rows]),
+            np.fromiter((r[1] for r in rows), dtype=np.float64, count=len(rows)))
+
+
+# ---------- Report ----------
+class Report:
+    """Per-bucket arrays plus summary; rows()/slot_rows() give CSV-ready dicts."""
+
+    def __init__(self, start: int, end: int, bucket_s: int, capacity: int):
+        self.start = start
+        self.end = end
+        self.bucket_s = bucket_s
+        self.capacity = capacity
+        self.edges = np.arange(start, end, bucket_s, dtype=np.int64)
+        self.edges = np.append(self.edges, end)
+        n = len(self.edges) - 1
+        self.arrivals = np.zeros(n, dtype=np.int64)
+        self.departures = np.zeros(n, dtype=np.int64)
+        self.avg_occupancy = np.zeros(n)
+        self.peak_occupancy = np.zeros(n, dtype=np.int64)
+        self.avg_dwell_min = np.zeros(n)
+        self.revenue = np.zeros(n)
+        self.slots: list[dict] = []
+        self.summary: dict = {}
+
+    def rows(self):
+        pct = self.avg_occupancy / self.capacity * 100.0 if self.capacity else np.zeros_like(self.avg_occupancy)
+        for i in range(len(self.edges) - 1):
+            yield {
+                'bucket_start': _stamp(self.edges[i]),
+                'arrivals': int(self.arrivals[i]),
+                'departures': int(self.departures[i]),
+                'avg_occupancy': round(float(self.avg_occupancy[i]), 2),
+                'peak_occupancy': int(self.peak_occupancy[i]),
+                'occupancy_pct': round(float(pct[i]), 1),
+                'avg_dwell_min': round(float(self.avg_dwell_min[i]), 1),
+                'revenue': round(float(self.revenue[i]), 2),
+            }
+
+    def slot_rows(self):
+        return list(self.slots)
+
+    def hour_of_day_profile(self) -> list[float] | None:
+        """Mean occupancy for each hour of the day, when buckets divide an hour evenly."""
+        if 3600 % self.bucket_s:
+            return None
+        hours = (self.edges[:-1] // 3600) % 24
+        totals = np.bincount(hours, weights=self.avg_occupancy, minlength=24)
+        counts = np.bincount(hours, minlength=24)
+        return [round(float(t / c), 2) if c else 0.0 for t, c in zip(totals, counts)]
+
+
+def _occupied_seconds_until(t: np.ndarray, entry_sorted, exit_sorted, entry_cum, exit_cum) -> np.ndarray:
+    """Integral of occupancy from -inf to each t: sum over sessions of clip(t - entry, 0, stay)."""
+    ce = np.searchsorted(entry_sorted, t, side='left')
+    cx = np.searchsorted(exit_sorted, t, side='left')
+    se = np.where(ce > 0, entry_cum[ce - 1], 0)
+    sx = np.where(cx > 0, exit_cum[cx - 1], 0)
+    return (t * ce - se) - (t * cx - sx)
+
+
+def compute(db_path: str, start: str, end: str, bucket="hour", now: datetime | None = None) -> Report:
+    began = time.perf_counter()
+    bucket_s = bucket_seconds(bucket)
+    conn = sqlite3.connect(db_path)
+    try:
+        entry, exit_, slot_id = load_sessions(conn, start, end)
+        pay_t, pay_amount = load_payments(conn, start, end)
+        slot_names = dict(conn.execute("SELECT slot_id, slot_number FROM slots"))
+    finally:
+        conn.close()
+    loaded = time.perf_counter()
+
+    t0, t1 = _epoch(start), _epoch(end)
+    report = Report(t0, t1, bucket_s, len(slot_names))
+    nb = len(report.edges) - 1
+    now_s = _epoch((now or get_clock().now()).strftime(TIME_FORMAT))
+    is_open = exit_ < 0
+    # Open sessions are parked up to now (or the end of the range, if earlier)
+    exit_eff = np.where(is_open, max(min(now_s, t1), t0), exit_)
+    exit_eff = np.maximum(exit_eff, entry)
+
+    # Occupied seconds per bucket from the occupancy integral at the edges
+    entry_sorted = np.sort(entry)
+    exit_sorted = np.sort(exit_eff)
+    entry_cum = np.cumsum(entry_sorted)
+    exit_cum = np.cumsum(exit_sorted)
+    integral = _occupied_seconds_until(report.edges, entry_sorted, exit_sorted, entry_cum, exit_cum)
+    widths = np.diff(report.edges)
+    report.avg_occupancy = np.diff(integral) / widths
+
+    # Sweep line for peaks: occupancy at each bucket start and after each event inside it
+    level_at_edges = (np.searchsorted(entry_sorted, report.edges[:-1], side='right')
+                      - np.searchsorted(exit_sorted, report.edges[:-1], side='right'))
+    events = np.concatenate([entry_sorted[(entry_sorted >= t0) & (entry_sorted < t1)],
+                             exit_sorted[(exit_sorted >= t0) & (exit_sorted < t1)]])
+    events.sort()
+    peak = level_at_edges.copy()
+    if len(events):
+        occ_after = (np.searchsorted(entry_sorted, events, side='right')
+                     - np.searchsorted(exit_sorted, events, side='right'))
+        starts = np.searchsorted(events, report.edges[:-1], side='left')
+        has_events = np.diff(np.append(starts, len(events))) > 0
+        # A trailing sentinel keeps every start a valid reduceat index
+        seg_max = np.maximum.reduceat(np.append(occ_after, np.iinfo(np.int64).min), starts)
+        peak = np.where(has_events, np.maximum(peak, seg_max), peak)
+    report.peak_occupancy = peak
+
+    # Arrivals, departures and dwell by bucket
+    arrived = (entry >= t0) & (entry < t1)
+    report.arrivals = np.bincount((entry[arrived] - t0) // bucket_s, minlength=nb)[:nb]
+    departed = ~is_open & (exit_ >= t0) & (exit_ < t1)
+    dep_idx = (exit_[departed] - t0) // bucket_s
+    report.departures = np.bincount(dep_idx, minlength=nb)[:nb]
+    dwell_min = (exit_[departed] - entry[departed]) / 60.0
+    dwell_sum = np.bincount(dep_idx, weights=dwell_min, minlength=nb)[:nb]
+    report.avg_dwell_min = np.divide(dwell_sum, report.departures, out=np.zeros(nb),
+                                     where=report.departures > 0)
+
+    # Revenue by payment time
+    report.revenue = np.bincount((pay_t - t0) // bucket_s, weights=pay_amount, minlength=nb)[:nb]
+
+    # Per slot: sessions started in range, occupied time clipped to range
+    days = (t1 - t0) / 86400.0
+    overlap = np.clip(np.minimum(exit_eff, t1) - np.maximum(entry, t0), 0, None)
+    ids = np.array(sorted(slot_names), dtype=np.int64)
+    if len(ids):
+        pos = np.searchsorted(ids, slot_id)
+        known = (pos < len(ids)) & (ids[np.minimum(pos, len(ids) - 1)] == slot_id)
+        sessions = np.bincount(pos[known & arrived], minlength=len(ids))
+        occupied = np.bincount(pos[known], weights=overlap[known], minlength=len(ids))
+        span = float(t1 - t0)
+        report.slots = [{
+            'slot_number': slot_names[int(sid)],
+            'sessions': int(sessions[i]),
+            'occupied_hours': round(float(occupied[i]) / 3600.0, 1),
+            'utilization_pct': round(float(occupied[i]) / span * 100.0, 1) if span else 0.0,
+            'turnover_per_day': round(float(sessions[i]) / days, 2) if days else 0.0,
+        } for i, sid in enumerate(ids)]
+
+    peak_idx = int(np.argmax(report.peak_occupancy)) if nb else 0
+    profile = report.hour_of_day_profile()
+    report.summary = {
+        'from': _stamp(t0),
+        'to': _stamp(t1),
+        'bucket_s': bucket_s,
+        'capacity': report.capacity,
+        'sessions': int(len(entry)),
+        'arrivals': int(report.arrivals.sum()),
+        'departures': int(report.departures.sum()),
+        'avg_occupancy': round(float(integral[-1] - integral[0]) / (t1 - t0), 2) if t1 > t0 else 0.0,
+        'peak_occupancy': int(report.peak_occupancy[peak_idx]) if nb else 0,
+        'peak_at': _stamp(report.edges[peak_idx]) if nb else None,
+        'avg_dwell_min': round(float(dwell_min.mean()), 1) if len(dwell_min) else 0.0,
+        'median_dwell_min': round(float(np.median(dwell_min)), 1) if len(dwell_min) else 0.0,
+        'revenue': round(float(pay_amount.sum()), 2),
+        'turnover_per_slot_day': round(float(report.arrivals.sum()) / report.capacity / days, 2)
+                                 if report.capacity and days else 0.0,
+        'busiest_hour': int(np.argmax(profile)) if profile else None,
+        'load_s': round(loaded - began, 3),
+        'compute_s': round(time.perf_counter() - loaded, 3),
+    }
+    return report
+
+
+def write_csv(path: str, rows, fields):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def _day(value: str) -> str:
+    try:
+        return datetime.strptime(value, TIME_FORMAT).strftime(TIME_FORMAT)
+    except ValueError:
+        return datetime.strptime(value, "%Y-%m-%d").strftime(TIME_FORMAT)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Occupancy and revenue analytics for a date range.")
+    parser.add_argument("--db", required=True)
+    parser.add_argument("--from", dest="start", required=True, help="YYYY-MM-DD or full timestamp")
+    parser.add_argument("--to", dest="end", help="end (exclusive); default: --from plus 7 days")
+    parser.add_argument("--bucket", default="hour", help="hour, day or minutes per bucket")
+    parser.add_argument("--csv", help="write per-bucket rows here")
+    parser.add_argument("--slots-csv", help="write per-slot rows here")
+    args = parser.parse_args(argv)
+
+    start = _day(args.start)
+    end = _day(args.end) if args.end else (datetime.strptime(start, TIME_FORMAT) + timedelta(days=7)).strftime(TIME_FORMAT)
+    report = compute(args.db, start, end, args.bucket)
+    for key, value in report.summary.items():
+        print(f"{key:<24}{value}")
+    if args.csv:
+        write_csv(args.csv, report.rows(), BUCKET_FIELDS)
+        print(f"Buckets written to {args.csv}")
+    if args.slots_csv:
+        write_csv(args.slots_csv, report.slot_rows(), SLOT_FIELDS)
+        print(f"Slots written to {args.slots_csv}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
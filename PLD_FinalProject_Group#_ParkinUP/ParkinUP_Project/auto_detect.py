@@ -0,0 +1,118 @@
+"""Motion-gated plate auto-detection for the live camera feed.
+
+Running OCR on every preview frame would cost one tesseract call per 30 ms.
+Instead each frame goes through a cheap motion check on a tiny grayscale
+copy; only once a vehicle has arrived and the scene has settled again is a
+short burst of frames handed to the (expensive) ROI + OCR stage. OCR work
+therefore scales with the number of vehicles, not with the frame rate.
+"""
+import time
+
+from optional_libs import is_installed, load
+
+# OpenCV is imported on the first frame, not at startup
+AUTO_DETECT_AVAILABLE: bool = is_installed("cv2")
+
+# Motion check runs on a DIFF_WIDTH-wide grayscale copy of the frame
+DIFF_WIDTH = 160
+# Per-pixel intensity change that counts as "changed"
+PIXEL_THRESHOLD = 25
+
+IDLE = "idle"
+MOVING = "moving"
+SETTLING = "settling"
+COOLDOWN = "cooldown"
+
+
+class MotionGate:
+    """Decide which camera frames are worth OCR'ing.
+
+    States: idle -> moving (vehicle arriving) -> settling (scene quiet for
+    `settle_frames` frames) -> a burst of `burst_frames` frames is returned
+    from feed() -> cooldown for `cooldown_s` seconds -> idle.
+    """
+
+    def __init__(self, motion_ratio: float = 0.01, settle_frames: int = 8,
+                 burst_frames: int = 3, cooldown_s: float = 3.0):
+        self.motion_ratio = motion_ratio
+        self.settle_frames = settle_frames
+        self.burst_frames = burst_frames
+        self.cooldown_s = cooldown_s
+        self.state = IDLE
+        self._prev = None
+        self._quiet = 0
+        self._burst = []
+        self._cooldown_until = 0.0
+        # Statistics
+        self.frames_seen = 0
+        self.motion_events = 0
+        self.bursts_emitted = 0
+
+    def reset(self):
+        self.state = IDLE
+        self._prev = None
+        self._quiet = 0
+        self._burst = []
+
+    def motion_level(self, frame) -> float:
+        """Return the fraction of pixels that changed since the previous frame."""
+        cv2 = load("cv2")
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (DIFF_WIDTH, max(1, int(h * DIFF_WIDTH / w))),
+                           interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        small = cv2.GaussianBlur(small, (5, 5), 0)
+        prev, self._prev = self._prev, small
+        if prev is None:
+            return 0.0
+        diff = cv2.absdiff(prev, small)
+        _, changed = cv2.threshold(diff, PIXEL_THRESHOLD, 255, cv2.THRESH_BINARY)
+        return cv2.countNonZero(changed) / float(changed.size)
+
+    def feed(self, frame, now: float | None = None):
+        """Feed one frame. Returns a list of frames to OCR once a vehicle has
+        arrived and settled, otherwise None."""
+        if frame is None or load("cv2") is None:
+            return None
+        now = time.monotonic() if now is None else now
+        self.frames_seen += 1
+        moving = self.motion_level(frame) >= self.motion_ratio
+
+        if self.state == COOLDOWN:
+            if now < self._cooldown_until:
+                return None
+            self.state = IDLE
+        if self.state == IDLE:
+            if moving:
+                self.state = MOVING
+                self.motion_events += 1
+            return None
+        if moving:
+            # Still (or again) moving: restart the settle count and drop partial bursts
+            self.state = MOVING
+            self._quiet = 0
+            self._burst = []
+            return None
+        self._quiet += 1
+        if self._quiet < self.settle_frames:
+            self.state = SETTLING
+            return None
+        self._burst.append(frame.copy())
+        if len(self._burst) < self.burst_frames:
+            return None
+        burst, self._burst = self._burst, []
+        self._quiet = 0
+        self.state = COOLDOWN
+        self._cooldown_until = now + self.cooldown_s
+        self.bursts_emitted += 1
+        return burst
+
+    def stats(self) -> dict:
+        return {
+            'state': self.state,
+            'frames_seen': self.frames_seen,
+            'motion_events': self.motion_events,
+            'bursts_emitted': self.bursts_emitted,
+            'ocr_frames': self.bursts_emitted * self.burst_frames,
+        }
@@ -0,0 +1,458 @@
+"""Benchmark suite for the gate hot paths, with regression checks.
+
+Usage:
+    python bench_hotpaths.py [--out results.json] [--filter park] [--quick]
+                             [--sessions 50,1000,10000] [--payments 1000000]
+                             [--seed 7] [--repeat 7] [--cache-dir DIR]
+    python bench_hotpaths.py --save-baseline bench_baseline.json
+    python bench_hotpaths.py --compare bench_baseline.json [--threshold 0.25]   # 0.5 with --quick
+
+Benchmarks run against seeded synthetic databases (cached in --cache-dir so
+the 1M-row payments table is only built once per seed and size) and write
+machine-readable JSON: per benchmark the median, min and p95 time per call in
+microseconds. --compare reruns the suite and flags every benchmark whose
+min (its fastest round, the least disturbed by other load on the machine)
+is more than --threshold slower than the stored baseline; the exit code is
+1 if anything regressed.
+
+Covered: calculate_fee, park on a nearly full lot, park and exit
+transactions, park / conflict check / earliest window with 100k future
+reservations, park with a request ID and a replayed exit with 100k
+remembered request IDs, allocator acquire/release per policy on 50k slots, the
+dashboard table refresh (query + row formatting) at each
+--sessions size, occupancy counts, payments total, and the ocr_stub /
+parse_plate_from_filename paths.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from allocation import POLICIES, Allocator, synthetic_layout
+from clock import VirtualClock
+from metrics import percentile
+from parking_service import TIME_FORMAT, ParkingService
+from utils import active_session_rows, calculate_fee, init_db, ocr_stub, parse_plate_from_filename
+
+DEFAULT_CACHE = os.path.join(tempfile.gettempdir(), "parkinup_bench")
+BASE_TIME = datetime(2025, 1, 6, 8, 0, 0)
+# Seconds a timing round should last before it is trusted
+MIN_ROUND_S = 0.1
+
+
+# ---------- Synthetic databases ----------
+def build_db(path: str, slots: int, active: int, payments: int, seed: int):
+    """Create a ParkinUP database with `active` parked cars and `payments` paid sessions."""
+    rng = random.Random(seed)
+    init_db(path, total_slots=0)
+    conn = sqlite3.connect(path)
+    try:
+        cur = conn.cursor()
+        cur.executemany("INSERT INTO slots (slot_number, is_occupied) VALUES (?, 0)",
+                        ((f"Slot-{i}",) for i in range(1, slots + 1)))
+        occupied = rng.sample(range(1, slots + 1), active)
+
+        def history():
+            for i in range(payments):
+                entry = BASE_TIME - timedelta(minutes=rng.randrange(60, 60 * 24 * 365))
+                exit_ = entry + timedelta(minutes=rng.randrange(5, 600))
+                yield ("Bench", f"H{i:07d}", rng.randrange(1, slots + 1),
+                       entry.strftime(TIME_FORMAT), exit_.strftime(TIME_FORMAT))
+
+        cur.executemany("INSERT INTO vehicles (owner_name, vehicle_number, slot_id, entry_time, exit_time) "
+                        "VALUES (?,?,?,?,?)", history())
+        cur.execute("INSERT INTO payments (vehicle_id, amount, payment_time) "
+                    "SELECT vehicle_id, ROUND((julianday(exit_time) - julianday(entry_time)) * 1440 / 6.0, 2), "
+                    "exit_time FROM vehicles")
+        cur.executemany("INSERT INTO vehicles (owner_name, vehicle_number, slot_id, entry_time) VALUES (?,?,?,?)",
+                        (("Bench", f"A{i:07d}", slot_id,
+                          (BASE_TIME - timedelta(minutes=rng.randrange(1, 600))).strftime(TIME_FORMAT))
+                         for i, slot_id in enumerate(occupied)))
+        cur.executemany("UPDATE slots SET is_occupied=1 WHERE slot_id=?", ((s,) for s in occupied))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def add_reservations(path: str, count: int, seed: int):
+    """Book `count` future reservations spread over every slot, back to back with random gaps."""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    try:
+        slot_ids = [row[0] for row in conn.execute("SELECT slot_id FROM slots ORDER BY slot_id")]
+        rows = []
+        for n, slot_id in enumerate(slot_ids):
+            t = BASE_TIME + timedelta(minutes=rng.randrange(60, 600))
+            for _ in range(count // len(slot_ids) + (n < count % len(slot_ids))):
+                t += timedelta(minutes=rng.randrange(30, 600))
+                end = t + timedelta(minutes=rng.randrange(30, 240))
+                rows.append((slot_id, f"R{len(rows):07d}", t.strftime(TIME_FORMAT), end.strftime(TIME_FORMAT)))
+                t = end
+        conn.executemany("INSERT INTO reservations (slot_id, plate, start_time, end_time) VALUES (?,?,?,?)", rows)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def add_request_log(path: str, count: int):
+    """Remember `count` earlier exit request IDs, all still within the TTL."""
+    created = int((BASE_TIME - datetime(1970, 1, 1)).total_seconds())
+    conn = sqlite3.connect(path)
+    try:
+        conn.executemany("INSERT INTO request_log (request_id, operation, plate, result, created) "
+                         "VALUES (?, 'exit', ?, '{}', ?)",
+                         ((f"req-{i:08d}", f"Q{i:07d}", created - i % 3600) for i in range(count)))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def cached_db(cache_dir: str, workdir: str, slots: int, active: int, payments: int, seed: int) -> str:
+    """Path to a private copy of the synthetic DB, building the cached original if needed."""
+    os.makedirs(cache_dir, exist_ok=True)
+    name = f"bench_s{slots}_a{active}_p{payments}_seed{seed}.db"
+    cached = os.path.join(cache_dir, name)
+    if not os.path.exists(cached):
+        tmp = cached + ".building"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        build_db(tmp, slots, active, payments, seed)
+        os.replace(tmp, cached)
+    path = os.path.join(workdir, name)
+    shutil.copyfile(cached, path)
+    # Bring caches built before a schema migration up to date
+    init_db(path, total_slots=0)
+    return path
+
+
+# ---------- Timing ----------
+def self_timed(fn):
+    """Mark fn as returning its own measured seconds (to leave setup steps untimed)."""
+    fn.self_timed = True
+    return fn
+
+
+def measure(fn, repeat: int) -> dict:
+    """Time fn() per call, or sum what a @self_timed fn reports."""
+    own_timing = getattr(fn, 'self_timed', False)
+    fn()  # warm up caches and connections
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        if time.perf_counter() - start >= MIN_ROUND_S or number >= 1 << 16:
+            break
+        number *= 4
+    per_call = []
+    for _ in range(repeat):
+        timed = 0.0
+        start = time.perf_counter()
+        for _ in range(number):
+            result = fn()
+            if own_timing:
+                timed += result
+        wall = time.perf_counter() - start
+        per_call.append((timed if own_timing else wall) / number * 1e6)
+    per_call.sort()
+    return {'median_us': round(statistics.median(per_call), 3), 'min_us': round(per_call[0], 3),
+            'p95_us': round(percentile(per_call, 95), 3), 'calls': number * repeat}
+
+
+# ---------- Benchmarks ----------
+def bench_calculate_fee(ctx):
+    return lambda: calculate_fee("2025-01-06 08:00:00", "2025-01-06 10:37:00", rate_per_min=10 / 60)
+
+
+def bench_parse_plate_from_filename(ctx):
+    return lambda: parse_plate_from_filename("/captures/gate1/ABC-1234_20250106_0815.jpg")
+
+
+def bench_ocr_stub(ctx):
+    """ocr_stub on a synthetic 1280x720 frame (filename fallback when tesseract is absent)."""
+    path = os.path.join(ctx['workdir'], "ABC1234_0001.png")
+    try:
+        import bench_plate_locator
+        from plate_locator import cv2
+        frame, _ = bench_plate_locator.make_frame(random.Random(ctx['seed']), "ABC1234")
+        cv2.imwrite(path, frame)
+    except Exception:
+        pass
+    return lambda: ocr_stub(path)
+
+
+def _service(ctx, slots, active, payments=0):
+    path = cached_db(ctx['cache_dir'], ctx['workdir'], slots, active, payments, ctx['seed'])
+    return ParkingService(path, clock=VirtualClock(BASE_TIME))
+
+
+def bench_park_nearly_full(ctx):
+    """ParkingService.park on a 10k-slot lot that is 99% full (exit untimed)."""
+    service = _service(ctx, 10000, 9900)
+    counter = iter(range(10 ** 9))
+
+    @self_timed
+    def run():
+        plate = f"F{next(counter):08d}"
+        start = time.perf_counter()
+        service.park(plate)
+        elapsed = time.perf_counter() - start
+        service.exit(plate)
+        return elapsed
+    return run
+
+
+def bench_park(ctx):
+    """ParkingService.park on a 1k-slot lot with 10k history rows (exit untimed)."""
+    service = _service(ctx, 1000, 500, 10000)
+    counter = iter(range(10 ** 9))
+
+    @self_timed
+    def run():
+        plate = f"P{next(counter):08d}"
+        start = time.perf_counter()
+        service.park(plate)
+        elapsed = time.perf_counter() - start
+        service.exit(plate)
+        return elapsed
+    return run
+
+
+def bench_exit(ctx):
+    """ParkingService.exit (park untimed) on the same lot."""
+    service = _service(ctx, 1000, 500, 10000)
+    counter = iter(range(10 ** 9))
+
+    @self_timed
+    def run():
+        plate = f"E{next(counter):08d}"
+        service.park(plate)
+        start = time.perf_counter()
+        service.exit(plate)
+        return time.perf_counter() - start
+    return run
+
+
+def _reserved_service(ctx, reservations=100_000):
+    service = _service(ctx, 1000, 500, 10000)
+    add_reservations(service.db_path, reservations, ctx['seed'])
+    service.reload_index()
+    return service
+
+
+def bench_park_reserved(ctx):
+    """ParkingService.park with 100k future reservations to honour (exit untimed)."""
+    service = _reserved_service(ctx)
+    counter = iter(range(10 ** 9))
+
+    @self_timed
+    def run():
+        plate = f"P{next(counter):08d}"
+        start = time.perf_counter()
+        service.park(plate)
+        elapsed = time.perf_counter() - start
+        service.exit(plate)
+        return elapsed
+    return run
+
+
+def _request_log_service(ctx, remembered=100_000):
+    service = _service(ctx, 1000, 500, 10000)
+    add_request_log(service.db_path, remembered)
+    return service
+
+
+def bench_park_request_id(ctx):
+    """ParkingService.park with a fresh request ID while 100k IDs are remembered (exit untimed)."""
+    service = _request_log_service(ctx)
+    counter = iter(range(10 ** 9))
+
+    @self_timed
+    def run():
+        n = next(counter)
+        plate = f"P{n:08d}"
+        start = time.perf_counter()
+        service.park(plate, request_id=f"park-{n:08d}")
+        elapsed = time.perf_counter() - start
+        service.exit(plate)
+        return elapsed
+    return run
+
+
+def bench_exit_replay(ctx):
+    """A retried exit answered from the request log (100k remembered IDs)."""
+    service = _request_log_service(ctx)
+    service.park("REPLAY01")
+    service.exit("REPLAY01", request_id="exit-replay")
+    return lambda: service.exit("REPLAY01", request_id="exit-replay")
+
+
+def bench_reservation_conflict(ctx):
+    """In-memory conflict check for a 2-hour window against 100k reservations."""
+    service = _reserved_service(ctx)
+    rng = random.Random(ctx['seed'])
+    base = int((BASE_TIME - datetime(1970, 1, 1)).total_seconds())
+    windows = [(rng.randrange(1, 1001), base + rng.randrange(0, 60 * 86400)) for _ in range(1024)]
+    counter = iter(range(10 ** 12))
+
+    def run():
+        slot_id, start = windows[next(counter) & 1023]
+        return service.reservations.conflict(slot_id, start, start + 7200)
+    return run
+
+
+def bench_earliest_reservation(ctx):
+    """Earliest 3-hour window over 1000 slots with 100k reservations."""
+    service = _reserved_service(ctx)
+    return lambda: service.earliest_reservation(180)
+
+
+def make_allocate_bench(policy):
+    def bench(ctx):
+        """Allocator acquire + release on a 50k-slot, 5-level garage that is 90% full."""
+        rows = synthetic_layout(50000, 5, 4, 0.08, 0.03, ctx['seed'])
+        allocator = Allocator(policy)
+        allocator.load(rows)
+        for _ in range(int(len(rows) * 0.9)):
+            allocator.acquire("standard")
+
+        def run():
+            slot = allocator.acquire("standard")
+            allocator.release(slot.slot_id)
+        return run
+    return bench
+
+
+def make_refresh_bench(active):
+    def bench(ctx):
+        """Dashboard refresh: active_sessions(limit=50) plus row formatting."""
+        service = _service(ctx, max(active * 2, 100), active)
+        now = BASE_TIME
+        return lambda: active_session_rows(service.active_sessions(limit=50), now)
+    return bench
+
+
+def bench_occupancy(ctx):
+    service = _service(ctx, 10000, 6000)
+    return service.occupancy
+
+
+def bench_total_revenue(ctx):
+    service = _service(ctx, 1000, 0, ctx['payments'])
+    return service.total_revenue
+
+
+def suite(sessions: list[int], payments: int) -> list[tuple[str, object]]:
+    benches = [
+        ("calculate_fee", bench_calculate_fee),
+        ("parse_plate_from_filename", bench_parse_plate_from_filename),
+        ("ocr_stub", bench_ocr_stub),
+        ("park_10k_99pct", bench_park_nearly_full),
+        ("park", bench_park),
+        ("exit", bench_exit),
+        ("park_100k_reservations", bench_park_reserved),
+        ("reservation_conflict_100k", bench_reservation_conflict),
+        ("earliest_reservation_100k", bench_earliest_reservation),
+        ("park_request_id_100k", bench_park_request_id),
+        ("exit_replay_100k", bench_exit_replay),
+    ]
+    benches += [(f"allocate_50k_{policy}", make_allocate_bench(policy)) for policy in POLICIES]
+    benches += [(f"refresh_main_table_{n}", make_refresh_bench(n)) for n in sessions]
+    benches += [("occupancy_10k", bench_occupancy), (f"total_revenue_{payments}", bench_total_revenue)]
+    return benches
+
+
+def run(args) -> dict:
+    sessions = [int(n) for n in args.sessions.split(",") if n.strip()]
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="parkinup_bench_") as workdir:
+        ctx = {'workdir': workdir, 'cache_dir': args.cache_dir, 'seed': args.seed,
+               'payments': args.payments}
+        for name, factory in suite(sessions, args.payments):
+            if args.filter and args.filter not in name:
+                continue
+            fn = factory(ctx)
+            results[name] = measure(fn, args.repeat)
+            print(f"  {name:<32} median {results[name]['median_us']:>12.3f} us   "
+                  f"min {results[name]['min_us']:>12.3f} us   p95 {results[name]['p95_us']:>12.3f} us",
+                  file=sys.stderr)
+    return {
+        'meta': {'timestamp': datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(),
+                 'platform': platform.platform(), 'sqlite': sqlite3.sqlite_version, 'seed': args.seed,
+                 'sessions': sessions, 'payments': args.payments, 'repeat': args.repeat},
+        'results': results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[dict]:
+    """Rows for every benchmark in both runs; 'regressed' when min grew beyond threshold."""
+    rows = []
+    for name, result in current['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if base is None or not base['min_us']:
+            continue
+        ratio = result['min_us'] / base['min_us']
+        rows.append({'name': name, 'baseline_us': base['min_us'], 'current_us': result['min_us'],
+                     'ratio': round(ratio, 3), 'regressed': ratio > 1.0 + threshold})
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ParkinUP gate hot paths.")
+    parser.add_argument("--out", help="write results JSON here (default: stdout)")
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this")
+    parser.add_argument("--sessions", default="50,1000,10000", help="active-session counts for the table refresh")
+    parser.add_argument("--payments", type=int, default=1_000_000, help="payments rows for the revenue total")
+    parser.add_argument("--quick", action="store_true", help="small sizes for a fast smoke run")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=7, help="timing rounds per benchmark")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE, help="where synthetic databases are kept")
+    parser.add_argument("--save-baseline", metavar="PATH", help="store these results as the baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a stored baseline")
+    parser.add_argument("--threshold", type=float,
+                        help="allowed slowdown before flagging (default 0.25 = 25%%; 0.5 with --quick)")
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.sessions, args.payments, args.repeat = "50,1000", 10_000, 5
+    if args.threshold is None:
+        # Short quick runs swing more from one run to the next
+        args.threshold = 0.5 if args.quick else 0.25
+
+    report = run(args)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}", file=sys.stderr)
+
+    status = 0
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows = compare(report, baseline, args.threshold)
+        report['comparison'] = {'baseline': args.compare, 'threshold': args.threshold, 'rows': rows}
+        for row in rows:
+            flag = "REGRESSED" if row['regressed'] else "ok"
+            print(f"  [{flag:>9}] {row['name']:<32} {row['baseline_us']:>12.3f} -> {row['current_us']:>12.3f} us "
+                  f"(x{row['ratio']})", file=sys.stderr)
+        if any(row['regressed'] for row in rows):
+            status = 1
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text)
+    elif not args.save_baseline:
+        print(text)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
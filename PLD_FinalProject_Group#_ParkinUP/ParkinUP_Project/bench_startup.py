@@ -0,0 +1,119 @@
+"""Cold-start benchmark for the desktop app.
+
+Usage:
+    python bench_startup.py [--runs 5] [--top 15] [--json]
+
+Two measurements:
+  * time to first window: launches main.py with PARKINUP_STARTUP_PROBE=1,
+    which prints the seconds from the first line of main.py until the
+    homepage is drawn and then closes the app. Needs a display, so it is
+    skipped when Tk cannot open one.
+  * import breakdown: runs the module-level imports of main.py (read with
+    ast, so no window is created) under `python -X importtime` and lists the
+    top modules by cumulative import time.
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MAIN = os.path.join(HERE, "main.py")
+PROBE_MARKER = "PARKINUP_FIRST_WINDOW"
+
+
+def has_display() -> bool:
+    probe = "import tkinter; tkinter.Tk().destroy()"
+    return subprocess.run([sys.executable, "-c", probe], capture_output=True).returncode == 0
+
+
+def first_window_times(runs: int, timeout: float = 60.0) -> list[dict]:
+    env = dict(os.environ, PARKINUP_STARTUP_PROBE="1")
+    results = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, MAIN], cwd=HERE, env=env, capture_output=True,
+                              text=True, timeout=timeout)
+        wall = time.perf_counter() - start
+        first_window = None
+        for line in proc.stdout.splitlines():
+            if line.startswith(PROBE_MARKER):
+                first_window = float(line.split()[1])
+        if first_window is None:
+            raise RuntimeError(f"main.py exited with {proc.returncode} before drawing a window:\n{proc.stderr}")
+        results.append({'first_window_s': first_window, 'process_s': wall})
+    return results
+
+
+def top_level_imports(path: str = MAIN) -> str:
+    """Source of the module-level import statements of `path`."""
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+    tree = ast.parse(source)
+    return "\n".join(ast.get_source_segment(source, node) for node in tree.body
+                     if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def import_breakdown(top: int) -> dict:
+    """Cumulative import time per module for main.py's imports, in ms."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", top_level_imports()],
+                          cwd=HERE, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing main.py's modules failed:\n{proc.stderr}")
+    entries = []
+    for line in proc.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append({'module': name.strip(), 'depth': depth,
+                        'self_ms': int(self_us) / 1000.0, 'cumulative_ms': int(cumulative_us) / 1000.0})
+    # Only imports main.py triggers directly (depth 0 relative to -c) add up to the total
+    roots = [e for e in entries if e['depth'] == min(x['depth'] for x in entries)] if entries else []
+    return {
+        'total_ms': round(sum(e['cumulative_ms'] for e in roots), 1),
+        'top': sorted(entries, key=lambda e: e['cumulative_ms'], reverse=True)[:top],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure ParkinUP cold start.")
+    parser.add_argument("--runs", type=int, default=5, help="app launches for time-to-first-window")
+    parser.add_argument("--top", type=int, default=15, help="modules to list in the import breakdown")
+    parser.add_argument("--json", action="store_true", help="print machine-readable JSON")
+    args = parser.parse_args(argv)
+
+    report: dict = {'python': sys.version.split()[0], 'imports': import_breakdown(args.top)}
+    if has_display():
+        runs = first_window_times(args.runs)
+        firsts = [r['first_window_s'] for r in runs]
+        report['first_window'] = {'runs': len(runs), 'median_ms': round(statistics.median(firsts) * 1000, 1),
+                                  'min_ms': round(min(firsts) * 1000, 1), 'max_ms': round(max(firsts) * 1000, 1)}
+    else:
+        report['first_window'] = None
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+
+    fw = report['first_window']
+    if fw:
+        print(f"Time to first window over {fw['runs']} runs: median {fw['median_ms']} ms "
+              f"(min {fw['min_ms']}, max {fw['max_ms']})")
+    else:
+        print("Time to first window: skipped (no display)")
+    imports = report['imports']
+    print(f"\nmain.py imports: {imports['total_ms']} ms total")
+    print(f"{'module':<40}{'self ms':>10}{'cumul ms':>10}")
+    for e in imports['top']:
+        print(f"{e['module']:<40}{e['self_ms']:>10.1f}{e['cumulative_ms']:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,428 @@
+"""Append-only JSONL event journal and replay tool.
+
+Every state change the ParkingService commits (slot provisioning, park,
+exit, payment, reservations) and every OCR detection is appended as one JSON line:
+
+    {"seq": 42, "ts": "2025-01-06 08:15:02", "type": "park", "vehicle_id": 7,
+     "plate": "ABC1234", "owner": "", "slot_id": 3, "slot_number": "Slot-3",
+     "entry_time": "2025-01-06 08:15:02"}
+
+Lines go to numbered segments (journal/segment-000001.jsonl, ...) that rotate
+at --segment-bytes. Each line is written through at once (so processes
+sharing the directory see each other's events) but fsync'd in batches: after
+`fsync_every` events or `fsync_interval_s` seconds, whichever comes first,
+so a crash can lose at most that window while gate operations never wait on
+a per-event fsync.
+
+Processes append after their database commit, so two of them can journal
+related events out of order (an exit before the park it ends). Replay keys
+everything by id and holds such events until their target shows up.
+
+Usage:
+    python journal.py seed   --db parking.db [--dir journal]   # journal the current DB state
+    python journal.py replay --db rebuilt.db [--dir journal]   # rebuild a DB from the journal
+    python journal.py verify --db parking.db [--dir journal]   # compare the journal with a DB
+    python journal.py tail   [--dir journal] [-n 20]           # print the latest events
+"""
+import argparse
+import glob
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from clock import get_clock
+from utils import init_db
+
+JOURNAL_DIR = os.path.join(os.path.dirname(__file__), "journal")
+SEGMENT_BYTES = 16 * 1024 * 1024
+SEGMENT_PATTERN = "segment-*.jsonl"
+LOCK_NAME = ".lock"
+# Event types replay knows how to apply; others (e.g. "ocr") are audit-only
+SLOT, PARK, EXIT, PAYMENT, OCR = "slot", "park", "exit", "payment", "ocr"
+RESERVE, RESERVATION = "reserve", "reservation"
+
+
+def segment_paths(directory: str) -> list[str]:
+    return sorted(glob.glob(os.path.join(directory, SEGMENT_PATTERN)))
+
+
+def iter_events(directory: str):
+    """Yield events from all segments in order, skipping a torn final line."""
+    for path in segment_paths(directory):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Partially written line from a crash mid-append
+                    continue
+
+
+class Journal:
+    """Thread- and process-safe appender with batched fsync and size-based segment rotation.
+
+    Several processes (the GUI, server.py, gate terminals) may append to one
+    directory: each append holds an exclusive lock on the directory's .lock
+    file, first picks up whatever the others wrote or rotated since its own
+    last write, and flushes before letting go, so seqs stay unique and in
+    file order.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = SEGMENT_BYTES,
+                 fsync_every: int = 64, fsync_interval_s: float = 0.2):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync_every = fsync_every
+        self.fsync_interval_s = fsync_interval_s
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._closed = False
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = open(os.path.join(directory, LOCK_NAME), 'a+b')
+        segments = segment_paths(directory)
+        self._segment = int(os.path.basename(segments[-1])[8:14]) if segments else 1
+        # The newest segment itself is read by the first catch-up
+        self._seq = self._last_seq(segments[:-1])
+        self._open_segment()
+        with self._lock, self._exclusive():
+            self._catch_up_locked()
+        self._syncer = threading.Thread(target=self._sync_loop, name="journal-fsync", daemon=True)
+        self._syncer.start()
+
+    def _segment_path(self, n: int) -> str:
+        return os.path.join(self.directory, f"segment-{n:06d}.jsonl")
+
+    def _open_segment(self):
+        self._file = open(self._segment_path(self._segment), 'ab')
+        # Bytes of this segment already accounted for in self._seq
+        self._end = 0
+
+    @staticmethod
+    def _last_seq(segments: list[str]) -> int:
+        # The newest segment may be empty right after a rotation
+        for path in reversed(segments):
+            last = 0
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        last = json.loads(line).get('seq', last)
+                    except ValueError:
+                        continue
+            if last:
+                return last
+        return 0
+
+    @contextmanager
+    def _exclusive(self):
+        """Hold the directory-wide lock shared by every process appending here."""
+        fd = self._lock_file.fileno()
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after ~10 s of retries; keep waiting
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+    def _catch_up_locked(self):
+        """Take in events and rotations other processes wrote since our last append."""
+        while True:
+            size = os.fstat(self._file.fileno()).st_size
+            if size > self._end:
+                with open(self._segment_path(self._segment), 'rb') as f:
+                    f.seek(self._end)
+                    tail = f.read(size - self._end)
+                for line in reversed(tail.splitlines()):
+                    try:
+                        self._seq = max(self._seq, json.loads(line)['seq'])
+                        break
+                    except (ValueError, KeyError):
+                        continue
+                if not tail.endswith(b"\n"):
+                    # A writer died mid-line; end it so our event starts on its own line
+                    self._file.write(b"\n")
+                    self._file.flush()
+                    size += 1
+                self._end = size
+            if not os.path.exists(self._segment_path(self._segment + 1)):
+                return
+            self._sync_locked()
+            self._file.close()
+            self._segment += 1
+            self._open_segment()
+
+    def is_empty(self) -> bool:
+        with self._lock, self._exclusive():
+            self._catch_up_locked()
+            return self._seq == 0
+
+    def append(self, event_type: str, **fields) -> int:
+        """Append one event and return its sequence number."""
+        with self._lock:
+            if self._closed:
+                raise ValueError("journal is closed")
+            with self._exclusive():
+                self._catch_up_locked()
+                self._seq += 1
+                record = {'seq': self._seq, 'ts': get_clock().now().strftime("%Y-%m-%d %H:%M:%S"),
+                          'type': event_type}
+                record.update(fields)
+                self._file.write(json.dumps(record, separators=(',', ':')).encode('utf-8') + b"\n")
+                # Other processes must see it before they take the lock
+                self._file.flush()
+                self._end = self._file.tell()
+                self._unsynced += 1
+                if self._unsynced >= self.fsync_every:
+                    self._sync_locked()
+                if self._end >= self.segment_bytes:
+                    self._rotate_locked()
+            return self._seq
+
+    def _sync_locked(self):
+        if self._unsynced:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+
+    def _rotate_locked(self):
+        # Creating the next segment is what tells other processes to move on
+        self._sync_locked()
+        self._file.close()
+        self._segment += 1
+        self._open_segment()
+
+    def _sync_loop(self):
+        while True:
+            time.sleep(self.fsync_interval_s)
+            with self._lock:
+                if self._closed:
+                    return
+                self._sync_locked()
+
+    def flush(self):
+        """Force pending events to disk now."""
+        with self._lock:
+            if not self._closed:
+                self._sync_locked()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._sync_locked()
+            self._file.close()
+            self._lock_file.close()
+            self._closed = True
+
+
+# ---------- Seeding / replay ----------
+def seed_from_db(journal: Journal, db_path: str) -> int:
+    """Journal the existing contents of db_path (slots, sessions, payments). Returns events written."""
+    conn = sqlite3.connect(db_path)
+    written = 0
+    try:
+        for slot_id, slot_number, zone, level, slot_type, distance in conn.execute(
+                "SELECT slot_id, slot_number, zone, level, slot_type, distance FROM slots ORDER BY slot_id"):
+            journal.append(SLOT, slot_id=slot_id, slot_number=slot_number, zone=zone, level=level,
+                           slot_type=slot_type, distance=distance)
+            written += 1
+        for vehicle_id, owner, plate, slot_id, entry_time, exit_time in conn.execute(
+                "SELECT vehicle_id, owner_name, vehicle_number, slot_id, entry_time, exit_time "
+                "FROM vehicles ORDER BY vehicle_id"):
+            journal.append(PARK, vehicle_id=vehicle_id, plate=plate, owner=owner, slot_id=slot_id,
+                           entry_time=entry_time)
+            written += 1
+            if exit_time is not None:
+                journal.append(EXIT, vehicle_id=vehicle_id, slot_id=slot_id, exit_time=exit_time)
+                written += 1
+        for payment_id, vehicle_id, amount, payment_time in conn.execute(
+                "SELECT payment_id, vehicle_id, amount, payment_time FROM payments ORDER BY payment_id"):
+            journal.append(PAYMENT, payment_id=payment_id, vehicle_id=vehicle_id, amount=amount,
+                           payment_time=payment_time)
+            written += 1
+        for reservation_id, slot_id, plate, start_time, end_time, status, vehicle_id in conn.execute(
+                "SELECT reservation_id, slot_id, plate, start_time, end_time, status, vehicle_id "
+                "FROM reservations ORDER BY reservation_id"):
+            journal.append(RESERVE, reservation_id=reservation_id, slot_id=slot_id, plate=plate,
+                           start_time=start_time, end_time=end_time)
+            written += 1
+            if status != 'active':
+                journal.append(RESERVATION, reservation_id=reservation_id, status=status, vehicle_id=vehicle_id)
+                written += 1
+    finally:
+        conn.close()
+    journal.flush()
+    return written
+
+
+def replay(directory: str, db_path: str) -> dict:
+    """Rebuild slots, vehicles, payments and reservations in a new database from the journal."""
+    if os.path.exists(db_path):
+        raise FileExistsError(f"{db_path} already exists; replay only writes a fresh database")
+    start = time.perf_counter()
+    slots: dict[int, tuple] = {}
+    vehicles: dict[int, list] = {}
+    payments: dict[int, tuple] = {}
+    reservations: dict[int, list] = {}
+    counts: dict[str, int] = {}
+    # Exits / reservation updates journaled by another process before their park / booking
+    early_exits: dict[int, str] = {}
+    early_updates: dict[int, dict] = {}
+    for event in iter_events(directory):
+        kind = event.get('type')
+        counts[kind] = counts.get(kind, 0) + 1
+        if kind == SLOT:
+            # Journals from before slot attributes get the schema defaults
+            slots[event['slot_id']] = (event['slot_id'], event['slot_number'], event.get('zone', 'A'),
+                                       event.get('level', 1), event.get('slot_type', 'standard'),
+                                       event.get('distance', 0.0))
+        elif kind == PARK:
+            vehicles[event['vehicle_id']] = [event['vehicle_id'], event.get('owner'), event['plate'],
+                                             event['slot_id'], event['entry_time'],
+                                             early_exits.pop(event['vehicle_id'], None)]
+        elif kind == EXIT:
+            vehicle = vehicles.get(event['vehicle_id'])
+            if vehicle is not None:
+                vehicle[5] = event['exit_time']
+            else:
+                early_exits[event['vehicle_id']] = event['exit_time']
+        elif kind == PAYMENT:
+            payments[event['payment_id']] = (event['payment_id'], event['vehicle_id'], event['amount'],
+                                             event['payment_time'])
+        elif kind == RESERVE:
+            reservations[event['reservation_id']] = [event['reservation_id'], event['slot_id'], event['plate'],
+                                                     event['start_time'], event['end_time'], 'active', None]
+            update = early_updates.pop(event['reservation_id'], None)
+            if update is not None:
+                reservations[event['reservation_id']][5:7] = [update['status'], update.get('vehicle_id')]
+        elif kind == RESERVATION:
+            reservation = reservations.get(event['reservation_id'])
+            if reservation is not None:
+                reservation[5] = event['status']
+                reservation[6] = event.get('vehicle_id')
+            else:
+                early_updates[event['reservation_id']] = event
+
+    occupied = {v[3] for v in vehicles.values() if v[5] is None}
+    init_db(db_path, total_slots=0)
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.executemany("INSERT INTO slots (slot_id, slot_number, zone, level, slot_type, distance, is_occupied) "
+                         "VALUES (?,?,?,?,?,?,?)",
+                         (slots[k] + (int(k in occupied),) for k in sorted(slots)))
+        conn.executemany("INSERT INTO vehicles (vehicle_id, owner_name, vehicle_number, slot_id, entry_time, exit_time) "
+                         "VALUES (?,?,?,?,?,?)", (vehicles[k] for k in sorted(vehicles)))
+        conn.executemany("INSERT INTO payments (payment_id, vehicle_id, amount, payment_time) VALUES (?,?,?,?)",
+                         (payments[k] for k in sorted(payments)))
+        conn.executemany("INSERT INTO reservations (reservation_id, slot_id, plate, start_time, end_time, status, "
+                         "vehicle_id) VALUES (?,?,?,?,?,?,?)", (reservations[k] for k in sorted(reservations)))
+        conn.commit()
+    finally:
+        conn.close()
+    elapsed = time.perf_counter() - start
+    total = sum(counts.values())
+    return {'events': total, 'by_type': counts, 'slots': len(slots), 'vehicles': len(vehicles),
+            'active': len(occupied), 'payments': len(payments), 'reservations': len(reservations),
+            'elapsed_s': round(elapsed, 3),
+            'events_per_s': round(total / elapsed) if elapsed > 0 else 0}
+
+
+def db_state(db_path: str) -> dict:
+    """Counts, revenue, active sessions and slot layout of a database, for verify."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return {
+            'slots': conn.execute("SELECT COUNT(*) FROM slots").fetchone()[0],
+            'occupied': conn.execute("SELECT COALESCE(SUM(is_occupied), 0) FROM slots").fetchone()[0],
+            'vehicles': conn.execute("SELECT COUNT(*) FROM vehicles").fetchone()[0],
+            'payments': conn.execute("SELECT COUNT(*) FROM payments").fetchone()[0],
+            'revenue': round(conn.execute("SELECT COALESCE(SUM(amount), 0) FROM payments").fetchone()[0], 2),
+            'active': sorted(r[0] for r in conn.execute(
+                "SELECT vehicle_number FROM vehicles WHERE exit_time IS NULL")),
+            'layout': [list(r) for r in conn.execute(
+                "SELECT slot_number, zone, level, slot_type, distance FROM slots ORDER BY slot_id")],
+        }
+    finally:
+        conn.close()
+
+
+def verify(directory: str, db_path: str) -> dict:
+    """Replay the journal into a temp DB and compare with db_path: {key: (journal, db)} per db_state key."""
+    import tempfile
+    with tempfile.TemporaryDirectory(prefix="parkinup_verify_") as tmp:
+        rebuilt = os.path.join(tmp, "replayed.db")
+        replay(directory, rebuilt)
+        expected, actual = db_state(rebuilt), db_state(db_path)
+    return {key: (expected[key], actual[key]) for key in expected}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ParkinUP event journal tools.")
+    parser.add_argument("command", choices=("seed", "replay", "verify", "tail"))
+    parser.add_argument("--dir", default=JOURNAL_DIR, help="journal directory")
+    parser.add_argument("--db", help="database to seed from, rebuild into, or verify against")
+    parser.add_argument("-n", type=int, default=20, help="events to show with tail")
+    args = parser.parse_args(argv)
+
+    if args.command == "tail":
+        for event in deque(iter_events(args.dir), maxlen=args.n):
+            print(json.dumps(event))
+        return 0
+    if not args.db:
+        parser.error(f"{args.command} needs --db")
+
+    if args.command == "seed":
+        journal = Journal(args.dir)
+        try:
+            if not journal.is_empty():
+                print(f"{args.dir} already has events; seed only a new journal", file=sys.stderr)
+                return 1
+            written = seed_from_db(journal, args.db)
+        finally:
+            journal.close()
+        print(f"Journaled {written} events from {args.db} into {args.dir}")
+        return 0
+
+    if args.command == "replay":
+        summary = replay(args.dir, args.db)
+        print(f"Replayed {summary['events']} events in {summary['elapsed_s']} s "
+              f"({summary['events_per_s']} events/s) -> {args.db}: {summary['slots']} slots, "
+              f"{summary['vehicles']} vehicles ({summary['active']} active), {summary['payments']} payments, "
+              f"{summary['reservations']} reservations")
+        return 0
+
+    # verify: rebuild into a temp DB and compare with the given one
+    compared = verify(args.dir, args.db)
+    mismatches = [key for key, (expected, actual) in compared.items() if expected != actual]
+    for key, (expected, actual) in compared.items():
+        shown = (lambda v: len(v) if isinstance(v, list) else v)
+        print(f"  [{'FAIL' if key in mismatches else 'ok'}] {key}: journal {shown(expected)}, db {shown(actual)}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""Camera lanes: one capture thread per camera, shared OCR workers.
+
+A Lane wraps a camera source (device index, video file or stream URL), keeps
+its latest frame, runs the cheap motion gate in its own capture thread and
+hands settled bursts to a LaneManager-wide OCR pool. Detections are queued
+as (lane, plate) for the GUI to route to park or exit by lane direction.
+
+Lane config (lanes.json next to main.py), e.g.:
+    [{"name": "Entry", "source": 0, "direction": "entry"},
+     {"name": "Exit", "source": "rtsp://10.0.0.5/stream", "direction": "exit"}]
+A local video file path can stand in for a stream; it loops when it ends.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from auto_detect import MotionGate
+from metrics import metrics
+from optional_libs import load
+from plate_vote import PlateCache
+
+ENTRY = "entry"
+EXIT = "exit"
+# Route by whether the plate is already parked (single shared camera)
+AUTO = "auto"
+DIRECTIONS = (ENTRY, EXIT, AUTO)
+
+DEFAULT_LANES = [{"name": "Lane 1", "source": 0, "direction": AUTO}]
+
+
+def load_lane_config(path: str) -> list[dict]:
+    """Read lane definitions from a JSON file, or the single default camera if absent."""
+    if not os.path.exists(path):
+        return [dict(d) for d in DEFAULT_LANES]
+    with open(path, encoding='utf-8') as f:
+        lanes = json.load(f)
+    for i, lane in enumerate(lanes):
+        lane.setdefault("name", f"Lane {i + 1}")
+        lane.setdefault("direction", AUTO)
+        if lane["direction"] not in DIRECTIONS:
+            raise ValueError(f"Lane {lane['name']}: direction must be one of {DIRECTIONS}")
+        if isinstance(lane.get("source"), str) and lane["source"].isdigit():
+            lane["source"] = int(lane["source"])
+    return lanes
+
+
+class Lane:
+    """One camera and its capture thread."""
+
+    def __init__(self, name: str, source, direction: str = AUTO, manager=None):
+        self.name = name
+        self.source = source
+        self.direction = direction
+        self.manager = manager
+        self.gate = MotionGate()
+        self.cache = PlateCache(cooldown_s=30.0)
+        self.preview = None  # Tk label assigned by the GUI
+        self.frames = 0
+        self._cap = None
+        self._frame = None
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread = None
+        self._busy = False
+        self._is_file = isinstance(source, str) and os.path.isfile(source)
+
+    @property
+    def title(self) -> str:
+        return f"{self.name} · {self.direction.capitalize()}"
+
+    def start(self) -> bool:
+        cv2 = load("cv2")
+        if cv2 is None or self._running:
+            return self._running
+        self._cap = cv2.VideoCapture(self.source)
+        if not self._cap.isOpened():
+            self._cap.release()
+            self._cap = None
+            return False
+        self._running = True
+        self._thread = threading.Thread(target=self._capture_loop, name=f"lane-{self.name}", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        if self._cap is not None:
+            try:
+                self._cap.release()
+            except Exception:
+                pass
+            self._cap = None
+
+    def latest_frame(self):
+        with self._lock:
+            return self._frame
+
+    def _capture_loop(self):
+        cv2 = load("cv2")
+        # Video files are read as fast as the disk allows; pace them to their FPS
+        fps = self._cap.get(cv2.CAP_PROP_FPS) if self._is_file else 0
+        delay = 1.0 / fps if fps and fps > 0 else 0.0
+        while self._running:
+            start = time.monotonic()
+            with metrics.timer("camera.read"):
+                ret, frame = self._cap.read()
+            if not ret:
+                if self._is_file:
+                    self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                time.sleep(0.2)
+                continue
+            with self._lock:
+                self._frame = frame
+            self.frames += 1
+            self._auto_detect(frame)
+            if delay:
+                time.sleep(max(0.0, delay - (time.monotonic() - start)))
+
+    def _auto_detect(self, frame):
+        manager = self.manager
+        if manager is None or not manager.auto_detect:
+            self.gate.reset()
+            return
+        if self._busy:
+            return
+        burst = self.gate.feed(frame)
+        if burst:
+            self._busy = True
+            manager.submit_burst(self, burst)
+
+    def _burst_done(self, plate: str | None):
+        self._busy = False
+        if plate and self.manager is not None:
+            self.manager.detections.put((self, plate))
+
+
+class LaneManager:
+    """Owns all lanes and the OCR worker pool they share."""
+
+    def __init__(self, lane_configs: list[dict], ocr_fn, ocr_workers: int = 2):
+        self.ocr_fn = ocr_fn
+        self.auto_detect = False
+        self.detections: "queue.Queue[tuple[Lane, str]]" = queue.Queue()
+        self.lanes = [Lane(c["name"], c.get("source", 0), c.get("direction", AUTO), manager=self)
+                      for c in lane_configs]
+        self._pool = ThreadPoolExecutor(max_workers=max(1, ocr_workers), thread_name_prefix="ocr")
+
+    def start(self) -> list[Lane]:
+        """Start every lane; returns the lanes whose camera opened."""
+        return [lane for lane in self.lanes if lane.start()]
+
+    def stop(self):
+        for lane in self.lanes:
+            lane.stop()
+
+    def shutdown(self):
+        self.stop()
+        self._pool.shutdown(wait=False)
+
+    @property
+    def running(self) -> bool:
+        return any(lane._running for lane in self.lanes)
+
+    def primary_frame(self):
+        """Latest frame of the first lane that has one (for one-shot OCR)."""
+        for lane in self.lanes:
+            frame = lane.latest_frame()
+            if frame is not None:
+                return frame
+        return None
+
+    def forget(self, plate: str):
+        """Let shared (auto) cameras report plate again at once; call after it exits.
+
+        Otherwise a car that leaves and comes back within the cooldown is
+        not offered for parking.
+        """
+        for lane in self.lanes:
+            if lane.direction == AUTO:
+                lane.cache.forget(plate)
+
+    def submit_burst(self, lane: Lane, burst):
+        self._pool.submit(self._ocr_burst, lane, burst)
+
+    def _ocr_burst(self, lane: Lane, burst):
+        reads = []
+        with metrics.timer("ocr.burst"):
+            for frame in burst:
+                try:
+                    reads.append(self.ocr_fn(frame))
+                except Exception:
+                    reads.append(None)
+        metrics.incr("ocr.bursts")
+        # None if nothing was read, the vote was too weak, or the plate was just reported
+        lane._burst_done(lane.cache.observe_reads(reads))
+
+    def stats(self) -> list[dict]:
+        return [{'lane': lane.name, 'direction': lane.direction, 'frames': lane.frames,
+                 'gate': lane.gate.stats(), 'cache': lane.cache.stats()} for lane in self.lanes]
@@ -0,0 +1,183 @@
+"""Load test for the local HTTP/JSON API (server.py).
+
+Usage:
+    python loadtest_server.py [--clients 50] [--requests 2000] [--slots 200]
+    python loadtest_server.py --url http://127.0.0.1:8080 [--clients 50] [--requests 2000]
+
+Without --url a server is started on a scratch database in a temp folder, so
+the real parking.db is never touched. Each client keeps one keep-alive
+connection and sends a mix of park, quote, occupancy, events and exit
+requests; throughput and per-route p50/p95/p99 latencies are printed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+from metrics import percentile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class Client:
+    """One keep-alive HTTP/1.1 connection."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method: str, path: str, body: dict | None = None):
+        raw = json.dumps(body).encode('utf-8') if body is not None else b""
+        self.writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(raw)}\r\n\r\n".encode('ascii') + raw)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode('latin-1').partition(":")
+            if name.strip().lower() == 'content-length':
+                length = int(value)
+        payload = json.loads(await self.reader.readexactly(length)) if length else None
+        return status, payload
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def run_client(client: Client, requests: int, rng: random.Random, results: list, prefix: str):
+    parked: list[str] = []
+    serial = 0
+    for _ in range(requests):
+        roll = rng.random()
+        if roll < 0.35 or not parked:
+            serial += 1
+            plate = f"{prefix}{serial:04d}"
+            route, args = "/park", ("POST", "/park", {"plate": plate, "owner": "Load Test"})
+        elif roll < 0.55:
+            plate = parked.pop(rng.randrange(len(parked)))
+            route, args = "/exit", ("POST", "/exit", {"plate": plate})
+        elif roll < 0.75:
+            route, args = "/quote", ("GET", f"/quote?plate={rng.choice(parked)}", None)
+        elif roll < 0.9:
+            route, args = "/occupancy", ("GET", "/occupancy", None)
+        else:
+            route, args = "/events", ("GET", "/events?limit=20", None)
+        start = time.perf_counter()
+        status, _ = await client.request(*args)
+        results.append((route, status, (time.perf_counter() - start) * 1000.0))
+        if route == "/park" and status == 200:
+            parked.append(plate)
+
+
+async def run_load(host: str, port: int, clients: int, total: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    conns = [Client(host, port) for _ in range(clients)]
+    await asyncio.gather(*(c.connect() for c in conns))
+    per_client = max(1, total // clients)
+    results: list = []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(c, per_client, random.Random(rng.random()), results, f"LT{i:03d}X")
+                           for i, c in enumerate(conns)))
+    elapsed = time.perf_counter() - start
+    metrics = (await conns[0].request("GET", "/metrics"))[1]
+    for c in conns:
+        await c.close()
+
+    by_route: dict[str, list[float]] = {}
+    statuses: dict[int, int] = {}
+    for route, status, ms in results:
+        by_route.setdefault(route, []).append(ms)
+        statuses[status] = statuses.get(status, 0) + 1
+    routes = {}
+    for route, samples in sorted(by_route.items()):
+        samples.sort()
+        routes[route] = {'count': len(samples), 'p50_ms': round(percentile(samples, 50), 2),
+                         'p95_ms': round(percentile(samples, 95), 2), 'p99_ms': round(percentile(samples, 99), 2)}
+    return {
+        'requests': len(results),
+        'clients': clients,
+        'elapsed_s': round(elapsed, 3),
+        'requests_per_s': round(len(results) / elapsed, 1) if elapsed > 0 else 0.0,
+        'statuses': statuses,
+        'routes': routes,
+        'server_metrics': metrics,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_scratch_server(slots: int, workers: int):
+    """Start server.py on a temp database. Returns (process, port, temp dir)."""
+    tmp = tempfile.TemporaryDirectory(prefix="parkinup_load_")
+    db_path = os.path.join(tmp.name, "parking.db")
+    sys.path.insert(0, HERE)
+    from utils import init_db
+    init_db(db_path, total_slots=slots)
+
+    port = _free_port()
+    proc = subprocess.Popen([sys.executable, os.path.join(HERE, "server.py"), "--port", str(port),
+                             "--db", db_path, "--workers", str(workers)],
+                            stdout=subprocess.PIPE, text=True)
+    proc.stdout.readline()  # "listening on ..." once the socket is bound
+    return proc, port, tmp
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the ParkinUP HTTP API.")
+    parser.add_argument("--url", help="existing server to test (default: start one on a scratch DB)")
+    parser.add_argument("--clients", type=int, default=50, help="concurrent keep-alive connections")
+    parser.add_argument("--requests", type=int, default=2000, help="total requests across all clients")
+    parser.add_argument("--slots", type=int, default=200, help="slots in the scratch database")
+    parser.add_argument("--workers", type=int, default=8, help="database threads for the scratch server")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    args = parser.parse_args(argv)
+
+    proc = tmp = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname or "127.0.0.1", url.port or 80
+    else:
+        proc, port, tmp = start_scratch_server(args.slots, args.workers)
+        host = "127.0.0.1"
+    try:
+        report = asyncio.run(run_load(host, port, max(1, args.clients), args.requests, args.seed))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=5)
+            tmp.cleanup()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    print(f"{report['requests']} requests from {report['clients']} clients in {report['elapsed_s']} s "
+          f"=> {report['requests_per_s']} req/s, statuses {report['statuses']}")
+    for route, r in report['routes'].items():
+        print(f"  {route:<11} n={r['count']:<6} p50 {r['p50_ms']:>7} ms  p95 {r['p95_ms']:>7} ms  p99 {r['p99_ms']:>7} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
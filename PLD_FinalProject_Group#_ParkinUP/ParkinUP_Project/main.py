@@ -1,64 +1,63 @@
+import time
+# Startup benchmark reference point (see bench_startup.py)
+_STARTUP_T0 = time.perf_counter()
 import os
-import sqlite3
+import queue
+import signal
+import threading
+from collections import deque
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, simpledialog
-from datetime import datetime
-from types import ModuleType
-from typing import Any, Optional, Protocol, cast
-from ui import create_homepage, create_login_page, COLORS, FONTS, show_parking_slots_overview
+from datetime import datetime, timedelta
+from typing import Any, Protocol, cast
+from ui import (create_homepage, create_login_page, COLORS, FONTS, LOGO_PATHS, PageManager, load_photo,
+                show_parking_slots_overview, show_receipt_dialog)
 
 # --------- Database path (same folder) ----------
 DB_PATH = os.path.join(os.path.dirname(__file__), "parking.db")
 
-# --------- DB helper functions ----------
-def get_connection():
-    return sqlite3.connect(DB_PATH)
-
-def ensure_tables_exist():
-    """Create minimal tables if not exist."""
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS slots (
-        slot_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        slot_number TEXT UNIQUE NOT NULL,
-        is_occupied INTEGER DEFAULT 0
-    );""")
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS vehicles (
-        vehicle_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        owner_name TEXT,
-        vehicle_number TEXT UNIQUE,
-        slot_id INTEGER,
-        entry_time TEXT,
-        exit_time TEXT,
-        FOREIGN KEY(slot_id) REFERENCES slots(slot_id)
-    );""")
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS payments (
-        payment_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        vehicle_id INTEGER,
-        amount REAL,
-        payment_time TEXT,
-        FOREIGN KEY(vehicle_id) REFERENCES vehicles(vehicle_id)
-    );""")
-    conn.commit()
-    conn.close()
-
-# Ensure DB ready
-ensure_tables_exist()
-from utils import init_db, calculate_fee, format_currency, ocr_stub
-# Seed a small default set of slots if the DB has none
+from utils import init_db, format_currency, format_duration, active_session_rows, ocr_stub, ocr_frame
+from auto_detect import AUTO_DETECT_AVAILABLE
+from lanes import AUTO, EXIT, Lane, LaneManager, load_lane_config
+from parking_service import ParkingService, ParkingError, NoSlotAvailable, NotParked
+from clock import clock_from_env, get_clock, set_clock
+from metrics import metrics
+from profiler import Profiler
+from scheduler import Scheduler
+from receipts import PrintQueue, open_printer, render_pdf, transaction_id, layout as receipt_layout
+from journal import JOURNAL_DIR, Journal, seed_from_db
+from occupancy_ts import seed_if_empty as seed_occupancy
+from optional_libs import is_installed, load, preload
+# Create/migrate the schema (skipped when user_version is current) and
+# seed a small default set of slots if the DB has none
 init_db(DB_PATH, total_slots=20)
 
-# Optional camera / OCR libs (safe imports)
-cv2: Optional[ModuleType] = None
-try:
-    import cv2
-except ImportError:
-    pass
+# Real time unless PARKINUP_CLOCK_SPEED asks for an accelerated virtual clock
+set_clock(clock_from_env())
+
+# Append-only audit journal of every park/exit/payment/slot change and OCR read.
+# A new journal starts with the DB's current contents so replay is complete.
+journal = Journal(JOURNAL_DIR)
+if journal.is_empty():
+    seed_from_db(journal, DB_PATH)
+# Occupancy history for as-of/range queries; built from vehicles the first time
+seed_occupancy(DB_PATH)
+
+# All park/exit/fee logic lives in the headless service; the GUI only calls it
+service = ParkingService(DB_PATH, rate_per_min=10/60, journal=journal)
+# Fuzzy/prefix index over active plates, kept in sync by the service
+plate_index = service.plate_index
 
-CAMERA_LIB: bool = cv2 is not None
+# Runtime cProfile/tracemalloc sessions (Ctrl+Shift+P, SIGUSR1 or the Metrics window)
+PROFILES_DIR = os.path.join(os.path.dirname(__file__), "profiles")
+profiler = Profiler(PROFILES_DIR)
+
+# Receipts print on a worker thread; PARKINUP_PRINTER is an ESC/POS device or file, else a stub
+print_queue = PrintQueue(open_printer(os.environ.get("PARKINUP_PRINTER")))
+
+# Optional camera / OCR libs: only checked for here, imported on first use
+# (or by preload() once the homepage is up) so they don't delay the window
+CAMERA_LIB: bool = is_installed("cv2")
 
 class _PILImageObject(Protocol):
     def resize(self, size: tuple[int, int]):
@@ -85,78 +84,86 @@ else:
     ImageTk = cast(_PILImageTkModule, _PIL_ImageTk)
     PIL_AVAILABLE = True
 
-# Optional OCR lib
-pytesseract: Optional[ModuleType] = None
-try:
-    import pytesseract
-except ImportError:
-    pass
+PYTESSERACT_AVAILABLE: bool = is_installed("pytesseract")
 
-PYTESSERACT_AVAILABLE: bool = pytesseract is not None
-
-# Camera state (optional)
-cam = None
-cam_frame = None
-cam_label = None
+# Camera lanes (optional): each lane has its own capture thread and preview,
+# OCR workers are shared. Lanes come from lanes.json, default is camera 0.
+LANES_CONFIG_PATH = os.path.join(os.path.dirname(__file__), "lanes.json")
+lane_manager = LaneManager(load_lane_config(LANES_CONFIG_PATH), ocr_fn=ocr_frame)
+# Detections waiting for the attendant to close the current popup
+pending_detections: "deque[tuple[Lane, str]]" = deque()
 
 def start_camera():
-    global cam
-    if cv2 is None:
+    if load("cv2") is None:
         return
-    if cam is None:
-        cam = cv2.VideoCapture(0)
-    update_camera()
+    if not lane_manager.running:
+        lane_manager.start()
+    scheduler.every("camera", 30, update_camera, group="dashboard", run_now=True)
 
 def stop_camera():
-    global cam
-    if cam is not None:
-        try:
-            cam.release()
-        except Exception:
-            pass
-        cam = None
+    lane_manager.shutdown()
 
-def update_camera():
-    global cam, cam_frame, cam_label
-    if cam is None:
+def render_preview(label, frame):
+    """Draw a BGR frame into a Tk label, fitted to the label at 16:9."""
+    cv2 = load("cv2")
+    if not (PIL_AVAILABLE and cv2 is not None and Image is not None and ImageTk is not None):
         return
-    ret, frame = cam.read()
-    if not ret:
-        root.after(200, update_camera)
+    if not (label and label.winfo_exists()):
         return
-    cam_frame = frame.copy()
-    if PIL_AVAILABLE and cv2 is not None and Image is not None and ImageTk is not None:
-        try:
-            img = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(img)
-            # Dynamically resize based on cam_label size, maintaining 16:9 aspect ratio
-            if cam_label and cam_label.winfo_exists():
-                width = cam_label.winfo_width()
-                height = cam_label.winfo_height()
-                if width > 1 and height > 1:
-                    # Maintain 16:9 aspect ratio within the label dimensions
-                    target_ratio = 16 / 9
-                    if width / height > target_ratio:
-                        new_height = height
-                        new_width = int(height * target_ratio)
-                    else:
-                        new_width = width
-                        new_height = int(width / target_ratio)
-                    img = img.resize((new_width, new_height))
-                else:
-                    img = img.resize((1000, 562))
-            else:
-                img = img.resize((1000, 562))
+    width = label.winfo_width()
+    height = label.winfo_height()
+    if width > 1 and height > 1:
+        # Maintain 16:9 aspect ratio within the label dimensions
+        target_ratio = 16 / 9
+        if width / height > target_ratio:
+            new_height = height
+            new_width = int(height * target_ratio)
+        else:
+            new_width = width
+            new_height = int(width / target_ratio)
+    else:
+        new_width, new_height = 1000, 562
+    try:
+        with metrics.timer("camera.render"):
+            # Resize before colour conversion so only preview-sized pixels are touched
+            img = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_AREA)
+            img = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
             imgtk = ImageTk.PhotoImage(img)
-            try:
-                if cam_label and cam_label.winfo_exists():
-                    cam_label.config(image=imgtk)
-                    cam_label.image = imgtk
-            except Exception:
-                pass
-        except Exception:
-            pass
-    root.after(30, update_camera)
+            label.config(image=imgtk)
+            label.image = imgtk
+    except Exception:
+        pass
+
+def update_camera():
+    if not lane_manager.running:
+        return False
+    poll_auto_detect()
+    for lane in lane_manager.lanes:
+        frame = lane.latest_frame()
+        if frame is not None:
+            render_preview(lane.preview, frame)
+
+def poll_auto_detect():
+    """Route finished lane detections: entry lanes park, exit lanes exit."""
+    while True:
+        try:
+            lane, plate = lane_manager.detections.get_nowait()
+        except queue.Empty:
+            break
+        log_ocr_result(f"Auto-detected Plate ({lane.name}): {plate}")
+        pending_detections.append((lane, plate))
+    # Don't stack popups on top of one the attendant is already using
+    if not pending_detections or root.grab_current() is not None:
+        return
+    lane, plate = pending_detections.popleft()
+    # Correct single OCR slips against the plates that are actually parked
+    match = None
+    if lane.direction in (EXIT, AUTO):
+        match = plate if service.is_parked(plate) else plate_index.best_match(plate)
+    if lane.direction == EXIT or match:
+        create_exit_vehicle_popup(match or plate)
+    else:
+        create_park_vehicle_popup(plate)
 
 # --------- GUI root ----------
 root = tk.Tk()
@@ -165,6 +172,9 @@ root.geometry("1200x800")
 root.minsize(1000, 700)
 root.resizable(True, True)
 
+# Every periodic GUI job goes through this; page jobs use group="dashboard"
+scheduler = Scheduler(root)
+
 # Set window icon
 if PIL_AVAILABLE:
     try:
@@ -183,20 +193,16 @@ app_state = {
     'sidebar_open': True
 }
 
+# Pages are built once on first visit and raised afterwards (registered below setup_dashboard)
+pages = PageManager(root)
+
 # Page navigation functions
 def navigate_to(page):
     """Navigate to different pages."""
+    if page == 'dashboard' and not app_state['is_logged_in']:
+        page = 'login'
     app_state['current_page'] = page
-    
-    if page == 'home':
-        create_homepage(root, on_start_now=show_login, on_learn_more=show_learn_more_dialog)
-    elif page == 'login':
-        create_login_page(root, on_login=show_dashboard, on_back=navigate_home)
-    elif page == 'dashboard':
-        if app_state['is_logged_in']:
-            show_dashboard()
-        else:
-            show_login()
+    pages.show(page)
 
 def navigate_home():
     navigate_to('home')
@@ -210,14 +216,7 @@ def show_login():
 def show_dashboard():
     """Shows the dashboard after login."""
     app_state['is_logged_in'] = True
-    app_state['current_page'] = 'dashboard'
-    
-    # Clear any existing widgets
-    for widget in root.winfo_children():
-        widget.destroy()
-    
-    root.configure(bg=COLORS['gray_50'])
-    setup_dashboard()
+    navigate_to('dashboard')
 
 
 def create_navigation_bar():
@@ -386,24 +385,20 @@ def create_stat_card(parent, title, value, subtitle, icon_color, bg_color, width
     subtitle_label.pack(padx=15, pady=(0, 15), anchor="w")
 
 
-def setup_dashboard():
-    """Setup the modern dashboard with dark red gradient header and card-based design."""
-    global cam_label, ocr_text, main_table
-
-    # Clear any existing widgets
-    for widget in root.winfo_children():
-        widget.destroy()
+def setup_dashboard(page):
+    """Build the modern dashboard with dark red gradient header and card-based design into page."""
+    global ocr_text, main_table, available_val
 
     # Main container background (Light Gray)
-    root.configure(bg=COLORS['gray_100'])
+    page.configure(bg=COLORS['gray_100'])
     
     # ---------- Header Section ----------
-    header_container = tk.Frame(root, bg=COLORS['white'], height=100, bd=0)
+    header_container = tk.Frame(page, bg=COLORS['white'], height=100, bd=0)
     header_container.pack(fill="x", side="top")
     header_container.pack_propagate(False)
 
     # Add a subtle bottom border to header
-    header_border = tk.Frame(root, bg=COLORS['gray_200'], height=1)
+    header_border = tk.Frame(page, bg=COLORS['gray_200'], height=1)
     header_border.pack(fill="x", side="top")
 
     # Logo in header (centered)
@@ -413,13 +408,7 @@ def setup_dashboard():
     # White Logo Image
     if PIL_AVAILABLE:
         try:
-            logo_path = os.path.join(os.path.dirname(__file__), "..", "docs", "logo.png")
-            if not os.path.exists(logo_path):
-                 logo_path = os.path.join(os.path.dirname(__file__), "docs", "logo.png")
-            
-            logo_img = Image.open(logo_path)
-            logo_img = logo_img.resize((240, 80), Image.Resampling.LANCZOS)
-            logo_photo = ImageTk.PhotoImage(logo_img)
+            logo_photo = load_photo(LOGO_PATHS, (240, 80))
             logo_label = tk.Label(header_content, image=logo_photo, bg=COLORS['white'])
             logo_label.image = logo_photo  # Keep a reference
             logo_label.pack()
@@ -434,7 +423,7 @@ def setup_dashboard():
         logo_label.pack()
     
     # ---------- Main Content Card ----------
-    main_content = tk.Frame(root, bg=COLORS['gray_100'])
+    main_content = tk.Frame(page, bg=COLORS['gray_100'])
     main_content.pack(fill="both", expand=True, padx=40, pady=30)
     
     # Main card with rounded look
@@ -447,16 +436,6 @@ def setup_dashboard():
     status_bar.pack_propagate(False)
     status_bar.config(highlightbackground=COLORS['blue_100'], highlightthickness=1)
 
-    def get_available_slots():
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT COUNT(*) FROM slots WHERE is_occupied=0")
-        available = cur.fetchone()[0] or 0
-        cur.execute("SELECT COUNT(*) FROM slots")
-        total = cur.fetchone()[0] or 20
-        conn.close()
-        return available, total
-    
     available, total = get_available_slots()
 
     # Available Slots (Left)
@@ -478,6 +457,36 @@ def setup_dashboard():
                          font=('Segoe UI', 11),
                          fg=COLORS['gray_500'], bg=COLORS['white'])
     rate_label.pack(side="right", padx=20)
+
+    # Auto-detect toggle (Right)
+    def auto_detect_text():
+        return "🎥 Auto Detect: On" if lane_manager.auto_detect else "🎥 Auto Detect: Off"
+
+    def toggle_auto_detect():
+        if not lane_manager.auto_detect and not (AUTO_DETECT_AVAILABLE and PYTESSERACT_AVAILABLE and lane_manager.running):
+            messagebox.showwarning("Auto Detect", "Auto detect needs a camera, OpenCV and pytesseract.")
+            return
+        lane_manager.auto_detect = not lane_manager.auto_detect
+        if not lane_manager.auto_detect:
+            for lane_stats in lane_manager.stats():
+                log_ocr_result(f"Auto-detect stopped: {lane_stats}")
+        auto_detect_btn.config(text=auto_detect_text(),
+                               fg=COLORS['green_600'] if lane_manager.auto_detect else COLORS['gray_700'])
+
+    auto_detect_btn = tk.Button(status_bar, text=auto_detect_text(), command=toggle_auto_detect,
+                                bg=COLORS['white'], fg=COLORS['green_600'] if lane_manager.auto_detect else COLORS['gray_700'],
+                                font=('Segoe UI', 11), relief='flat', bd=0, cursor='hand2')
+    auto_detect_btn.pack(side="right", padx=10)
+
+    metrics_btn = tk.Button(status_bar, text="📊 Metrics", command=open_metrics_panel,
+                            bg=COLORS['white'], fg=COLORS['gray_700'],
+                            font=('Segoe UI', 11), relief='flat', bd=0, cursor='hand2')
+    metrics_btn.pack(side="right", padx=10)
+
+    reports_btn = tk.Button(status_bar, text="📈 Reports", command=open_reports_window,
+                            bg=COLORS['white'], fg=COLORS['gray_700'],
+                            font=('Segoe UI', 11), relief='flat', bd=0, cursor='hand2')
+    reports_btn.pack(side="right", padx=10)
     
     # ---------- Action Bar ----------
     action_bar = tk.Frame(main_card, bg=COLORS['white'])
@@ -530,12 +539,21 @@ def setup_dashboard():
     # Simulated dashed border using a Frame with specific configuration isn't easy in Tkinter,
     # so we use a clean solid border or custom drawing if needed. Here we use solid as fallback.
     
-    cam_label = tk.Label(cam_preview_frame,
-                        text="📷\n\nCamera Preview Area\n(Simulated - Use OCR Detect for plate recognition)",
-                        bg=COLORS['blue_50'], fg=COLORS['gray_500'],
-                        font=('Segoe UI', 12), anchor="center",
-                        justify="center")
-    cam_label.pack(fill="both", expand=True)
+    # One preview per camera lane, side by side
+    lanes = lane_manager.lanes
+    for idx, lane in enumerate(lanes):
+        cam_preview_frame.grid_columnconfigure(idx, weight=1, uniform="lane")
+        cam_preview_frame.grid_rowconfigure(1, weight=1)
+        if len(lanes) > 1:
+            tk.Label(cam_preview_frame, text=lane.title, font=('Segoe UI', 10, 'bold'),
+                     fg=COLORS['gray_700'], bg=COLORS['blue_50']).grid(row=0, column=idx, pady=(4, 0))
+        cam_label = tk.Label(cam_preview_frame,
+                            text="📷\n\nCamera Preview Area\n(Simulated - Use OCR Detect for plate recognition)",
+                            bg=COLORS['blue_50'], fg=COLORS['gray_500'],
+                            font=('Segoe UI', 12), anchor="center",
+                            justify="center")
+        cam_label.grid(row=1, column=idx, sticky="nsew")
+        lane.preview = cam_label
     
     # ---------- Currently Parked Vehicles Table ----------
     table_container = tk.Frame(main_card, bg=COLORS['white'])
@@ -570,84 +588,348 @@ def setup_dashboard():
     # OCR Results log (hidden but defined for popup use)
     ocr_log = []
 
+
+def get_available_slots():
+    occupancy = service.occupancy()
+    return occupancy['available'], occupancy['total'] or 20
+
+def refresh_status():
+    available, total = get_available_slots()
+    available_val.config(text=f"{available} / {total}")
+
+def on_dashboard_shown():
+    """Refresh the data-bound parts of the cached dashboard and start its timers."""
     # Start camera (optional)
     start_camera()
-    
-    # Initialize table
     refresh_main_table()
-    update_durations()
-    
-    # Refresh status indicator periodically
-    def refresh_status():
-        available, total = get_available_slots()
-        available_val.config(text=f"{available} / {total}")
-        root.after(30000, refresh_status)
-    
     refresh_status()
+    scheduler.every("update-durations", 60000, update_durations, group="dashboard", run_now=True)
+    # Refresh status indicator periodically
+    scheduler.every("refresh-status", 30000, refresh_status, group="dashboard")
+
+def on_dashboard_hidden():
+    scheduler.cancel_group("dashboard")
 
 
 # ---------- Core functions ----------
 def refresh_main_table():
     for r in main_table.get_children():
         main_table.delete(r)
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""SELECT v.vehicle_number, s.slot_number, v.entry_time, v.exit_time
-                   FROM vehicles v LEFT JOIN slots s ON v.slot_id = s.slot_id
-                   WHERE v.exit_time IS NULL OR v.exit_time = '-'
-                   ORDER BY v.vehicle_id DESC LIMIT 50""")
-    now = datetime.now()
-    rows = cur.fetchall()
+    now = get_clock().now()
+    rows = service.active_sessions(limit=50)
     if not rows:
         # Show "No vehicles currently parked" message if needed
         # In Treeview, we usually just leave it empty or insert a placeholder
         main_table.insert("", "end", values=("No vehicles currently parked", "", "", "", ""), tags=("empty",))
     else:
-        for row in rows:
-            vehicle_number, slot_number, entry_time_str, exit_time_str = row
-            entry_time = datetime.strptime(entry_time_str, "%Y-%m-%d %H:%M:%S")
-            if exit_time_str and exit_time_str != '-':
-                exit_time = datetime.strptime(exit_time_str, "%Y-%m-%d %H:%M:%S")
-                duration_minutes = int((exit_time - entry_time).total_seconds() / 60)
-                status = "Exited"
-                tag = "exited"
-            else:
-                duration_minutes = int((now - entry_time).total_seconds() / 60)
-                status = "Parked"
-                tag = "parked"
-            if duration_minutes >= 60:
-                hrs = duration_minutes // 60
-                mins = duration_minutes % 60
-                duration = f"{hrs} hr {mins} min" if mins else f"{hrs} hr"
-            else:
-                duration = f"{duration_minutes} min"
-            main_table.insert("", "end", values=(vehicle_number, slot_number, entry_time_str, duration, status), tags=(tag,))
-    conn.close()
+        for values in active_session_rows(rows, now):
+            main_table.insert("", "end", values=values, tags=("parked",))
 
 def update_durations():
     """Update durations for parked vehicles in real-time."""
-    now = datetime.now()
+    now = get_clock().now()
     for item in main_table.get_children():
         values = main_table.item(item, "values")
         if len(values) > 4 and values[4] == "Parked":  # Status is Parked
             entry_time_str = values[2]
             entry_time = datetime.strptime(entry_time_str, "%Y-%m-%d %H:%M:%S")
             duration_minutes = int((now - entry_time).total_seconds() / 60)
-            if duration_minutes >= 60:
-                hrs = duration_minutes // 60
-                mins = duration_minutes % 60
-                duration = f"{hrs} hr {mins} min" if mins else f"{hrs} hr"
-            else:
-                duration = f"{duration_minutes} min"
-            main_table.set(item, column="Duration", value=duration)
-    # Schedule next update in 60 seconds
-    root.after(60000, update_durations)
+            main_table.set(item, column="Duration", value=format_duration(duration_minutes))
+
+def show_parking_error(error: ParkingError):
+    """Show a service error with the same dialog titles the handlers always used."""
+    if isinstance(error, NoSlotAvailable):
+        title = "Full"
+    elif isinstance(error, NotParked):
+        title = "Not found"
+    else:
+        title = "Error"
+    messagebox.showerror(title, str(error))
+
+metrics_window = None
+
+def open_metrics_panel():
+    """Debug window with live latency percentiles, counters and scheduler jobs."""
+    global metrics_window
+    if metrics_window is not None and metrics_window.winfo_exists():
+        metrics_window.lift()
+        return
+    win = metrics_window = tk.Toplevel(root)
+    win.title("ParkinUP - Metrics")
+    win.geometry("760x520")
+    win.configure(bg=COLORS['white'])
+
+    text = tk.Text(win, font=('Courier', 10), bg=COLORS['white'], fg=COLORS['gray_900'],
+                   relief='flat', wrap='none')
+    text.pack(fill="both", expand=True, padx=12, pady=(12, 0))
+
+    def refresh():
+        if not win.winfo_exists():
+            return False
+        body = metrics.dump_text() + "\n\n" + scheduler.dump_text()
+        if lane_manager.running:
+            body += "\n\n" + "\n".join(str(s) for s in lane_manager.stats())
+        text.config(state='normal')
+        text.delete("1.0", tk.END)
+        text.insert("1.0", body)
+        text.config(state='disabled')
+
+    def save_json():
+        path = filedialog.asksaveasfilename(parent=win, defaultextension=".json",
+                                            filetypes=[("JSON", "*.json")], initialfile="parkinup_metrics.json")
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(metrics.dump_json())
+
+    def copy_text():
+        win.clipboard_clear()
+        win.clipboard_append(metrics.dump_text())
+
+    buttons = tk.Frame(win, bg=COLORS['white'])
+    buttons.pack(fill="x", padx=12, pady=12)
+    for label, command in (("Reset", metrics.reset), ("Copy", copy_text), ("Save JSON…", save_json)):
+        tk.Button(buttons, text=label, command=command, bg=COLORS['white'], fg=COLORS['gray_900'],
+                  font=('Segoe UI', 10), relief='solid', bd=1, padx=12, cursor='hand2').pack(side="left", padx=(0, 8))
+
+    def profile_text():
+        return "■ Stop Profiling" if profiler.running else "● Start Profiling"
+
+    def toggle_from_panel():
+        toggle_profiling()
+        profile_btn.config(text=profile_text())
+
+    profile_btn = tk.Button(buttons, text=profile_text(), command=toggle_from_panel,
+                            bg=COLORS['white'], fg=COLORS['gray_900'],
+                            font=('Segoe UI', 10), relief='solid', bd=1, padx=12, cursor='hand2')
+    profile_btn.pack(side="right")
+    scheduler.every("metrics-panel", 1000, refresh, group="metrics-panel", run_now=True)
+    win.bind("<Destroy>", lambda e: e.widget is win and scheduler.cancel_group("metrics-panel"))
+
+def open_reports_window():
+    """Occupancy, dwell, turnover and revenue for a date range, with CSV export."""
+    # analytics pulls in NumPy, so it is only imported when a report is opened
+    import analytics
+
+    win = tk.Toplevel(root)
+    win.title("ParkinUP - Reports")
+    win.geometry("1000x700")
+    win.configure(bg=COLORS['white'])
+
+    today = get_clock().now().replace(hour=0, minute=0, second=0, microsecond=0)
+    controls = tk.Frame(win, bg=COLORS['white'])
+    controls.pack(fill="x", padx=12, pady=12)
+    from_var = tk.StringVar(value=(today - timedelta(days=6)).strftime("%Y-%m-%d"))
+    to_var = tk.StringVar(value=(today + timedelta(days=1)).strftime("%Y-%m-%d"))
+    bucket_var = tk.StringVar(value="hour")
+    for label, var, width in (("From", from_var, 12), ("To", to_var, 12)):
+        tk.Label(controls, text=label, font=('Segoe UI', 10), bg=COLORS['white']).pack(side="left", padx=(0, 4))
+        tk.Entry(controls, textvariable=var, width=width, font=('Segoe UI', 10)).pack(side="left", padx=(0, 12))
+    tk.Label(controls, text="Bucket", font=('Segoe UI', 10), bg=COLORS['white']).pack(side="left", padx=(0, 4))
+    ttk.Combobox(controls, textvariable=bucket_var, values=("hour", "day", "15"), width=6).pack(side="left")
+
+    summary_label = tk.Label(win, text="", font=('Segoe UI', 10), fg=COLORS['gray_700'], bg=COLORS['white'],
+                             justify="left", anchor="w")
+    summary_label.pack(fill="x", padx=12)
+    chart = tk.Canvas(win, height=180, bg=COLORS['gray_50'], highlightthickness=0)
+    chart.pack(fill="x", padx=12, pady=8)
+
+    tabs = ttk.Notebook(win)
+    tabs.pack(fill="both", expand=True, padx=12, pady=(0, 12))
+    tables = {}
+    for name, fields in (("Buckets", analytics.BUCKET_FIELDS), ("Slots", analytics.SLOT_FIELDS)):
+        frame = tk.Frame(tabs, bg=COLORS['white'])
+        tabs.add(frame, text=name)
+        tree = ttk.Treeview(frame, columns=fields, show="headings")
+        for col in fields:
+            tree.heading(col, text=col.replace("_", " ").title())
+            tree.column(col, anchor="center", width=110)
+        bar = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=bar.set)
+        bar.pack(side="right", fill="y")
+        tree.pack(fill="both", expand=True)
+        tables[name] = tree
+
+    state = {'report': None, 'error': None, 'running': False}
+
+    def draw_chart(report):
+        chart.delete("all")
+        width, height = max(chart.winfo_width(), 200), 180
+        values = report.avg_occupancy
+        top = max(report.capacity, int(report.peak_occupancy.max()) if len(values) else 0, 1)
+        if len(values) < 2:
+            return
+        step = (width - 20) / (len(values) - 1)
+        for series, color in ((report.peak_occupancy, COLORS['red_400']), (values, COLORS['blue_600'])):
+            points = []
+            # Thousands of buckets collapse to about one point per pixel column
+            stride = max(1, len(series) // (width - 20))
+            for i in range(0, len(series), stride):
+                points += [10 + i * step, height - 10 - float(series[i]) / top * (height - 20)]
+            if len(points) >= 4:
+                chart.create_line(*points, fill=color, width=1)
+        chart.create_text(12, 8, anchor="nw", fill=COLORS['gray_500'], font=('Segoe UI', 8),
+                          text=f"occupancy (blue: average, red: peak) of {report.capacity} slots")
+
+    def show_report():
+        report = state['report']
+        s = report.summary
+        summary_label.config(text=(
+            f"{s['from']} → {s['to']}   sessions {s['sessions']}   avg occupancy {s['avg_occupancy']} / {s['capacity']}"
+            f"   peak {s['peak_occupancy']} at {s['peak_at']}\n"
+            f"avg dwell {format_duration(int(s['avg_dwell_min']))} (median {format_duration(int(s['median_dwell_min']))})"
+            f"   turnover {s['turnover_per_slot_day']} / slot / day   revenue {format_currency(s['revenue'])}"
+            f"   computed in {s['load_s'] + s['compute_s']:.2f} s"))
+        for name, rows in (("Buckets", report.rows()), ("Slots", report.slot_rows())):
+            tree = tables[name]
+            tree.delete(*tree.get_children())
+            for row in rows:
+                tree.insert("", "end", values=tuple(row.values()))
+        draw_chart(report)
+
+    def poll():
+        if not win.winfo_exists():
+            return False
+        if state['running']:
+            return None
+        if state['error']:
+            messagebox.showerror("Reports", str(state['error']), parent=win)
+        elif state['report'] is not None:
+            show_report()
+        return False
+
+    def run():
+        if state['running']:
+            return
+        try:
+            start = datetime.strptime(from_var.get().strip(), "%Y-%m-%d").strftime("%Y-%m-%d %H:%M:%S")
+            end = datetime.strptime(to_var.get().strip(), "%Y-%m-%d").strftime("%Y-%m-%d %H:%M:%S")
+            analytics.bucket_seconds(bucket_var.get())
+        except ValueError as e:
+            messagebox.showerror("Reports", f"Check the dates (YYYY-MM-DD) and bucket: {e}", parent=win)
+            return
+        state.update(report=None, error=None, running=True)
+        summary_label.config(text="Computing…")
+
+        def work():
+            try:
+                state['report'] = analytics.compute(DB_PATH, start, end, bucket_var.get())
+            except Exception as e:
+                state['error'] = e
+            state['running'] = False
+
+        # Keep a year-long report off the UI thread; the scheduler picks up the result
+        threading.Thread(target=work, name="reports", daemon=True).start()
+        scheduler.every("reports-poll", 100, poll, group="reports")
+
+    def export(kind):
+        report = state['report']
+        if report is None:
+            messagebox.showinfo("Reports", "Run a report first.", parent=win)
+            return
+        path = filedialog.asksaveasfilename(parent=win, defaultextension=".csv", filetypes=[("CSV", "*.csv")],
+                                            initialfile=f"parkinup_{kind.lower()}.csv")
+        if not path:
+            return
+        if kind == "Buckets":
+            analytics.write_csv(path, report.rows(), analytics.BUCKET_FIELDS)
+        else:
+            analytics.write_csv(path, report.slot_rows(), analytics.SLOT_FIELDS)
+
+    for label, command in (("Run", run), ("Export Buckets CSV…", lambda: export("Buckets")),
+                           ("Export Slots CSV…", lambda: export("Slots"))):
+        tk.Button(controls, text=label, command=command, bg=COLORS['white'], fg=COLORS['gray_900'],
+                  font=('Segoe UI', 10), relief='solid', bd=1, padx=12, cursor='hand2').pack(side="left", padx=(12, 0))
+    win.bind("<Destroy>", lambda e: e.widget is win and scheduler.cancel_group("reports"))
+    run()
+
+def toggle_profiling(event=None):
+    """Start a cProfile/tracemalloc session, or stop it and show the top-N summary."""
+    if not profiler.running:
+        profiler.start()
+        log_ocr_result(f"Profiling started (files go to {PROFILES_DIR})")
+        return
+    paths = profiler.stop()
+    log_ocr_result(f"Profiling stopped: {paths.get('summary')}")
+    show_profile_summary(paths)
+
+def show_profile_summary(paths: dict):
+    win = tk.Toplevel(root)
+    win.title("ParkinUP - Profile Summary")
+    win.geometry("900x600")
+    tk.Label(win, text=f"Saved {paths.get('prof')}", font=('Segoe UI', 10),
+             fg=COLORS['gray_700']).pack(anchor="w", padx=12, pady=(12, 4))
+    text = tk.Text(win, font=('Courier', 9), wrap='none')
+    text.pack(fill="both", expand=True, padx=12, pady=(0, 12))
+    text.insert("1.0", profiler.last_summary)
+    text.config(state='disabled')
+
+def _on_profile_signal(signum, frame):
+    # Signal handlers run between bytecodes; defer Tk work to the event loop
+    root.after(0, toggle_profiling)
+
+def _signal_heartbeat():
+    # Tk's C main loop only yields to Python signal handlers when a callback runs
+    pass
 
 def log_ocr_result(text: str):
     """Log OCR result."""
     # ocr_text may not be global or available in all contexts now
+    metrics.incr("ocr.logged")
+    journal.append("ocr", text=text)
     print(f"OCR: {text}")
 
+def attach_plate_autocomplete(win, plate_frame, plate_entry, placeholder, limit=6):
+    """Show a dropdown of active plates matching what has been typed so far."""
+    dropdown = tk.Listbox(win, font=('Segoe UI', 12), height=limit, activestyle='none',
+                          relief='solid', bd=1, highlightthickness=0,
+                          bg=COLORS['white'], fg=COLORS['gray_900'],
+                          selectbackground=COLORS['blue_50'], selectforeground=COLORS['gray_900'])
+
+    def hide():
+        dropdown.place_forget()
+
+    def pick(e=None):
+        sel = dropdown.curselection()
+        if sel:
+            plate_entry.delete(0, tk.END)
+            plate_entry.insert(0, dropdown.get(sel[0]))
+            plate_entry.config(fg=COLORS['gray_900'])
+        hide()
+        plate_entry.focus_set()
+        plate_entry.icursor(tk.END)
+
+    def on_key(e):
+        if e.keysym in ("Down", "Up", "Return", "Escape", "Tab"):
+            return
+        text = plate_entry.get()
+        matches = plate_index.complete(text, limit) if text != placeholder else []
+        # Nothing to suggest once the entry already holds the only match
+        if not matches or matches == [text]:
+            hide()
+            return
+        dropdown.delete(0, tk.END)
+        for plate in matches:
+            dropdown.insert(tk.END, plate)
+        dropdown.config(height=len(matches))
+        dropdown.place(in_=plate_frame, relx=0, rely=1, relwidth=1)
+        dropdown.lift()
+
+    def focus_dropdown(e):
+        if dropdown.winfo_ismapped():
+            dropdown.focus_set()
+            dropdown.selection_clear(0, tk.END)
+            dropdown.selection_set(0)
+            dropdown.activate(0)
+            return "break"
+
+    plate_entry.bind("<KeyRelease>", on_key, add="+")
+    plate_entry.bind("<Down>", focus_dropdown, add="+")
+    plate_entry.bind("<Escape>", lambda e: hide(), add="+")
+    dropdown.bind("<ButtonRelease-1>", pick)
+    dropdown.bind("<Return>", pick)
+    dropdown.bind("<Escape>", lambda e: (hide(), plate_entry.focus_set()))
+
+
 def create_park_vehicle_popup(initial_plate=""):
     """Create a popup modal for parking a vehicle."""
     win = tk.Toplevel(root)
@@ -701,6 +983,7 @@ def create_park_vehicle_popup(initial_plate=""):
             
     plate_entry.bind("<FocusIn>", on_focus_in)
     plate_entry.bind("<FocusOut>", on_focus_out)
+    attach_plate_autocomplete(win, plate_frame, plate_entry, placeholder)
     
     def submit():
         plate = plate_entry.get().strip()
@@ -708,28 +991,14 @@ def create_park_vehicle_popup(initial_plate=""):
             messagebox.showwarning("Input", "Please enter a license plate.")
             return
         
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT slot_id, slot_number FROM slots WHERE is_occupied=0 LIMIT 1")
-        row = cur.fetchone()
-        if not row:
-            conn.close()
-            messagebox.showerror("Full", "No available slots.")
-            return
-        slot_id, slot_no = row
-        entry_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         try:
-            cur.execute("INSERT INTO vehicles (owner_name, vehicle_number, slot_id, entry_time) VALUES (?,?,?,?)",
-                       ("", plate, slot_id, entry_time))
-            cur.execute("UPDATE slots SET is_occupied=1 WHERE slot_id=?", (slot_id,))
-            conn.commit()
-            messagebox.showinfo("Parked", f"Vehicle parked in {slot_no}")
-            win.destroy()
-            refresh_main_table()
-        except sqlite3.IntegrityError:
-            messagebox.showerror("Error", "Vehicle already exists.")
-        finally:
-            conn.close()
+            session = service.park(plate)
+        except ParkingError as e:
+            show_parking_error(e)
+            return
+        messagebox.showinfo("Parked", f"Vehicle parked in {session['slot_number']}")
+        win.destroy()
+        refresh_main_table()
     
     # Buttons container
     btn_frame = tk.Frame(win, bg=COLORS['white'])
@@ -751,7 +1020,7 @@ def create_park_vehicle_popup(initial_plate=""):
     cancel_btn.config(highlightbackground=COLORS['gray_200'], bd=1)
 
 
-def create_exit_vehicle_popup():
+def create_exit_vehicle_popup(initial_plate=""):
     """Create a popup modal for exiting a vehicle."""
     win = tk.Toplevel(root)
     win.title("Exit Vehicle")
@@ -786,7 +1055,11 @@ def create_exit_vehicle_popup():
     plate_entry.pack(fill="x", padx=10, pady=8)
     
     placeholder = "ABC-1234"
-    plate_entry.insert(0, placeholder)
+    if initial_plate:
+        plate_entry.insert(0, initial_plate)
+        plate_entry.config(fg=COLORS['gray_900'])
+    else:
+        plate_entry.insert(0, placeholder)
     
     def on_focus_in(e):
         if plate_entry.get() == placeholder:
@@ -800,6 +1073,7 @@ def create_exit_vehicle_popup():
             
     plate_entry.bind("<FocusIn>", on_focus_in)
     plate_entry.bind("<FocusOut>", on_focus_out)
+    attach_plate_autocomplete(win, plate_frame, plate_entry, placeholder)
     
     def submit():
         plate = plate_entry.get().strip()
@@ -807,27 +1081,25 @@ def create_exit_vehicle_popup():
             messagebox.showwarning("Input", "Please enter license plate number.")
             return
         
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("""SELECT v.vehicle_id, v.entry_time, v.slot_id, s.slot_number
-                      FROM vehicles v JOIN slots s ON v.slot_id = s.slot_id
-                      WHERE v.vehicle_number=? AND v.exit_time IS NULL""", (plate,))
-        rec = cur.fetchone()
-        if not rec:
-            conn.close()
-            messagebox.showerror("Not found", "No active parked vehicle with this number.")
+        try:
+            receipt = service.exit(plate)
+        except NotParked as e:
+            # Offer the closest active plates before giving up (OCR/typing slips)
+            choice = choose_plate_candidate(win, plate)
+            if not choice:
+                show_parking_error(e)
+                return
+            try:
+                receipt = service.exit(choice)
+            except ParkingError as e2:
+                show_parking_error(e2)
+                return
+        except ParkingError as e:
+            # DatabaseBusy and other service errors: no candidates to offer
+            show_parking_error(e)
             return
-        vehicle_id, entry_time_str, slot_id, slot_no = rec
-        now = datetime.now()
-        exit_time_str = now.strftime("%Y-%m-%d %H:%M:%S")
-        minutes, amount = calculate_fee(entry_time_str, exit_time_str, rate_per_min=10/60)
-        cur.execute("UPDATE vehicles SET exit_time=? WHERE vehicle_id=?", (exit_time_str, vehicle_id))
-        cur.execute("UPDATE slots SET is_occupied=0 WHERE slot_id=?", (slot_id,))
-        cur.execute("INSERT INTO payments (vehicle_id, amount, payment_time) VALUES (?, ?, ?)",
-                   (vehicle_id, amount, exit_time_str))
-        conn.commit()
-        conn.close()
-        show_receipt(plate, entry_time_str, exit_time_str, minutes, amount, rate_per_min=10/60, slot_no=slot_no, vehicle_id=vehicle_id)
+        lane_manager.forget(receipt['plate'])
+        show_receipt(receipt)
         win.destroy()
         refresh_main_table()
     
@@ -863,6 +1135,61 @@ def create_exit_vehicle_popup():
     ocr_btn.config(highlightbackground=COLORS['gray_200'], bd=1)
 
 
+def choose_plate_candidate(parent, plate: str) -> str | None:
+    """Ask which active plate was meant when `plate` has no exact match.
+    Returns the chosen plate, or None if there are no candidates or the user cancels."""
+    candidates = plate_index.search(plate, limit=5)
+    if not candidates:
+        return None
+
+    previous_grab = parent.grab_current()
+    win = tk.Toplevel(parent)
+    win.title("Did you mean?")
+    win.configure(bg=COLORS['white'])
+    win.resizable(False, False)
+    win.transient(parent)
+    win.grab_set()
+
+    tk.Label(win, text=f"No parked vehicle with plate {plate}.", font=('Segoe UI', 11, 'bold'),
+            fg=COLORS['gray_900'], bg=COLORS['white']).pack(anchor="w", padx=20, pady=(15, 0))
+    tk.Label(win, text="Did you mean one of these?", font=('Segoe UI', 10),
+            fg=COLORS['gray_500'], bg=COLORS['white']).pack(anchor="w", padx=20, pady=(2, 8))
+
+    listbox = tk.Listbox(win, font=('Segoe UI', 12), height=len(candidates), activestyle='none',
+                         relief='solid', bd=1, highlightthickness=0)
+    for candidate, _ in candidates:
+        listbox.insert(tk.END, candidate)
+    listbox.selection_set(0)
+    listbox.pack(fill="x", padx=20)
+
+    result = {'plate': None}
+
+    def use_selected(e=None):
+        sel = listbox.curselection()
+        if sel:
+            result['plate'] = listbox.get(sel[0])
+        win.destroy()
+
+    listbox.bind("<Double-Button-1>", use_selected)
+    listbox.bind("<Return>", use_selected)
+
+    btn_frame = tk.Frame(win, bg=COLORS['white'])
+    btn_frame.pack(fill="x", padx=20, pady=15)
+    tk.Button(btn_frame, text="Use Plate", command=use_selected,
+              bg=COLORS['gray_600'], fg='white', font=('Segoe UI', 10, 'bold'),
+              relief='flat', bd=0, padx=15, pady=6).pack(side="right", padx=(10, 0))
+    tk.Button(btn_frame, text="Cancel", command=win.destroy,
+              bg=COLORS['white'], fg=COLORS['gray_900'], font=('Segoe UI', 10, 'bold'),
+              relief='solid', bd=1, padx=15, pady=6).pack(side="right")
+
+    listbox.focus_set()
+    win.wait_window()
+    # Give the modal grab back to the popup we were opened from
+    if previous_grab is not None and previous_grab.winfo_exists():
+        previous_grab.grab_set()
+    return result['plate']
+
+
 def create_ocr_popup():
     """Create a popup modal for OCR detection."""
     win = tk.Toplevel(root)
@@ -973,11 +1300,7 @@ def create_view_slots_popup():
             font=('Segoe UI', 10), fg=COLORS['gray_500'], bg=COLORS['white']).pack(anchor="w", pady=(3, 0))
 
     # Fetch slots from DB
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT slot_number, is_occupied FROM slots ORDER BY CAST(SUBSTR(slot_number, 6) AS INTEGER)")
-    slots = cur.fetchall()
-    conn.close()
+    slots = service.slots()
 
     # Grid of slots
     container_frame = tk.Frame(win, bg=COLORS['white'], padx=20, pady=10)
@@ -994,13 +1317,7 @@ def create_view_slots_popup():
 
     def show_slot_details(slot_name, is_occ):
         if is_occ:
-            conn = get_connection()
-            cur = conn.cursor()
-            cur.execute("""SELECT v.vehicle_number, v.owner_name, v.entry_time 
-                           FROM vehicles v JOIN slots s ON v.slot_id = s.slot_id 
-                           WHERE s.slot_number=? AND v.exit_time IS NULL""", (slot_name,))
-            res = cur.fetchone()
-            conn.close()
+            res = service.slot_occupant(slot_name)
             if res:
                 vnum, owner, entry = res
                 msg = f"Slot: {slot_name}\nStatus: Occupied\nVehicle: {vnum}\nOwner: {owner}\nEntry: {entry}"
@@ -1080,28 +1397,14 @@ def add_vehicle_window():
         if not vnum:
             messagebox.showwarning("Input", "Please enter a vehicle number.")
             return
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT slot_id, slot_number FROM slots WHERE is_occupied=0 LIMIT 1")
-        row = cur.fetchone()
-        if not row:
-            conn.close()
-            messagebox.showerror("Full", "No available slots.")
-            return
-        slot_id, slot_no = row
-        entry_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         try:
-            cur.execute("INSERT INTO vehicles (owner_name, vehicle_number, slot_id, entry_time) VALUES (?,?,?,?)",
-                        (owner, vnum, slot_id, entry_time))
-            cur.execute("UPDATE slots SET is_occupied=1 WHERE slot_id=?", (slot_id,))
-            conn.commit()
-            messagebox.showinfo("Parked", f"Vehicle parked in {slot_no}")
-            win.destroy()
-            refresh_main_table()
-        except sqlite3.IntegrityError:
-            messagebox.showerror("Error", "Vehicle number already exists.")
-        finally:
-            conn.close()
+            session = service.park(vnum, owner)
+        except ParkingError as e:
+            show_parking_error(e)
+            return
+        messagebox.showinfo("Parked", f"Vehicle parked in {session['slot_number']}")
+        win.destroy()
+        refresh_main_table()
 
     win = tk.Toplevel(root)
     win.title("Park Vehicle")
@@ -1131,27 +1434,24 @@ def exit_vehicle_window():
         if not vnum:
             messagebox.showwarning("Input", "Please enter vehicle number.")
             return
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("""SELECT v.vehicle_id, v.entry_time, v.slot_id, s.slot_number
-                       FROM vehicles v JOIN slots s ON v.slot_id = s.slot_id
-                       WHERE v.vehicle_number=? AND v.exit_time IS NULL""", (vnum,))
-        rec = cur.fetchone()
-        if not rec:
-            conn.close()
-            messagebox.showerror("Not found", "No active parked vehicle with this number.")
+        try:
+            receipt = service.exit(vnum)
+        except NotParked as e:
+            choice = choose_plate_candidate(win, vnum)
+            if not choice:
+                show_parking_error(e)
+                return
+            try:
+                receipt = service.exit(choice)
+            except ParkingError as e2:
+                show_parking_error(e2)
+                return
+        except ParkingError as e:
+            # DatabaseBusy and other service errors: no candidates to offer
+            show_parking_error(e)
             return
-        vehicle_id, entry_time_str, slot_id, slot_no = rec
-        now = datetime.now()
-        exit_time_str = now.strftime("%Y-%m-%d %H:%M:%S")
-        minutes, amount = calculate_fee(entry_time_str, exit_time_str, rate_per_min=10/60)
-        cur.execute("UPDATE vehicles SET exit_time=? WHERE vehicle_id=?", (exit_time_str, vehicle_id))
-        cur.execute("UPDATE slots SET is_occupied=0 WHERE slot_id=?", (slot_id,))
-        cur.execute("INSERT INTO payments (vehicle_id, amount, payment_time) VALUES (?, ?, ?)",
-                    (vehicle_id, amount, exit_time_str))
-        conn.commit()
-        conn.close()
-        show_receipt(vnum, entry_time_str, exit_time_str, minutes, amount, rate_per_min=10/60, slot_no=slot_no, vehicle_id=vehicle_id)
+        lane_manager.forget(receipt['plate'])
+        show_receipt(receipt)
         win.destroy()
         refresh_main_table()
 
@@ -1185,14 +1485,8 @@ def view_parked_window():
         tree.column(col, anchor="center", width=180)
     tree.pack(expand=True, fill="both", padx=8, pady=8)
     
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""SELECT v.owner_name, v.vehicle_number, s.slot_number, v.entry_time
-                   FROM vehicles v JOIN slots s ON v.slot_id=s.slot_id
-                   WHERE v.exit_time IS NULL ORDER BY v.entry_time DESC""")
-    for row in cur.fetchall():
-        tree.insert("", "end", values=row)
-    conn.close()
+    for vehicle_number, slot_number, entry_time, owner in service.active_sessions():
+        tree.insert("", "end", values=(owner, vehicle_number, slot_number, entry_time))
 
 def payments_window():
     win = tk.Toplevel(root)
@@ -1206,16 +1500,9 @@ def payments_window():
         tree.column(col, anchor="center", width=180)
     tree.pack(expand=True, fill="both", padx=8, pady=8)
     
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""SELECT v.vehicle_number, p.amount, p.payment_time
-                   FROM payments p JOIN vehicles v ON p.vehicle_id=v.vehicle_id
-                   ORDER BY p.payment_time DESC""")
-    for row in cur.fetchall():
+    for row in service.payments():
         tree.insert("", "end", values=row)
-    cur.execute("SELECT COALESCE(SUM(amount),0) FROM payments")
-    total = cur.fetchone()[0] or 0
-    conn.close()
+    total = service.total_revenue()
     tk.Label(win, text=f"Total Revenue: P{round(total,2)}", font=('Segoe UI', 12, 'bold'),
             bg=COLORS['white']).pack(pady=6)
 
@@ -1231,29 +1518,17 @@ def vehicles_window():
         tree.column(col, anchor="center", width=140)
     tree.pack(expand=True, fill="both", padx=8, pady=8)
     
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""SELECT v.owner_name, v.vehicle_number, v.entry_time, v.exit_time
-                   FROM vehicles v ORDER BY v.entry_time DESC""")
-    for row in cur.fetchall():
+    for row in service.vehicle_history():
         owner, vehicle, entry, exit_time = row
         status = "Parked" if exit_time is None else "Exited"
         row_values = (owner, vehicle, entry, exit_time or "-", status)
         tree.insert("", "end", values=row_values)
-    conn.close()
 
 def open_parking_overview():
     """Fetch slot data and show the grid overview modal."""
     try:
-        conn = get_connection()
-        cur = conn.cursor()
-        # Sort by slot number to ensure consistent 4x5 grid layout
-        cur.execute("""SELECT slot_number, is_occupied 
-                       FROM slots 
-                       ORDER BY CAST(SUBSTR(slot_number, INSTR(slot_number, '-') + 1) AS INTEGER) 
-                       LIMIT 20""")
-        rows = cur.fetchall()
-        conn.close()
+        # Sorted by slot number to ensure consistent 4x5 grid layout
+        rows = service.slots(limit=20)
         
         slots_data = []
         for number, occupied in rows:
@@ -1285,13 +1560,7 @@ def slot_status_window():
         table.column(c, anchor="center", width=200)
     table.pack(expand=True, fill="both", padx=12, pady=12)
     
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""SELECT slot_number, is_occupied 
-                   FROM slots 
-                   ORDER BY CAST(SUBSTR(slot_number, INSTR(slot_number, '-') + 1) AS INTEGER)""")
-    rows = cur.fetchall()
-    conn.close()
+    rows = service.slots()
     
     for s, occ in rows:
         status = "Occupied" if occ else "Available"
@@ -1326,20 +1595,7 @@ def add_slots_window():
             messagebox.showerror("Invalid", "Enter a valid positive number.")
             return
 
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("""CREATE TABLE IF NOT EXISTS slots (
-                        slot_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        slot_number TEXT UNIQUE NOT NULL,
-                        is_occupied INTEGER DEFAULT 0
-                       );""")
-        for i in range(1, total + 1):
-            slot_name = f"Slot-{i}"
-            cur.execute("INSERT OR IGNORE INTO slots (slot_number, is_occupied) VALUES (?, 0)", (slot_name,))
-        conn.commit()
-        cur.execute("SELECT COUNT(*) FROM slots")
-        count = cur.fetchone()[0]
-        conn.close()
+        count = service.add_slots(total)
 
         messagebox.showinfo("Success", f"Slots updated!\nTotal slots: {count}")
         win.destroy()
@@ -1351,97 +1607,34 @@ def add_slots_window():
     b.bind("<Enter>", lambda e, b=b: b.config(bg=COLORS['blue_700']))
     b.bind("<Leave>", lambda e, b=b: b.config(bg=COLORS['blue_600']))
 
-def show_receipt(plate: str, time_in: str, time_out: str, minutes: int, amount: float,
-                 rate_per_min: float = 1.0, slot_no: str | None = None, vehicle_id: int | None = None):
-    """Display a formatted receipt window similar to the provided sample."""
-    win = tk.Toplevel(root)
-    win.title("ParkinUP - Receipt")
-    win.geometry("420x420")
-    win.resizable(False, False)
-    win.configure(bg=COLORS['white'])
-    
-    frame = tk.Frame(win, bg=COLORS['white'], bd=12)
-    frame.pack(expand=True, fill="both")
-
-    # Logo in receipt
+def show_receipt(receipt: dict):
+    """Display the receipt for a finished session, with Print and Save PDF."""
+    logo = None
     if PIL_AVAILABLE:
         try:
-            logo_path = os.path.join(os.path.dirname(__file__), "..", "docs", "logo.png")
-            if not os.path.exists(logo_path):
-                 logo_path = os.path.join(os.path.dirname(__file__), "docs", "logo.png")
-            
-            logo_img = Image.open(logo_path)
-            logo_img = logo_img.resize((140, 50), Image.Resampling.LANCZOS)
-            logo_photo = ImageTk.PhotoImage(logo_img)
-            logo_label = tk.Label(frame, image=logo_photo, bg=COLORS['white'])
-            logo_label.image = logo_photo  # Keep a reference
-            logo_label.pack()
+            logo = load_photo(LOGO_PATHS, (140, 50))
         except Exception:
-            title = tk.Label(frame, text="ParkinUP", font=('Segoe UI', 18, 'bold'), bg=COLORS['white'])
-            title.pack()
-    else:
-        title = tk.Label(frame, text="ParkinUP", font=('Segoe UI', 18, 'bold'), bg=COLORS['white'])
-        title.pack()
-    subtitle = tk.Label(frame, text="Automated Parking System", font=('Segoe UI', 10), bg=COLORS['white'])
-    subtitle.pack()
-
-    sep = ttk.Separator(frame, orient="horizontal")
-    sep.pack(fill="x", pady=8)
-
-    body = tk.Frame(frame, bg=COLORS['white'])
-    body.pack(fill="both", expand=True, padx=6)
-
-    # Use monospace layout for receipt-like appearance
-    mono = ("Courier", 10)
-
-    def row(label_text, value_text):
-        r = tk.Frame(body, bg=COLORS['white'])
-        r.pack(fill="x", pady=2)
-        tk.Label(r, text=label_text, font=mono, bg=COLORS['white']).pack(side="left")
-        tk.Label(r, text=value_text, font=mono, bg=COLORS['white']).pack(side="right")
-
-    row("Plate Number:", plate)
-    row("Time-In:", time_in)
-    row("Time-Out:", time_out)
-    # duration display in hours/minutes if >59
-    if minutes >= 60:
-        hrs = minutes // 60
-        mins = minutes % 60
-        dur_text = f"{hrs} hr {mins} min" if mins else f"{hrs} hr"
-    else:
-        dur_text = f"{minutes} min"
-    row("Duration:", dur_text)
-    per_hour = round(rate_per_min * 60, 2)
-    row("Rate:", f"{format_currency(per_hour)}/hour")
-
-    sep2 = ttk.Separator(body, orient="horizontal")
-    sep2.pack(fill="x", pady=8)
+            logo = None
 
-    total_frame = tk.Frame(body, bg=COLORS['white'])
-    total_frame.pack(fill="x")
-    tk.Label(total_frame, text="TOTAL FEE:", font=('Segoe UI', 12, 'bold'), bg=COLORS['white']).pack(side="left")
-    tk.Label(total_frame, text=f"{format_currency(amount)}", font=('Segoe UI', 12, 'bold'), bg=COLORS['white']).pack(side="right")
+    def print_receipt():
+        if not print_queue.submit(receipt):
+            messagebox.showwarning("Print", "The printer queue is full; try again shortly.", parent=win)
 
-    sep3 = ttk.Separator(frame, orient="horizontal")
-    sep3.pack(fill="x", pady=8)
+    def save_pdf():
+        path = filedialog.asksaveasfilename(parent=win, defaultextension=".pdf", filetypes=[("PDF", "*.pdf")],
+                                            initialfile=f"{transaction_id(receipt)}.pdf")
+        if path:
+            render_pdf(receipt, path)
 
-    txn_id = f"TXN-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-    if vehicle_id:
-        txn_id = f"TXN-{datetime.now().strftime('%Y%m%d%H%M%S')}-{vehicle_id}"
-
-    thank = tk.Label(frame, text="Thank you for parking with us!", font=('Segoe UI', 9), bg=COLORS['white'])
-    thank.pack()
-    tx = tk.Label(frame, text=f"Transaction ID: {txn_id}", font=('Segoe UI', 9), bg=COLORS['white'])
-    tx.pack()
-
-    btn = tk.Button(frame, text="Close", command=win.destroy, bg=COLORS['blue_600'], fg="white", width=12,
-                   font=('Segoe UI', 10, 'bold'), relief='flat', bd=0)
-    btn.pack(pady=10)
+    win = show_receipt_dialog(root, receipt_layout(receipt), logo=logo,
+                              actions=(("Print", print_receipt), ("Save PDF…", save_pdf)))
 
 def detect_plate_window():
     """Capture current frame and detect plate using OCR, show result."""
     plate = None
     try:
+        cam_frame = lane_manager.primary_frame()
+        cv2 = load("cv2")
         if cam_frame is not None and cv2 is not None:
             import tempfile
             fd, path = tempfile.mkstemp(suffix=".jpg")
@@ -1468,11 +1661,33 @@ def detect_plate_window():
 # ---------- On Close ----------
 def on_app_close():
     stop_camera()
+    if profiler.running:
+        profiler.stop()
+    print_queue.close()
+    journal.close()
+    scheduler.cancel_all()
     root.destroy()
 
 root.protocol("WM_DELETE_WINDOW", on_app_close)
+root.bind_all("<Control-P>", toggle_profiling)
+if hasattr(signal, "SIGUSR1"):
+    signal.signal(signal.SIGUSR1, _on_profile_signal)
+    scheduler.every("signal-heartbeat", 500, _signal_heartbeat)
+
+pages.register('home', lambda page: create_homepage(page, on_start_now=show_login,
+                                                   on_learn_more=show_learn_more_dialog))
+pages.register('login', lambda page: create_login_page(page, on_login=show_dashboard, on_back=navigate_home))
+pages.register('dashboard', setup_dashboard, on_show=on_dashboard_shown, on_hide=on_dashboard_hidden)
 
 # Show homepage initially
-create_homepage(root, on_start_now=show_login, on_learn_more=show_learn_more_dialog)
+navigate_to('home')
+
+def _on_first_paint():
+    # Warm up OpenCV/pytesseract off the UI thread once the window is up
+    preload()
+    if os.environ.get("PARKINUP_STARTUP_PROBE"):
+        print(f"PARKINUP_FIRST_WINDOW {time.perf_counter() - _STARTUP_T0:.4f}", flush=True)
+        on_app_close()
 
+root.after_idle(lambda: root.after(1, _on_first_paint))
 root.mainloop()
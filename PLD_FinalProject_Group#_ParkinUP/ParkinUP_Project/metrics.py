@@ -0,0 +1,165 @@
+"""In-process timers and counters for gate operations.
+
+    from metrics import metrics
+    with metrics.timer("service.park"):
+        ...
+    metrics.incr("ocr.bursts")
+    print(metrics.dump_text())
+
+Every timer keeps a count, total, max and a rolling window of the latest
+samples; percentiles (p50/p95/p99) are only computed when a snapshot is
+taken, so recording costs two perf_counter() calls and a deque append.
+"""
+import json
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+DEFAULT_WINDOW = 2048
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+class Histogram:
+    """Latency samples in seconds: lifetime count/total/max plus a rolling window."""
+
+    __slots__ = ('count', 'total', 'max', 'samples')
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.samples.append(seconds)
+
+    def summary(self) -> dict:
+        window = sorted(self.samples)
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count * 1000.0, 3) if self.count else 0.0,
+            'p50_ms': round(percentile(window, 50) * 1000.0, 3),
+            'p95_ms': round(percentile(window, 95) * 1000.0, 3),
+            'p99_ms': round(percentile(window, 99) * 1000.0, 3),
+            'max_ms': round(self.max * 1000.0, 3),
+        }
+
+
+class _Timer:
+    __slots__ = ('hist', 'start')
+
+    def __init__(self, hist: Histogram):
+        self.hist = hist
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """Named histograms and counters. Thread-safe enough for monitoring:
+    updates rely on the GIL rather than a lock, so a concurrent snapshot may
+    be off by a sample."""
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self.window = window
+        self.enabled = True
+        self._hists: dict[str, Histogram] = {}
+        self._counters: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+
+    def _hist(self, name: str) -> Histogram:
+        hist = self._hists.get(name)
+        if hist is None:
+            with self._lock:
+                hist = self._hists.setdefault(name, Histogram(self.window))
+        return hist
+
+    def timer(self, name: str):
+        """Context manager recording the block's duration under name."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self._hist(name))
+
+    def timed(self, name: str):
+        """Decorator form of timer()."""
+        def decorate(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def observe(self, name: str, seconds: float):
+        if self.enabled:
+            self._hist(name).observe(seconds)
+
+    def incr(self, name: str, n: int = 1):
+        if self.enabled:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def reset(self):
+        with self._lock:
+            self._hists.clear()
+            self._counters.clear()
+            self._started = time.monotonic()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            hists = list(self._hists.items())
+            counters = dict(self._counters)
+        return {
+            'uptime_s': round(time.monotonic() - self._started, 1),
+            'timers': {name: hist.summary() for name, hist in sorted(hists)},
+            'counters': dict(sorted(counters.items())),
+        }
+
+    def dump_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def dump_text(self) -> str:
+        snap = self.snapshot()
+        lines = [f"uptime {snap['uptime_s']} s",
+                 f"{'timer':<34}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+        for name, s in snap['timers'].items():
+            lines.append(f"{name:<34}{s['count']:>8}{s['p50_ms']:>10.3f}{s['p95_ms']:>10.3f}"
+                         f"{s['p99_ms']:>10.3f}{s['max_ms']:>10.3f}")
+        if snap['counters']:
+            lines.append("")
+            lines.append(f"{'counter':<34}{'value':>8}")
+            for name, value in snap['counters'].items():
+                lines.append(f"{name:<34}{value:>8}")
+        return "\n".join(lines)
+
+
+# Process-wide registry used by the service, OCR, lanes and the GUI
+metrics = Metrics()
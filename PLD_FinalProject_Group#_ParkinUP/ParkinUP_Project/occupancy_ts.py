@@ -0,0 +1,374 @@
+"""Occupancy time series: change events plus minute/hour/day rollups.
+
+Every park and exit records, in the same transaction, one row in
+occupancy_events (epoch second, +1/-1, lot occupancy after the change) and
+upserts the enclosing minute, hour and day rows of occupancy_rollup
+(occupancy at bucket start, min, max, close, occupied-seconds, events).
+Both tables are keyed for index lookups, so
+
+    from occupancy_ts import as_of, series
+    as_of(conn, "2025-01-07 08:15:00")            # {'occupied': 137, 'exact': True, ...}
+    series(conn, "2025-01-07 00:00:00", "2025-01-08 00:00:00", "hour")
+
+cost O(log n) for an as-of and O(log n + buckets) for a range, without
+touching vehicles. Storage is bounded by RETENTION: raw events are kept 35
+days, minute rollups 90 days, hour rollups two years and day rollups for
+good; compact() runs automatically every COMPACT_EVERY events. As-of
+queries older than the raw events fall back to the finest rollup left and
+are then marked exact=False when the instant falls inside a bucket that
+changed.
+
+The tables come from migration 2 in utils.SCHEMA_MIGRATIONS; a database
+that already has history is backfilled from vehicles on first start.
+
+Usage:
+    python occupancy_ts.py backfill --db parking.db      # rebuild from vehicles history
+    python occupancy_ts.py as-of    --db parking.db "2025-01-07 08:15:00"
+    python occupancy_ts.py range    --db parking.db --from 2025-01-07 --to 2025-01-08 [--resolution hour]
+    python occupancy_ts.py stats    --db parking.db
+"""
+import argparse
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+EPOCH = datetime(1970, 1, 1)
+RESOLUTIONS = {'minute': 60, 'hour': 3600, 'day': 86400}
+# Seconds of history kept per table; None keeps everything
+RETENTION = {'raw': 35 * 86400, 60: 90 * 86400, 3600: 730 * 86400, 86400: None}
+COMPACT_EVERY = 1000
+
+# excluded.* is the new event; the SET expressions see the row's old values,
+# so close_occ there is still the occupancy before this event
+UPSERT_ROLLUP = """INSERT INTO occupancy_rollup
+    (resolution, bucket, open_occ, min_occ, max_occ, close_occ, occ_seconds, last_ts, events)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)
+    ON CONFLICT (resolution, bucket) DO UPDATE SET
+        occ_seconds = occ_seconds + close_occ * (excluded.last_ts - last_ts),
+        min_occ = MIN(min_occ, excluded.close_occ),
+        max_occ = MAX(max_occ, excluded.close_occ),
+        close_occ = excluded.close_occ,
+        last_ts = excluded.last_ts,
+        events = events + 1"""
+
+
+def to_epoch(value) -> int:
+    """Epoch seconds of a naive local datetime or 'YYYY-MM-DD HH:MM:SS' string (no timezone shift)."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return (value - EPOCH) // timedelta(seconds=1)
+
+
+def from_epoch(ts: int) -> str:
+    return (EPOCH + timedelta(seconds=ts)).strftime(TIME_FORMAT)
+
+
+def _rollup_rows(ts: int, prev: int, level: int):
+    for res in RESOLUTIONS.values():
+        bucket = ts - ts % res
+        yield (res, bucket, prev, min(prev, level), max(prev, level), level, prev * (ts - bucket), ts)
+
+
+# ---------- Writing ----------
+def record(cur, when, delta: int) -> int:
+    """Record an occupancy change inside the caller's transaction. Returns the new occupancy.
+
+    Call it after the slot update so a series that starts on an existing
+    database is seeded from the current slot count. A change stamped
+    before the latest recorded one (another terminal committed a later
+    stamp first) is slotted in at its time; see _record_late.
+    """
+    ts = to_epoch(when)
+    row = cur.execute("SELECT ts, occupied FROM occupancy_events ORDER BY ts DESC, event_id DESC LIMIT 1").fetchone()
+    if row is None:
+        level = cur.execute("SELECT COALESCE(SUM(is_occupied), 0) FROM slots").fetchone()[0]
+        prev = level - delta
+    elif row[0] > ts:
+        return _record_late(cur, ts, delta)
+    else:
+        prev = row[1]
+        level = prev + delta
+    cur.execute("INSERT INTO occupancy_events (ts, delta, occupied) VALUES (?, ?, ?)", (ts, delta, level))
+    event_id = cur.lastrowid
+    cur.executemany(UPSERT_ROLLUP, _rollup_rows(ts, prev, level))
+    if event_id % COMPACT_EVERY == 0:
+        compact(cur, ts)
+    return level
+
+
+def _record_late(cur, ts: int, delta: int) -> int:
+    """Insert a change older than the latest event and fix up everything after it.
+
+    Later events and rollup buckets shift by delta; the buckets holding ts
+    get the change folded in (min/max re-read from their raw events).
+    Costs O(events and buckets after ts), which is a handful when the
+    change is only seconds late.
+    """
+    row = cur.execute("SELECT occupied FROM occupancy_events WHERE ts <= ? ORDER BY ts DESC, event_id DESC LIMIT 1",
+                      (ts,)).fetchone()
+    if row is None:
+        # Older than all history: start from the level before the first event
+        row = cur.execute("SELECT occupied - delta FROM occupancy_events ORDER BY ts, event_id LIMIT 1").fetchone()
+    prev = row[0]
+    level = prev + delta
+    cur.execute("UPDATE occupancy_events SET occupied = occupied + ? WHERE ts > ?", (delta, ts))
+    cur.execute("INSERT INTO occupancy_events (ts, delta, occupied) VALUES (?, ?, ?)", (ts, delta, level))
+    event_id = cur.lastrowid
+    for rollup in _rollup_rows(ts, prev, level):
+        res, bucket = rollup[0], rollup[1]
+        last = cur.execute("SELECT last_ts FROM occupancy_rollup WHERE resolution = ? AND bucket = ?",
+                           (res, bucket)).fetchone()
+        if last is None or last[0] <= ts:
+            # Latest change in its bucket: the usual upsert applies
+            cur.execute(UPSERT_ROLLUP, rollup)
+        else:
+            cur.execute("UPDATE occupancy_rollup SET close_occ = close_occ + ?, "
+                        "occ_seconds = occ_seconds + ? * (last_ts - ?), events = events + 1 "
+                        "WHERE resolution = ? AND bucket = ?", (delta, delta, ts, res, bucket))
+            lo, hi = cur.execute("SELECT MIN(occupied), MAX(occupied) FROM occupancy_events WHERE ts >= ? AND ts < ?",
+                                 (bucket, bucket + res)).fetchone()
+            cur.execute("UPDATE occupancy_rollup SET min_occ = MIN(open_occ, ?), max_occ = MAX(open_occ, ?) "
+                        "WHERE resolution = ? AND bucket = ?", (lo, hi, res, bucket))
+        cur.execute("UPDATE occupancy_rollup SET open_occ = open_occ + ?, min_occ = min_occ + ?, "
+                    "max_occ = max_occ + ?, close_occ = close_occ + ?, occ_seconds = occ_seconds + ? * (last_ts - bucket) "
+                    "WHERE resolution = ? AND bucket > ?", (delta, delta, delta, delta, delta, res, bucket))
+    if event_id % COMPACT_EVERY == 0:
+        compact(cur, ts)
+    return level
+
+
+def compact(cur, now_ts: int) -> dict:
+    """Delete rows older than RETENTION allows. Returns rows deleted per table."""
+    deleted = {}
+    horizon = RETENTION['raw']
+    if horizon is not None:
+        deleted['raw'] = cur.execute("DELETE FROM occupancy_events WHERE ts < ?", (now_ts - horizon,)).rowcount
+    for res in RESOLUTIONS.values():
+        horizon = RETENTION[res]
+        if horizon is not None:
+            deleted[res] = cur.execute("DELETE FROM occupancy_rollup WHERE resolution = ? AND bucket < ?",
+                                       (res, now_ts - horizon)).rowcount
+    return deleted
+
+
+def seed_if_empty(db_path: str):
+    """Backfill once on a database that has history but no series yet. Returns the summary or None."""
+    conn = sqlite3.connect(db_path)
+    try:
+        needed = (conn.execute("SELECT 1 FROM occupancy_events LIMIT 1").fetchone() is None
+                  and conn.execute("SELECT 1 FROM vehicles LIMIT 1").fetchone() is not None)
+    finally:
+        conn.close()
+    return backfill(db_path) if needed else None
+
+
+def _fold(events, res: int, since: int):
+    """Rollup rows at one resolution from time-ordered (ts, prev, level) events at or after since."""
+    rows = []
+    bucket = None
+    for ts, prev, level in events:
+        if ts < since:
+            continue
+        b = ts - ts % res
+        if b != bucket:
+            if bucket is not None:
+                rows.append((res, bucket, open_occ, lo, hi, close, occ_s, last_ts, n))
+            bucket, open_occ, close, occ_s, last_ts, n = b, prev, level, prev * (ts - b), ts, 1
+            lo, hi = (prev, level) if prev < level else (level, prev)
+        else:
+            occ_s += close * (ts - last_ts)
+            if level < lo:
+                lo = level
+            elif level > hi:
+                hi = level
+            close, last_ts = level, ts
+            n += 1
+    if bucket is not None:
+        rows.append((res, bucket, open_occ, lo, hi, close, occ_s, last_ts, n))
+    return rows
+
+
+def backfill(db_path: str, now=None) -> dict:
+    """Rebuild the series from vehicles history (replaces whatever is there).
+
+    Only rows inside RETENTION (relative to now, default the last event) are written.
+    """
+    began = time.perf_counter()
+    conn = sqlite3.connect(db_path)
+    try:
+        # SQLite parses the timestamps far faster than strptime
+        changes = []
+        for entry_ts, exit_ts in conn.execute("SELECT CAST(strftime('%s', entry_time) AS INTEGER), "
+                                              "CAST(strftime('%s', exit_time) AS INTEGER) FROM vehicles"):
+            changes.append((entry_ts, 1))
+            if exit_ts is not None:
+                changes.append((exit_ts, -1))
+        # Exits before entries in the same second, as a freed slot is reused
+        changes.sort()
+        events = []
+        level = 0
+        for ts, delta in changes:
+            events.append((ts, level, level + delta))
+            level += delta
+        now_ts = to_epoch(now) if now is not None else (events[-1][0] if events else 0)
+        since = {key: now_ts - horizon if horizon is not None else 0
+                 for key, horizon in RETENTION.items()}
+        rollups = []
+        for res in RESOLUTIONS.values():
+            # Start on a bucket boundary so the first bucket is complete
+            rollups += _fold(events, res, since[res] - since[res] % res)
+        raw_since = since['raw']
+        cur = conn.cursor()
+        cur.execute("DELETE FROM occupancy_events")
+        cur.execute("DELETE FROM occupancy_rollup")
+        cur.executemany("INSERT INTO occupancy_events (ts, delta, occupied) VALUES (?, ?, ?)",
+                        ((ts, level - prev, level) for ts, prev, level in events if ts >= raw_since))
+        cur.executemany("INSERT INTO occupancy_rollup (resolution, bucket, open_occ, min_occ, max_occ, close_occ, "
+                        "occ_seconds, last_ts, events) VALUES (?,?,?,?,?,?,?,?,?)", rollups)
+        written = cur.execute("SELECT COUNT(*) FROM occupancy_events").fetchone()[0]
+        conn.commit()
+    finally:
+        conn.close()
+    return {'changes': len(events), 'events': written, 'rollups': len(rollups),
+            'elapsed_s': round(time.perf_counter() - began, 3)}
+
+
+# ---------- Queries ----------
+def as_of(conn, when) -> dict:
+    """Lot occupancy at `when` (datetime, string or epoch seconds)."""
+    ts = when if isinstance(when, int) else to_epoch(when)
+    oldest = conn.execute("SELECT MIN(ts) FROM occupancy_events").fetchone()[0]
+    if oldest is not None and ts >= oldest:
+        occupied = conn.execute("SELECT occupied FROM occupancy_events WHERE ts <= ? "
+                                "ORDER BY ts DESC, event_id DESC LIMIT 1", (ts,)).fetchone()[0]
+        return {'at': from_epoch(ts), 'occupied': occupied, 'exact': True, 'resolution': 'event'}
+    # Finer rollups are kept at least as long as raw events, so the first
+    # resolution with a bucket at or before ts has every later change too
+    for name, res in RESOLUTIONS.items():
+        row = conn.execute("SELECT bucket, min_occ, max_occ, close_occ FROM occupancy_rollup "
+                           "WHERE resolution = ? AND bucket <= ? ORDER BY bucket DESC LIMIT 1", (res, ts)).fetchone()
+        if row is None:
+            continue
+        bucket, lo, hi, close = row
+        if bucket + res <= ts:
+            # Nothing changed between that bucket and ts
+            return {'at': from_epoch(ts), 'occupied': close, 'exact': True, 'resolution': name}
+        return {'at': from_epoch(ts), 'occupied': close, 'exact': False, 'resolution': name,
+                'min': lo, 'max': hi}
+    # Before any recorded history
+    return {'at': from_epoch(ts), 'occupied': 0, 'exact': True, 'resolution': None}
+
+
+def series(conn, start, end, resolution: str = "hour") -> list[dict]:
+    """Per-bucket open/min/max/close and time-weighted average occupancy for [start, end).
+
+    Buckets with no events carry the previous level forward.
+    """
+    res = RESOLUTIONS[resolution]
+    t0 = to_epoch(start)
+    t0 -= t0 % res
+    t1 = to_epoch(end)
+    rows = {r[0]: r[1:] for r in conn.execute(
+        "SELECT bucket, open_occ, min_occ, max_occ, close_occ, occ_seconds, last_ts FROM occupancy_rollup "
+        "WHERE resolution = ? AND bucket >= ? AND bucket < ? ORDER BY bucket", (res, t0, t1))}
+    level = as_of(conn, t0)['occupied'] if t0 not in rows else None
+    out = []
+    for bucket in range(t0, t1, res):
+        row = rows.get(bucket)
+        if row is None:
+            out.append({'bucket': from_epoch(bucket), 'open': level, 'min': level, 'max': level,
+                        'close': level, 'avg': float(level)})
+            continue
+        open_occ, lo, hi, close, occ_s, last_ts = row
+        avg = (occ_s + close * (bucket + res - last_ts)) / res
+        out.append({'bucket': from_epoch(bucket), 'open': open_occ, 'min': lo, 'max': hi,
+                    'close': close, 'avg': round(avg, 3)})
+        level = close
+    return out
+
+
+def stats(conn) -> dict:
+    out = {'events': conn.execute("SELECT COUNT(*) FROM occupancy_events").fetchone()[0]}
+    for name, res in RESOLUTIONS.items():
+        out[name] = conn.execute("SELECT COUNT(*) FROM occupancy_rollup WHERE resolution = ?", (res,)).fetchone()[0]
+    return out
+
+
+def verify(conn) -> dict:
+    """Check the stored series against itself: {'broken_links', 'rollup_mismatches', 'latest'}.
+
+    Each raw event's occupancy must be the one before it plus its delta, and
+    every rollup bucket the raw events fully cover must equal a fresh fold of
+    those events. 'latest' is the occupancy after the last event (None if empty).
+    """
+    events = []
+    broken = 0
+    prev = None
+    for ts, delta, level in conn.execute("SELECT ts, delta, occupied FROM occupancy_events ORDER BY ts, event_id"):
+        if prev is None:
+            prev = level - delta
+        elif level != prev + delta:
+            broken += 1
+        events.append((ts, prev, level))
+        prev = level
+    mismatches = 0
+    if events:
+        for res in RESOLUTIONS.values():
+            # Buckets that began before the oldest kept event were partly compacted away
+            since = events[0][0] + (-events[0][0]) % res
+            expected = {row[1]: row for row in _fold(events, res, since)}
+            stored = {row[1]: row for row in conn.execute(
+                "SELECT resolution, bucket, open_occ, min_occ, max_occ, close_occ, occ_seconds, last_ts, events "
+                "FROM occupancy_rollup WHERE resolution = ? AND bucket >= ?", (res, since))}
+            mismatches += sum(expected.get(bucket) != row for bucket, row in stored.items())
+            mismatches += len(expected.keys() - stored.keys())
+    return {'broken_links': broken, 'rollup_mismatches': mismatches, 'latest': events[-1][2] if events else None}
+
+
+def _day(value: str) -> str:
+    try:
+        return datetime.strptime(value, TIME_FORMAT).strftime(TIME_FORMAT)
+    except ValueError:
+        return datetime.strptime(value, "%Y-%m-%d").strftime(TIME_FORMAT)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ParkinUP occupancy time series tools.")
+    parser.add_argument("command", choices=("backfill", "as-of", "range", "stats"))
+    parser.add_argument("at", nargs="?", help="timestamp for as-of")
+    parser.add_argument("--db", required=True)
+    parser.add_argument("--from", dest="start")
+    parser.add_argument("--to", dest="end")
+    parser.add_argument("--resolution", choices=tuple(RESOLUTIONS), default="hour")
+    args = parser.parse_intermixed_args(argv)
+
+    if args.command == "backfill":
+        summary = backfill(args.db)
+        print(f"Backfilled {summary['changes']} changes: kept {summary['events']} raw events and "
+              f"{summary['rollups']} rollup rows in {summary['elapsed_s']} s")
+        return 0
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.command == "stats":
+            print(stats(conn))
+        elif args.command == "as-of":
+            if not args.at:
+                parser.error("as-of needs a timestamp")
+            print(as_of(conn, _day(args.at)))
+        else:
+            if not args.start:
+                parser.error("range needs --from")
+            start = _day(args.start)
+            end = _day(args.end) if args.end else from_epoch(to_epoch(start) + 86400)
+            for row in series(conn, start, end, args.resolution):
+                print(f"{row['bucket']}  avg {row['avg']:>8.2f}  min {row['min']:>5}  max {row['max']:>5}  "
+                      f"close {row['close']:>5}")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
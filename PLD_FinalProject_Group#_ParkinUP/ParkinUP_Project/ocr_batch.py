@@ -0,0 +1,206 @@
+"""Headless batch OCR for folders of captured plate images.
+
+Usage:
+    python ocr_batch.py DIR [--out results.jsonl] [--format jsonl|csv]
+                            [--workers 4] [--resume] [--no-recursive]
+
+Images are streamed from DIR through a worker pool with a bounded number of
+in-flight jobs, so memory stays flat however many snapshots there are. Each
+result (path, plate, confidence, source, ms) is written as soon as it is
+ready; with --resume, paths already in the output file are skipped. When
+tesseract is not installed the plate is parsed from the filename instead.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import plate_locator
+from metrics import percentile
+from optional_libs import load
+from utils import PLATE_OCR_CONFIG, _match_plate, parse_plate_from_filename, tesseract_available as tesseract_runs
+
+pytesseract = load("pytesseract")
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+FIELDS = ['path', 'plate', 'confidence', 'source', 'ms']
+
+
+def tesseract_available() -> bool:
+    return plate_locator.LOCATOR_AVAILABLE and tesseract_runs()
+
+
+def iter_images(directory: str, recursive: bool = True):
+    """Yield image paths under directory without listing everything up front."""
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(dirpath, name)
+        if not recursive:
+            break
+
+
+def recognize(path: str, use_ocr: bool) -> dict:
+    """OCR one image. Returns a result row with plate, confidence (0-1) and source."""
+    start = time.perf_counter()
+    plate, confidence, source = None, 0.0, "filename"
+    if use_ocr:
+        try:
+            image = plate_locator.load_image(path)
+            for roi in plate_locator.extract_plate_rois(image) if image is not None else []:
+                data = pytesseract.image_to_data(roi, config=PLATE_OCR_CONFIG,
+                                                 output_type=pytesseract.Output.DICT)
+                words = [(t, float(c)) for t, c in zip(data['text'], data['conf']) if t.strip()]
+                plate = _match_plate(" ".join(t for t, _ in words))
+                if plate:
+                    confs = [c for _, c in words if c >= 0]
+                    confidence = round(sum(confs) / len(confs) / 100.0, 3) if confs else 0.0
+                    source = "ocr"
+                    break
+        except Exception:
+            plate = None
+    if not plate:
+        plate = parse_plate_from_filename(path)
+    return {
+        'path': path,
+        'plate': plate,
+        'confidence': confidence,
+        'source': source,
+        'ms': round((time.perf_counter() - start) * 1000.0, 2),
+    }
+
+
+def drop_torn_tail(out_path: str) -> int:
+    """Truncate a last line left without its newline by an interrupted run. Returns bytes dropped.
+
+    Appending after it would glue the next record onto it, and a torn CSV
+    row can still carry a complete path that would count as done.
+    """
+    if not os.path.exists(out_path):
+        return 0
+    with open(out_path, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        end = size
+        while end > 0:
+            chunk_start = max(0, end - 65536)
+            f.seek(chunk_start)
+            chunk = f.read(end - chunk_start)
+            if end == size and chunk.endswith(b"\n"):
+                return 0
+            newline = chunk.rfind(b"\n")
+            if newline >= 0:
+                end = chunk_start + newline + 1
+                break
+            end = chunk_start
+        f.truncate(end)
+        return size - end
+
+
+def load_done(out_path: str, fmt: str) -> set[str]:
+    """Return the set of paths already present in an existing output file."""
+    done = set()
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            for row in csv.DictReader(f):
+                done.add(row['path'])
+        else:
+            for line in f:
+                try:
+                    done.add(json.loads(line)['path'])
+                except (ValueError, KeyError):
+                    # Partially written last line from an interrupted run
+                    continue
+    return done
+
+
+def run(directory: str, out_path: str, fmt: str, workers: int, resume: bool, recursive: bool) -> dict:
+    use_ocr = tesseract_available()
+    torn = drop_torn_tail(out_path) if resume else 0
+    done = load_done(out_path, fmt) if resume else set()
+    mode = 'a' if resume else 'w'
+    write_header = fmt == 'csv' and not (resume and os.path.exists(out_path) and os.path.getsize(out_path) > 0)
+
+    latencies = []
+    sources: dict[str, int] = {}
+    skipped = 0
+    start = time.perf_counter()
+    with open(out_path, mode, newline='', encoding='utf-8') as out, \
+            ThreadPoolExecutor(max_workers=workers) as pool:
+        writer = csv.DictWriter(out, fieldnames=FIELDS) if fmt == 'csv' else None
+        if writer and write_header:
+            writer.writeheader()
+
+        def write(result):
+            if writer:
+                writer.writerow(result)
+            else:
+                out.write(json.dumps(result) + "\n")
+            out.flush()
+            latencies.append(result['ms'])
+            sources[result['source']] = sources.get(result['source'], 0) + 1
+
+        # Keep at most 2 jobs per worker in flight so memory does not grow with DIR
+        pending = set()
+        for path in iter_images(directory, recursive):
+            if path in done:
+                skipped += 1
+                continue
+            if len(pending) >= workers * 2:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    write(fut.result())
+            pending.add(pool.submit(recognize, path, use_ocr))
+        for fut in pending:
+            write(fut.result())
+
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'images': len(latencies),
+        'skipped': skipped,
+        'elapsed_s': round(elapsed, 3),
+        'images_per_s': round(len(latencies) / elapsed, 2) if elapsed > 0 else 0.0,
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'sources': sources,
+        'tesseract': use_ocr,
+        'torn_bytes_dropped': torn,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch OCR a folder of plate images.")
+    parser.add_argument("directory", help="folder of captured images")
+    parser.add_argument("--out", help="output file (default: ocr_results.jsonl / .csv in the current folder)")
+    parser.add_argument("--format", choices=("jsonl", "csv"), help="output format (default: from --out extension, else jsonl)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="number of OCR workers")
+    parser.add_argument("--resume", action="store_true", help="skip images already in the output file")
+    parser.add_argument("--no-recursive", action="store_true", help="do not descend into subfolders")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.directory):
+        parser.error(f"not a directory: {args.directory}")
+    fmt = args.format or ('csv' if args.out and args.out.lower().endswith('.csv') else 'jsonl')
+    out_path = args.out or f"ocr_results.{fmt}"
+
+    summary = run(args.directory, out_path, fmt, max(1, args.workers), args.resume, not args.no_recursive)
+    if not summary['tesseract']:
+        print("tesseract not available: plates parsed from filenames", file=sys.stderr)
+    if summary['torn_bytes_dropped']:
+        print(f"Dropped an unfinished last line ({summary['torn_bytes_dropped']} bytes) from {out_path}",
+              file=sys.stderr)
+    print(f"Processed {summary['images']} images ({summary['skipped']} skipped) in {summary['elapsed_s']} s "
+          f"=> {summary['images_per_s']} images/s, p50 {summary['p50_ms']} ms, p95 {summary['p95_ms']} ms",
+          file=sys.stderr)
+    print(f"Results written to {out_path}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
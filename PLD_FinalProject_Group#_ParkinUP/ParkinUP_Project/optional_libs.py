@@ -0,0 +1,58 @@
+"""Heavy optional libraries (OpenCV, pytesseract), imported on first use.
+
+Importing cv2 and pytesseract (which pulls in numpy) at module top used to
+delay the first window on gate PCs. Code that needs them asks here instead:
+
+    from optional_libs import load, is_installed
+    CAMERA_AVAILABLE = is_installed("cv2")   # cheap: no import
+    cv2 = load("cv2")                        # imports once, None if missing
+
+preload() warms them up in a background thread once the homepage is shown,
+so the first camera or OCR action doesn't pay the import either.
+"""
+import importlib
+import importlib.util
+import threading
+
+HEAVY_LIBS = ("cv2", "pytesseract")
+
+_modules: dict[str, object] = {}
+_installed: dict[str, bool] = {}
+_lock = threading.Lock()
+
+
+def is_installed(name: str) -> bool:
+    """True if `name` can be imported, without importing it."""
+    found = _installed.get(name)
+    if found is None:
+        try:
+            found = importlib.util.find_spec(name) is not None
+        except (ImportError, ValueError):
+            found = False
+        _installed[name] = found
+    return found
+
+
+def load(name: str):
+    """Import `name` once and return the module, or None if it is not installed or fails to import."""
+    if name in _modules:
+        return _modules[name]
+    with _lock:
+        if name not in _modules:
+            try:
+                _modules[name] = importlib.import_module(name) if is_installed(name) else None
+            except Exception:
+                _modules[name] = None
+        return _modules[name]
+
+
+def loaded(name: str) -> bool:
+    """True if `name` has already been imported through load()."""
+    return _modules.get(name) is not None
+
+
+def preload(names=HEAVY_LIBS) -> threading.Thread:
+    """Import `names` in a daemon thread; returns the thread."""
+    thread = threading.Thread(target=lambda: [load(n) for n in names], name="preload-libs", daemon=True)
+    thread.start()
+    return thread
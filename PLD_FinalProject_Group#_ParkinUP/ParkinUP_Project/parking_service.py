@@ -0,0 +1,853 @@
+"""Headless parking core: slot allocation, park, exit, fees and history.
+
+ParkingService has no Tkinter or camera dependency, so the same engine the
+GUI uses can be driven from scripts, a server or a benchmark:
+
+    from parking_service import ParkingService
+    service = ParkingService("parking.db")
+    service.park("ABC1234")
+    receipt = service.exit("ABC1234")
+
+Failures are raised as ParkingError subclasses whose message is the text the
+GUI shows to the attendant.
+
+Several terminals (GUI, API server, other processes) may share one database.
+Every state change runs as a single BEGIN IMMEDIATE transaction, so the
+reads it decides on (is the slot free, is the plate parked) can't be changed
+by another terminal before it commits. Connections wait up to
+BUSY_TIMEOUT_S for a locked database, and a transaction that still finds it
+locked is retried with jittered exponential backoff.
+
+park() and exit() take an optional client request ID. The first call's
+result is stored with it (for REQUEST_TTL_S) in the same transaction, and a
+retry with the same ID gets that result back, marked 'replayed', instead of
+a second session or payment.
+"""
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import lru_cache, wraps
+
+from clock import get_clock
+from metrics import metrics
+import occupancy_ts
+from allocation import SLOT_TYPES, Allocator, policy_from_env
+from plate_index import PlateIndex
+from receipts import transaction_id
+from reservations import ARRIVAL_GRACE_S, WALK_IN_HOLD_S, ReservationIndex
+from utils import calculate_fee
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+# P10/hour
+DEFAULT_RATE_PER_MIN = 10 / 60
+# sqlite busy timeout: how long a connection waits for another terminal's transaction
+BUSY_TIMEOUT_S = 5.0
+# Tries for a write transaction that keeps finding the database locked, and its backoff bounds
+WRITE_ATTEMPTS = 5
+BACKOFF_BASE_S = 0.02
+BACKOFF_MAX_S = 0.5
+# How long a request ID is remembered, and how often expired ones are deleted
+REQUEST_TTL_S = 24 * 3600
+REQUEST_PRUNE_EVERY_S = 10 * 60
+
+
+class ParkingError(Exception):
+    """Base class for park/exit failures that should be shown to the user."""
+
+
+class NoSlotAvailable(ParkingError):
+    pass
+
+
+class AlreadyParked(ParkingError):
+    pass
+
+
+class NotParked(ParkingError):
+    pass
+
+
+class ReservationConflict(ParkingError):
+    pass
+
+
+class NotReserved(ParkingError):
+    pass
+
+
+class DatabaseBusy(ParkingError):
+    pass
+
+
+def _is_busy(error: sqlite3.OperationalError) -> bool:
+    """True for SQLITE_BUSY/SQLITE_LOCKED ("database is locked"), which are worth retrying."""
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+def _as_datetime(value) -> datetime:
+    """datetime from a datetime or a 'YYYY-MM-DD HH:MM:SS' string."""
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.strptime(str(value).strip(), TIME_FORMAT)
+    except ValueError:
+        raise ParkingError(f"Time must look like 2025-01-06 08:00:00, not {value!r}.") from None
+
+
+_SQL_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE)\s+(\w+)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=256)
+def sql_label(sql: str) -> str:
+    """Metric name for a statement: 'sql.<VERB> <first table>'."""
+    words = sql.split(None, 1)
+    verb = words[0].upper() if words else "?"
+    table = _SQL_TABLE.search(sql)
+    return f"sql.{verb} {table.group(1)}" if table else f"sql.{verb}"
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that records each statement's execute time in metrics."""
+
+    def execute(self, sql, parameters=()):
+        with metrics.timer(sql_label(sql)):
+            return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        with metrics.timer(sql_label(sql)):
+            return super().executemany(sql, seq_of_parameters)
+
+
+class TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        with metrics.timer("sql.COMMIT"):
+            super().commit()
+
+
+def _instrumented(name: str):
+    """Time a service call end-to-end and count its ParkingError outcomes."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with metrics.timer(name):
+                try:
+                    return fn(*args, **kwargs)
+                except ParkingError as e:
+                    metrics.incr(f"{name}.{type(e).__name__}")
+                    raise
+        return wrapper
+    return decorate
+
+
+class ParkingService:
+    """Park/exit operations on a ParkinUP SQLite database. Thread-safe.
+
+    Each call opens its own connection (or, with reuse_connections, each
+    thread keeps one for its writes); state-changing calls are serialized
+    by a lock within this process and run as one BEGIN IMMEDIATE transaction
+    against other processes, with slots claimed by a conditional UPDATE so
+    no two terminals can take the same slot. The fuzzy/prefix plate index of active sessions is kept in
+    sync with every park and exit, the reservation index with every booking,
+    cancellation and claimed reservation, and the allocator's free-slot
+    queues with every slot taken or freed.
+    """
+
+    def __init__(self, db_path: str, rate_per_min: float = DEFAULT_RATE_PER_MIN, clock=None, journal=None,
+                 policy: str | None = None, busy_timeout: float = BUSY_TIMEOUT_S, reuse_connections: bool = False):
+        self.db_path = db_path
+        self.rate_per_min = rate_per_min
+        # None follows the process-wide clock (clock.set_clock)
+        self.clock = clock
+        # Optional journal.Journal; committed changes are appended in commit order
+        self.journal = journal
+        self.plate_index = PlateIndex()
+        self.reservations = ReservationIndex()
+        # None follows PARKINUP_ALLOCATION (default first-free); see allocation.POLICIES
+        self.allocator = Allocator(policy or policy_from_env())
+        self._lock = threading.RLock()
+        self._lock_waits = 0
+        self._lock_wait_s = 0.0
+        self._lock_wait_max_s = 0.0
+        self.busy_timeout = busy_timeout
+        # Transactions retried on a locked database, given up on, and slot picks another terminal took first
+        self._busy_retries = 0
+        self._busy_failures = 0
+        self._slot_conflicts = 0
+        self._next_request_prune = 0
+        # Per-thread write connections (skips connect and schema load per call); close() releases them
+        self.reuse_connections = reuse_connections
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self.reload_index()
+
+    def now(self) -> datetime:
+        return (self.clock or get_clock()).now()
+
+    def connect(self) -> sqlite3.Connection:
+        with metrics.timer("db.connect"):
+            return sqlite3.connect(self.db_path, timeout=self.busy_timeout, factory=TimedConnection)
+
+    def _write_connection(self) -> sqlite3.Connection:
+        if not self.reuse_connections:
+            return self.connect()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            with metrics.timer("db.connect"):
+                # Only the owning thread uses it; close() may run on another
+                conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, factory=TimedConnection,
+                                       check_same_thread=False)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self):
+        """Close the reused write connections. Call once no thread is using the service."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+    @contextmanager
+    def _write_lock(self):
+        """Hold the write lock, recording how long the caller waited for it."""
+        start = time.perf_counter()
+        with self._lock:
+            waited = time.perf_counter() - start
+            metrics.observe("service.lock_wait", waited)
+            self._lock_waits += 1
+            self._lock_wait_s += waited
+            self._lock_wait_max_s = max(self._lock_wait_max_s, waited)
+            yield
+
+    def _write(self, name: str, work):
+        """Run work(conn) inside BEGIN IMMEDIATE and return its result; work commits.
+
+        BEGIN IMMEDIATE takes the database's write lock before anything is
+        read, so two terminals can't both decide on the same free slot or
+        the same open session. If the lock is still held by another
+        terminal after busy_timeout, the whole transaction is retried after a
+        jittered, exponentially growing pause; work must therefore undo any
+        in-memory changes it made when it raises.
+        """
+        for attempt in range(1, WRITE_ATTEMPTS + 1):
+            conn = self._write_connection()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                return work(conn)
+            except sqlite3.OperationalError as e:
+                if not _is_busy(e):
+                    raise
+                conn.rollback()
+                with self._lock:
+                    if attempt == WRITE_ATTEMPTS:
+                        self._busy_failures += 1
+                    else:
+                        self._busy_retries += 1
+                if attempt == WRITE_ATTEMPTS:
+                    metrics.incr(f"{name}.busy_failed")
+                    raise DatabaseBusy("The database is busy at another terminal; please try again.") from None
+                metrics.incr(f"{name}.busy_retry")
+                time.sleep(random.uniform(0, min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2 ** (attempt - 1))))
+            finally:
+                if not self.reuse_connections:
+                    conn.close()
+                elif conn.in_transaction:
+                    # work raised before committing; closing used to discard it
+                    conn.rollback()
+
+    def lock_stats(self) -> dict:
+        """Write-lock acquisitions and time spent waiting for them, plus cross-terminal conflicts."""
+        with self._lock:
+            n = self._lock_waits
+            return {'acquisitions': n,
+                    'wait_total_ms': round(self._lock_wait_s * 1000.0, 3),
+                    'wait_mean_ms': round(self._lock_wait_s * 1000.0 / n, 3) if n else 0.0,
+                    'wait_max_ms': round(self._lock_wait_max_s * 1000.0, 3),
+                    'busy_retries': self._busy_retries,
+                    'busy_failures': self._busy_failures,
+                    'slot_conflicts': self._slot_conflicts}
+
+    def reload_index(self):
+        """Rebuild the plate, reservation and free-slot indexes from the database."""
+        conn = self.connect()
+        try:
+            rows = conn.execute("SELECT vehicle_number FROM vehicles WHERE exit_time IS NULL").fetchall()
+        finally:
+            conn.close()
+        self.plate_index.load(row[0] for row in rows)
+        self.reload_reservations()
+        self.reload_slots()
+
+    def reload_reservations(self):
+        """Reload the reservation index (e.g. after another terminal booked or cancelled)."""
+        conn = self.connect()
+        try:
+            # strftime('%s') reads the naive times as UTC, like occupancy_ts.to_epoch
+            booked = conn.execute("SELECT reservation_id, slot_id, plate, CAST(strftime('%s', start_time) AS INTEGER), "
+                                  "CAST(strftime('%s', end_time) AS INTEGER) FROM reservations "
+                                  "WHERE status = 'active' AND end_time > ? ORDER BY slot_id, start_time",
+                                  (self.now().strftime(TIME_FORMAT),)).fetchall()
+        finally:
+            conn.close()
+        self.reservations.load(booked)
+
+    def reload_slots(self):
+        """Reload slot attributes and occupancy into the allocator (e.g. after allocation.py layout)."""
+        conn = self.connect()
+        try:
+            rows = conn.execute("SELECT slot_id, slot_number, zone, level, slot_type, distance, is_occupied "
+                                "FROM slots").fetchall()
+        finally:
+            conn.close()
+        with self._lock:
+            self.allocator.load(rows)
+
+    # ---------- Gate operations ----------
+    @_instrumented("service.park")
+    def park(self, plate: str, owner: str = "", vehicle_type: str = "standard",
+             request_id: str | None = None) -> dict:
+        """Give plate its reserved slot, else the allocation policy's best slot for vehicle_type.
+
+        Returns the new session. A repeated request_id returns the session it
+        first created.
+        """
+        plate = plate.strip()
+        if vehicle_type not in SLOT_TYPES:
+            raise ParkingError(f"Unknown vehicle type {vehicle_type!r}.")
+
+        stale = []
+
+        def work(conn):
+            cur = conn.cursor()
+            entered = self.now()
+            if request_id:
+                replayed = self._replayed(cur, request_id, "park", plate, entered)
+                if replayed is not None:
+                    return replayed, None
+            entry_time = entered.strftime(TIME_FORMAT)
+            claim = self._claim_for(cur, plate, entered)
+            if claim != self.reservations.for_plate(plate, occupancy_ts.to_epoch(entered)):
+                stale.append(True)
+            slot = self._allocate(cur, entered, vehicle_type, claim[1] if claim else None, stale)
+            if slot is None:
+                raise NoSlotAvailable("No available slots.")
+            try:
+                try:
+                    cur.execute("INSERT INTO vehicles (owner_name, vehicle_number, slot_id, entry_time) "
+                                "VALUES (?,?,?,?)", (owner, plate, slot.slot_id, entry_time))
+                except sqlite3.IntegrityError:
+                    raise AlreadyParked("Vehicle already exists.") from None
+                session = {
+                    'vehicle_id': cur.lastrowid,
+                    'plate': plate,
+                    'owner': owner,
+                    'slot_id': slot.slot_id,
+                    'slot_number': slot.slot_number,
+                    'entry_time': entry_time,
+                }
+                if claim:
+                    cur.execute("UPDATE reservations SET status='fulfilled', vehicle_id=? WHERE reservation_id=?",
+                                (session['vehicle_id'], claim[0]))
+                if request_id:
+                    self._remember(cur, request_id, "park", plate, session, entered)
+                occupancy_ts.record(cur, entered, 1)
+                conn.commit()
+            except BaseException:
+                self.allocator.release(slot.slot_id)
+                raise
+            return session, claim
+
+        with self._write_lock():
+            try:
+                session, claim = self._write("service.park", work)
+            finally:
+                if stale:
+                    # Another terminal booked, cancelled or fulfilled a reservation
+                    self.reload_reservations()
+            if session.get('replayed'):
+                return session
+            vehicle_id, slot_id, slot_no = session['vehicle_id'], session['slot_id'], session['slot_number']
+            self.plate_index.add(plate)
+            if claim:
+                self.reservations.remove(claim[0])
+            if self.journal is not None:
+                self.journal.append("park", vehicle_id=vehicle_id, plate=plate, owner=owner,
+                                    slot_id=slot_id, slot_number=slot_no, entry_time=session['entry_time'])
+                if claim:
+                    self.journal.append("reservation", reservation_id=claim[0], status="fulfilled",
+                                        vehicle_id=vehicle_id)
+        return session
+
+    def _replayed(self, cur, request_id: str, operation: str, plate: str, now: datetime):
+        """Result stored for request_id by an earlier call (marked 'replayed'), or None if it is new.
+
+        One primary-key lookup; IDs older than REQUEST_TTL_S count as new.
+        """
+        row = cur.execute("SELECT operation, plate, result FROM request_log WHERE request_id=? AND created >= ?",
+                          (request_id, occupancy_ts.to_epoch(now) - REQUEST_TTL_S)).fetchone()
+        if row is None:
+            return None
+        if (row[0], row[1]) != (operation, plate):
+            raise ParkingError(f"Request ID {request_id} was already used to {row[0]} {row[1]}.")
+        metrics.incr(f"service.{operation}.replayed")
+        return dict(json.loads(row[2]), replayed=True)
+
+    def _remember(self, cur, request_id: str, operation: str, plate: str, result: dict, now: datetime):
+        """Store result under request_id in the caller's transaction; now and then drop expired IDs."""
+        now_ts = occupancy_ts.to_epoch(now)
+        # REPLACE: an expired row for the same ID may not have been pruned yet
+        cur.execute("INSERT OR REPLACE INTO request_log (request_id, operation, plate, result, created) "
+                    "VALUES (?,?,?,?,?)", (request_id, operation, plate, json.dumps(result), now_ts))
+        if now_ts >= self._next_request_prune:
+            cur.execute("DELETE FROM request_log WHERE created < ?", (now_ts - REQUEST_TTL_S,))
+            self._next_request_prune = now_ts + REQUEST_PRUNE_EVERY_S
+
+    def _claim_in_db(self, cur, slot_id: int) -> bool:
+        """Mark slot_id occupied if it is still free; False if another terminal holds it."""
+        cur.execute("UPDATE slots SET is_occupied=1 WHERE slot_id=? AND is_occupied=0", (slot_id,))
+        if cur.rowcount == 1:
+            return True
+        with self._lock:
+            self._slot_conflicts += 1
+        metrics.incr("service.park.slot_conflict")
+        return False
+
+    def _claim_for(self, cur, plate: str, when: datetime):
+        """(reservation_id, slot_id) of plate's booking that can be claimed at `when`, or None.
+
+        Read from the database (idx_reservations_plate) in the caller's
+        transaction: the booking may have been made at another terminal.
+        """
+        row = cur.execute("SELECT reservation_id, slot_id FROM reservations "
+                          "WHERE plate=? AND status='active' AND start_time <= ? AND end_time > ? "
+                          "ORDER BY start_time LIMIT 1",
+                          (plate, (when + timedelta(seconds=ARRIVAL_GRACE_S)).strftime(TIME_FORMAT),
+                           when.strftime(TIME_FORMAT))).fetchone()
+        return tuple(row) if row else None
+
+    def _allocate(self, cur, when: datetime, vehicle_type: str, reserved_slot: int | None = None,
+                  stale: list | None = None):
+        """Take a slot for a new session; its SlotInfo, or None when the lot is full.
+
+        A claimed reservation's slot wins if it is free. Otherwise the
+        allocation policy picks, skipping slots booked to start within
+        reservations.WALK_IN_HOLD_S. The in-memory index screens candidates
+        and the database (in the caller's transaction) has the final word,
+        since another terminal may have booked the slot; such misses are
+        noted in `stale`. Each pick is claimed in the database too, since
+        another process may have parked there.
+        """
+        if reserved_slot is not None and self.allocator.take(reserved_slot):
+            if self._claim_in_db(cur, reserved_slot):
+                return self.allocator.slots[reserved_slot]
+        now_ts = occupancy_ts.to_epoch(when)
+        now, hold_end = when.strftime(TIME_FORMAT), (when + timedelta(seconds=WALK_IN_HOLD_S)).strftime(TIME_FORMAT)
+
+        def accept(slot_id):
+            if self.reservations.is_held(slot_id, now_ts):
+                return False
+            if self._conflicting_reservation(cur, slot_id, now, hold_end) is not None:
+                if stale is not None:
+                    stale.append(True)
+                return False
+            return True
+        reloaded = False
+        while True:
+            slot = self.allocator.acquire(vehicle_type, accept)
+            if slot is None:
+                if reloaded:
+                    return None
+                # Slots freed by other processes are only seen after a reload
+                self.reload_slots()
+                reloaded = True
+            elif self._claim_in_db(cur, slot.slot_id):
+                return slot
+
+    def _find_active(self, cur, plate: str):
+        cur.execute("""SELECT v.vehicle_id, v.entry_time, v.slot_id, s.slot_number
+                       FROM vehicles v JOIN slots s ON v.slot_id = s.slot_id
+                       WHERE v.vehicle_number=? AND v.exit_time IS NULL""", (plate,))
+        return cur.fetchone()
+
+    @_instrumented("service.quote")
+    def quote(self, plate: str, at: str | None = None) -> dict:
+        """Fee owed if plate exited now (or at `at`), without changing anything."""
+        plate = plate.strip()
+        conn = self.connect()
+        try:
+            rec = self._find_active(conn.cursor(), plate)
+        finally:
+            conn.close()
+        if not rec:
+            raise NotParked("No active parked vehicle with this number.")
+        vehicle_id, entry_time_str, slot_id, slot_no = rec
+        exit_time_str = at or self.now().strftime(TIME_FORMAT)
+        minutes, amount = calculate_fee(entry_time_str, exit_time_str, rate_per_min=self.rate_per_min)
+        return {
+            'vehicle_id': vehicle_id,
+            'plate': plate,
+            'slot_id': slot_id,
+            'slot_number': slot_no,
+            'entry_time': entry_time_str,
+            'exit_time': exit_time_str,
+            'minutes': minutes,
+            'amount': amount,
+            'rate_per_min': self.rate_per_min,
+        }
+
+    @_instrumented("service.exit")
+    def exit(self, plate: str, request_id: str | None = None) -> dict:
+        """Close plate's session, free its slot and record the payment. Returns the receipt data.
+
+        A repeated request_id returns the first call's receipt (same payment
+        and transaction ID) instead of charging again.
+        """
+        plate = plate.strip()
+
+        def work(conn):
+            cur = conn.cursor()
+            exited = self.now()
+            if request_id:
+                replayed = self._replayed(cur, request_id, "exit", plate, exited)
+                if replayed is not None:
+                    return replayed
+            rec = self._find_active(cur, plate)
+            if not rec:
+                raise NotParked("No active parked vehicle with this number.")
+            vehicle_id, entry_time_str, slot_id, slot_no = rec
+            exit_time_str = exited.strftime(TIME_FORMAT)
+            minutes, amount = calculate_fee(entry_time_str, exit_time_str, rate_per_min=self.rate_per_min)
+            cur.execute("UPDATE vehicles SET exit_time=? WHERE vehicle_id=?", (exit_time_str, vehicle_id))
+            cur.execute("UPDATE slots SET is_occupied=0 WHERE slot_id=?", (slot_id,))
+            cur.execute("INSERT INTO payments (vehicle_id, amount, payment_time) VALUES (?, ?, ?)",
+                        (vehicle_id, amount, exit_time_str))
+            receipt = {
+                'vehicle_id': vehicle_id,
+                'payment_id': cur.lastrowid,
+                'plate': plate,
+                'slot_id': slot_id,
+                'slot_number': slot_no,
+                'entry_time': entry_time_str,
+                'exit_time': exit_time_str,
+                'minutes': minutes,
+                'amount': amount,
+                'rate_per_min': self.rate_per_min,
+            }
+            receipt['transaction_id'] = transaction_id(receipt)
+            if request_id:
+                self._remember(cur, request_id, "exit", plate, receipt, exited)
+            occupancy_ts.record(cur, exited, -1)
+            conn.commit()
+            return receipt
+
+        with self._write_lock():
+            receipt = self._write("service.exit", work)
+            if receipt.get('replayed'):
+                return receipt
+            vehicle_id, slot_id, exit_time_str = receipt['vehicle_id'], receipt['slot_id'], receipt['exit_time']
+            payment_id, amount = receipt['payment_id'], receipt['amount']
+            self.plate_index.remove(plate)
+            self.allocator.release(slot_id)
+            if self.journal is not None:
+                self.journal.append("exit", vehicle_id=vehicle_id, plate=plate, slot_id=slot_id,
+                                    exit_time=exit_time_str)
+                self.journal.append("payment", payment_id=payment_id, vehicle_id=vehicle_id,
+                                    amount=amount, payment_time=exit_time_str)
+        return receipt
+
+    def is_parked(self, plate: str) -> bool:
+        conn = self.connect()
+        try:
+            cur = conn.execute("SELECT 1 FROM vehicles WHERE vehicle_number=? AND exit_time IS NULL", (plate,))
+            return cur.fetchone() is not None
+        finally:
+            conn.close()
+
+    # ---------- Slots ----------
+    def occupancy(self) -> dict:
+        """Return {'total', 'occupied', 'available'} slot counts."""
+        conn = self.connect()
+        try:
+            total, occupied = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(is_occupied), 0) FROM slots").fetchone()
+        finally:
+            conn.close()
+        return {'total': total, 'occupied': occupied, 'available': total - occupied}
+
+    def occupancy_at(self, when) -> dict:
+        """Occupancy at a past instant from the occupancy time series (see occupancy_ts)."""
+        conn = self.connect()
+        try:
+            return occupancy_ts.as_of(conn, when)
+        finally:
+            conn.close()
+
+    def occupancy_history(self, start, end, resolution: str = "hour") -> list[dict]:
+        """Per-minute/hour/day occupancy buckets for [start, end)."""
+        conn = self.connect()
+        try:
+            return occupancy_ts.series(conn, start, end, resolution)
+        finally:
+            conn.close()
+
+    def slots(self, limit: int | None = None) -> list[tuple[str, int]]:
+        """(slot_number, is_occupied) rows in numeric slot order."""
+        sql = """SELECT slot_number, is_occupied
+                 FROM slots
+                 ORDER BY CAST(SUBSTR(slot_number, INSTR(slot_number, '-') + 1) AS INTEGER)"""
+        params: tuple = ()
+        if limit is not None:
+            sql += " LIMIT ?"
+            params = (limit,)
+        conn = self.connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def slot_occupant(self, slot_number: str):
+        """(vehicle_number, owner_name, entry_time) parked in a slot, or None."""
+        conn = self.connect()
+        try:
+            return conn.execute("""SELECT v.vehicle_number, v.owner_name, v.entry_time
+                                   FROM vehicles v JOIN slots s ON v.slot_id = s.slot_id
+                                   WHERE s.slot_number=? AND v.exit_time IS NULL""", (slot_number,)).fetchone()
+        finally:
+            conn.close()
+
+    def add_slots(self, total: int) -> int:
+        """Make sure slots Slot-1..Slot-total exist. Returns the new slot count."""
+        def work(conn):
+            existing = {row[0] for row in conn.execute("SELECT slot_number FROM slots")}
+            cur = conn.cursor()
+            added = []
+            for i in range(1, total + 1):
+                slot_number = f"Slot-{i}"
+                if slot_number not in existing:
+                    cur.execute("INSERT INTO slots (slot_number, is_occupied) VALUES (?, 0)", (slot_number,))
+                    added.append((cur.lastrowid, slot_number))
+            count = conn.execute("SELECT COUNT(*) FROM slots").fetchone()[0]
+            conn.commit()
+            return added, count
+
+        with self._write_lock():
+            added, count = self._write("service.add_slots", work)
+            for slot_id, slot_number in added:
+                self.allocator.add(slot_id, slot_number)
+            if self.journal is not None:
+                for slot_id, slot_number in added:
+                    # New slots take the schema defaults until a layout assigns them
+                    self.journal.append("slot", slot_id=slot_id, slot_number=slot_number, zone="A", level=1,
+                                        slot_type="standard", distance=0.0)
+            return count
+
+    # ---------- Reservations ----------
+    @staticmethod
+    def _conflicting_reservation(cur, slot_id: int, start: str, end: str):
+        """Active reservation on slot_id overlapping [start, end), or None (one index seek)."""
+        row = cur.execute("SELECT reservation_id, end_time FROM reservations "
+                          "WHERE slot_id=? AND status='active' AND start_time < ? "
+                          "ORDER BY start_time DESC LIMIT 1", (slot_id, end)).fetchone()
+        return row[0] if row and row[1] > start else None
+
+    @_instrumented("service.reserve")
+    def reserve(self, plate: str, start, end, slot_number: str | None = None) -> dict:
+        """Book a slot (the given one, else the first free for the window) for plate from start to end."""
+        plate = plate.strip()
+        start_dt = _as_datetime(start)
+        end_dt = _as_datetime(end)
+        if end_dt <= start_dt:
+            raise ParkingError("Reservation must end after it starts.")
+        now = self.now()
+        if end_dt <= now:
+            raise ParkingError("Reservation window is already over.")
+        start_time, end_time = start_dt.strftime(TIME_FORMAT), end_dt.strftime(TIME_FORMAT)
+        start_ts, end_ts = occupancy_ts.to_epoch(start_dt), occupancy_ts.to_epoch(end_dt)
+        # A car parked now may still be there when a booking that starts soon begins
+        soon = occupancy_ts.to_epoch(now) >= start_ts - ARRIVAL_GRACE_S
+
+        def work(conn):
+            cur = conn.cursor()
+            if slot_number:
+                candidates = cur.execute("SELECT slot_id, slot_number, is_occupied FROM slots "
+                                         "WHERE slot_number=?", (slot_number,)).fetchall()
+                if not candidates:
+                    raise ParkingError(f"Unknown slot {slot_number}.")
+            else:
+                candidates = cur.execute("SELECT slot_id, slot_number, is_occupied FROM slots "
+                                         "ORDER BY slot_id").fetchall()
+            for slot_id, slot_no, occupied in candidates:
+                if soon and occupied:
+                    continue
+                # The in-memory index screens; the database has the final word
+                if (self.reservations.conflict(slot_id, start_ts, end_ts) is None
+                        and self._conflicting_reservation(cur, slot_id, start_time, end_time) is None):
+                    break
+            else:
+                raise ReservationConflict("Slot is already reserved for that time." if slot_number
+                                          else "No slot is free for that time.")
+            cur.execute("INSERT INTO reservations (slot_id, plate, start_time, end_time) VALUES (?,?,?,?)",
+                        (slot_id, plate, start_time, end_time))
+            reservation_id = cur.lastrowid
+            conn.commit()
+            return reservation_id, slot_id, slot_no
+
+        with self._write_lock():
+            reservation_id, slot_id, slot_no = self._write("service.reserve", work)
+            self.reservations.add(reservation_id, slot_id, plate, start_ts, end_ts)
+            if self.journal is not None:
+                self.journal.append("reserve", reservation_id=reservation_id, slot_id=slot_id, plate=plate,
+                                    start_time=start_time, end_time=end_time)
+        return {
+            'reservation_id': reservation_id,
+            'plate': plate,
+            'slot_id': slot_id,
+            'slot_number': slot_no,
+            'start_time': start_time,
+            'end_time': end_time,
+        }
+
+    def cancel_reservation(self, reservation_id: int) -> dict:
+        """Cancel an active reservation and free its window."""
+        def work(conn):
+            cur = conn.cursor()
+            cur.execute("UPDATE reservations SET status='cancelled' WHERE reservation_id=? AND status='active'",
+                        (reservation_id,))
+            if cur.rowcount == 0:
+                raise NotReserved("No active reservation with this number.")
+            conn.commit()
+
+        with self._write_lock():
+            self._write("service.cancel_reservation", work)
+            self.reservations.remove(reservation_id)
+            if self.journal is not None:
+                self.journal.append("reservation", reservation_id=reservation_id, status="cancelled")
+        return {'reservation_id': reservation_id, 'status': 'cancelled'}
+
+    def upcoming_reservations(self, limit: int | None = None) -> list[tuple]:
+        """(reservation_id, plate, slot_number, start_time, end_time) of active bookings not yet over."""
+        sql = """SELECT r.reservation_id, r.plate, s.slot_number, r.start_time, r.end_time
+                 FROM reservations r JOIN slots s ON r.slot_id = s.slot_id
+                 WHERE r.status = 'active' AND r.end_time > ?
+                 ORDER BY r.start_time"""
+        params = [self.now().strftime(TIME_FORMAT)]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        conn = self.connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def earliest_reservation(self, minutes: int, after=None) -> dict | None:
+        """Earliest window of `minutes` at or after `after` (default now) that some slot can take."""
+        now_ts = occupancy_ts.to_epoch(self.now())
+        after_ts = occupancy_ts.to_epoch(_as_datetime(after)) if after is not None else now_ts
+        conn = self.connect()
+        try:
+            rows = conn.execute("SELECT slot_id, slot_number, is_occupied FROM slots ORDER BY slot_id").fetchall()
+        finally:
+            conn.close()
+        slots = {slot_id: slot_no for slot_id, slot_no, _ in rows}
+        duration = minutes * 60
+        # Occupied slots only qualify for windows reserve() would accept on them
+        found = [self.reservations.earliest_window([r[0] for r in rows if not r[2]], duration, after_ts),
+                 self.reservations.earliest_window([r[0] for r in rows if r[2]], duration,
+                                                   max(after_ts, now_ts + ARRIVAL_GRACE_S + 1))]
+        found = [f for f in found if f is not None]
+        if not found:
+            return None
+        start_ts, slot_id = min(found)
+        return {'slot_id': slot_id, 'slot_number': slots[slot_id],
+                'start_time': occupancy_ts.from_epoch(start_ts),
+                'end_time': occupancy_ts.from_epoch(start_ts + minutes * 60)}
+
+    # ---------- History ----------
+    def active_sessions(self, limit: int | None = None) -> list[tuple]:
+        """(vehicle_number, slot_number, entry_time, owner_name) for parked vehicles, newest first."""
+        sql = """SELECT v.vehicle_number, s.slot_number, v.entry_time, v.owner_name
+                 FROM vehicles v LEFT JOIN slots s ON v.slot_id = s.slot_id
+                 WHERE v.exit_time IS NULL OR v.exit_time = '-'
+                 ORDER BY v.vehicle_id DESC"""
+        params: tuple = ()
+        if limit is not None:
+            sql += " LIMIT ?"
+            params = (limit,)
+        conn = self.connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def vehicle_history(self, limit: int | None = None) -> list[tuple]:
+        """(owner_name, vehicle_number, entry_time, exit_time) for all vehicles, newest first."""
+        sql = "SELECT owner_name, vehicle_number, entry_time, exit_time FROM vehicles ORDER BY entry_time DESC"
+        params: tuple = ()
+        if limit is not None:
+            sql += " LIMIT ?"
+            params = (limit,)
+        conn = self.connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def payments(self, limit: int | None = None) -> list[tuple]:
+        """(vehicle_number, amount, payment_time) rows, newest first."""
+        sql = """SELECT v.vehicle_number, p.amount, p.payment_time
+                 FROM payments p JOIN vehicles v ON p.vehicle_id=v.vehicle_id
+                 ORDER BY p.payment_time DESC"""
+        params: tuple = ()
+        if limit is not None:
+            sql += " LIMIT ?"
+            params = (limit,)
+        conn = self.connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def recent_events(self, limit: int = 50) -> list[dict]:
+        """Latest park and exit events, newest first."""
+        conn = self.connect()
+        try:
+            rows = conn.execute("""SELECT * FROM (
+                                       SELECT v.entry_time AS ts, 'park' AS event, v.vehicle_number, s.slot_number, NULL AS amount
+                                       FROM vehicles v LEFT JOIN slots s ON v.slot_id = s.slot_id
+                                       ORDER BY v.entry_time DESC LIMIT ?)
+                                   UNION ALL
+                                   SELECT * FROM (
+                                       SELECT p.payment_time, 'exit', v.vehicle_number, s.slot_number, p.amount
+                                       FROM payments p JOIN vehicles v ON p.vehicle_id = v.vehicle_id
+                                       LEFT JOIN slots s ON v.slot_id = s.slot_id
+                                       ORDER BY p.payment_time DESC LIMIT ?)
+                                   ORDER BY ts DESC LIMIT ?""", (limit, limit, limit)).fetchall()
+        finally:
+            conn.close()
+        return [{'time': ts, 'event': event, 'plate': plate, 'slot_number': slot, 'amount': amount}
+                for ts, event, plate, slot, amount in rows]
+
+    def total_revenue(self) -> float:
+        conn = self.connect()
+        try:
+            return conn.execute("SELECT COALESCE(SUM(amount),0) FROM payments").fetchone()[0] or 0
+        finally:
+            conn.close()
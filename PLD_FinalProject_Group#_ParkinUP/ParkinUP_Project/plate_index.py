@@ -0,0 +1,169 @@
+"""In-memory fuzzy lookup over the plates of currently parked vehicles.
+
+An exact `vehicle_number=?` match fails on a single OCR slip (0 vs O, 1 vs I).
+PlateIndex keys every plate by its confusion-normalized form (see
+plate_vote.canonical_plate), so those slips cost nothing, and keeps a
+symmetric-delete index over the keys so remaining typos within a small edit
+distance are found with a handful of dict lookups instead of a table scan.
+A sorted array of the plates also serves prefix autocomplete via bisect.
+"""
+import bisect
+import threading
+
+from plate_vote import canonical_plate
+
+
+def edit_distance(a: str, b: str, max_dist: int | None = None) -> int:
+    """Levenshtein distance; stops early and returns max_dist + 1 once exceeded."""
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    if max_dist is not None and len(a) - len(b) > max_dist:
+        return max_dist + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if max_dist is not None and min(cur) > max_dist:
+            return max_dist + 1
+        prev = cur
+    return prev[-1]
+
+
+def normalize_plate(plate: str) -> str:
+    """Upper-case a plate and drop separators ('abc-1234' -> 'ABC1234')."""
+    return plate.upper().replace('-', '').replace(' ', '')
+
+
+def _deletes(key: str, depth: int) -> set[str]:
+    """All strings obtained by removing up to `depth` characters from key."""
+    out = {key}
+    level = out
+    # Deleting one character at a time from the previous level reaches every
+    # combination, and slicing is much cheaper than rebuilding each string
+    for _ in range(min(depth, len(key))):
+        level = {word[:i] + word[i + 1:] for word in level for i in range(len(word))}
+        out |= level
+    return out
+
+
+class PlateIndex:
+    """Fuzzy, confusion-aware index of active plates. Thread-safe."""
+
+    def __init__(self, max_dist: int = 2):
+        self.max_dist = max_dist
+        self._lock = threading.Lock()
+        self._key_of: dict[str, str] = {}          # plate as stored -> canonical key
+        self._by_key: dict[str, set[str]] = {}     # canonical key -> plates
+        self._deletes: dict[str, set[str]] = {}    # delete variant -> canonical keys
+        self._sorted: list[tuple[str, str]] = []   # (normalized plate, plate), sorted
+
+    def __len__(self) -> int:
+        return len(self._key_of)
+
+    def __contains__(self, plate: str) -> bool:
+        return plate in self._key_of
+
+    def load(self, plates):
+        """Replace the index contents with the given plates."""
+        with self._lock:
+            self._key_of.clear()
+            self._by_key.clear()
+            self._deletes.clear()
+            self._sorted.clear()
+            for plate in plates:
+                self._add(plate, keep_sorted=False)
+            self._sorted.sort()
+
+    def add(self, plate: str):
+        with self._lock:
+            self._add(plate)
+
+    def remove(self, plate: str):
+        with self._lock:
+            key = self._key_of.pop(plate, None)
+            if key is None:
+                return
+            entry = (normalize_plate(plate), plate)
+            i = bisect.bisect_left(self._sorted, entry)
+            if i < len(self._sorted) and self._sorted[i] == entry:
+                del self._sorted[i]
+            plates = self._by_key[key]
+            plates.discard(plate)
+            if plates:
+                return
+            del self._by_key[key]
+            for variant in _deletes(key, self.max_dist):
+                keys = self._deletes.get(variant)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._deletes[variant]
+
+    def _add(self, plate: str, keep_sorted: bool = True):
+        if plate in self._key_of:
+            return
+        key = canonical_plate(plate)
+        self._key_of[plate] = key
+        entry = (normalize_plate(plate), plate)
+        if keep_sorted:
+            bisect.insort(self._sorted, entry)
+        else:
+            self._sorted.append(entry)
+        if key in self._by_key:
+            self._by_key[key].add(plate)
+            return
+        self._by_key[key] = {plate}
+        for variant in _deletes(key, self.max_dist):
+            self._deletes.setdefault(variant, set()).add(key)
+
+    def search(self, plate: str, max_dist: int | None = None, limit: int = 5) -> list[tuple[str, int]]:
+        """Return up to `limit` (plate, distance) candidates, closest first.
+
+        Distance is measured on confusion-normalized keys, so 'ABC1O34' finds
+        'ABC1034' at distance 0. Ties are broken by the raw edit distance.
+        """
+        max_dist = self.max_dist if max_dist is None else min(max_dist, self.max_dist)
+        query = canonical_plate(plate)
+        raw_query = normalize_plate(plate)
+        with self._lock:
+            keys = set()
+            for variant in _deletes(query, max_dist):
+                keys.update(self._deletes.get(variant, ()))
+            results = []
+            for key in keys:
+                dist = edit_distance(query, key, max_dist)
+                if dist > max_dist:
+                    continue
+                for stored in self._by_key[key]:
+                    raw = edit_distance(raw_query, normalize_plate(stored))
+                    results.append((dist, raw, stored))
+        results.sort()
+        return [(stored, dist) for dist, _, stored in results[:limit]]
+
+    def best_match(self, plate: str, max_dist: int = 1) -> str | None:
+        """The single closest active plate within max_dist, or None if there is none or it is ambiguous."""
+        matches = self.search(plate, max_dist=max_dist, limit=2)
+        if not matches:
+            return None
+        if len(matches) > 1 and matches[0][1] == matches[1][1]:
+            return None
+        return matches[0][0]
+
+    def complete(self, prefix: str, limit: int = 8) -> list[str]:
+        """Return up to `limit` active plates starting with prefix, in sorted order."""
+        prefix = normalize_plate(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            i = bisect.bisect_left(self._sorted, (prefix, ''))
+            out = []
+            while i < len(self._sorted) and len(out) < limit:
+                norm, plate = self._sorted[i]
+                if not norm.startswith(prefix):
+                    break
+                out.append(plate)
+                i += 1
+        return out
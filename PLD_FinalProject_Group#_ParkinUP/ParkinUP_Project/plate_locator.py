@@ -0,0 +1,135 @@
+"""Plate-region localization that runs before OCR.
+
+Full camera frames are mostly background, so instead of handing the whole
+image to tesseract we look for plate-shaped rectangles first and only OCR
+the cropped, deskewed and binarized regions.
+"""
+# Optional image libs (safe imports)
+cv2 = None
+try:
+    import cv2
+except ImportError:
+    pass
+
+np = None
+try:
+    import numpy as np
+except ImportError:
+    pass
+
+LOCATOR_AVAILABLE: bool = cv2 is not None and np is not None
+
+# Detection runs on a downscaled copy of the frame; candidate boxes are
+# mapped back to full resolution before cropping.
+WORK_WIDTH = 640
+# Plates are wide rectangles (PH plates are roughly 390x140 mm => ~2.8)
+MIN_ASPECT = 2.0
+MAX_ASPECT = 6.5
+# Candidate area as a fraction of the frame
+MIN_AREA_RATIO = 0.002
+MAX_AREA_RATIO = 0.25
+# Output ROI height in pixels (tesseract likes ~30-40 px glyphs)
+ROI_HEIGHT = 64
+
+
+def load_image(image_path: str):
+    """Read an image file as a BGR array, or None if it can't be read."""
+    if cv2 is None:
+        return None
+    return cv2.imread(image_path)
+
+
+def _order_corners(pts):
+    """Return the 4 box corners as top-left, top-right, bottom-right, bottom-left."""
+    s = pts.sum(axis=1)
+    d = np.diff(pts, axis=1).ravel()
+    return np.array([pts[np.argmin(s)], pts[np.argmin(d)],
+                     pts[np.argmax(s)], pts[np.argmax(d)]], dtype="float32")
+
+
+def find_plate_candidates(image, max_candidates: int = 5):
+    """Return plate-like boxes in the image, best first.
+
+    Each candidate is a (4, 2) float32 array of corner points in full-image
+    coordinates, ordered top-left, top-right, bottom-right, bottom-left.
+    """
+    if not LOCATOR_AVAILABLE or image is None:
+        return []
+    h, w = image.shape[:2]
+    scale = min(1.0, WORK_WIDTH / float(w))
+    small = image if scale == 1.0 else cv2.resize(image, (int(w * scale), int(h * scale)),
+                                                  interpolation=cv2.INTER_AREA)
+    gray = small if small.ndim == 2 else cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    # Bilateral filter smooths texture but keeps the plate border sharp
+    gray = cv2.bilateralFilter(gray, 9, 75, 75)
+    edges = cv2.Canny(gray, 50, 200)
+    # Close small gaps so a broken plate outline still forms one contour
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+    edges = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, kernel)
+
+    contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    frame_area = float(gray.shape[0] * gray.shape[1])
+    scored = []
+    for cnt in contours:
+        rect = cv2.minAreaRect(cnt)
+        (_, _), (rw, rh), _ = rect
+        if rw < 1 or rh < 1:
+            continue
+        long_side, short_side = max(rw, rh), min(rw, rh)
+        aspect = long_side / short_side
+        if not (MIN_ASPECT <= aspect <= MAX_ASPECT):
+            continue
+        area_ratio = (rw * rh) / frame_area
+        if not (MIN_AREA_RATIO <= area_ratio <= MAX_AREA_RATIO):
+            continue
+        # How well the contour fills its bounding rectangle (1.0 = perfect box)
+        hull_area = cv2.contourArea(cv2.convexHull(cnt))
+        fill = hull_area / (rw * rh)
+        if fill < 0.7:
+            continue
+        score = fill + area_ratio
+        scored.append((score, cv2.boxPoints(rect)))
+
+    scored.sort(key=lambda s: s[0], reverse=True)
+    candidates = []
+    for _, box in scored:
+        box = _order_corners(box / scale)
+        # Skip near-duplicates (inner and outer edge of the same border)
+        center = box.mean(axis=0)
+        if any(np.linalg.norm(center - c.mean(axis=0)) < 0.05 * w for c in candidates):
+            continue
+        candidates.append(box)
+        if len(candidates) >= max_candidates:
+            break
+    return candidates
+
+
+def crop_plate(image, box):
+    """Warp the box to an axis-aligned, binarized ROI of height ROI_HEIGHT."""
+    tl, tr, br, bl = box
+    width = max(np.linalg.norm(tr - tl), np.linalg.norm(br - bl))
+    height = max(np.linalg.norm(bl - tl), np.linalg.norm(br - tr))
+    if width < height:
+        # Box came out in portrait order; rotate the corner list a quarter turn
+        box = np.array([bl, tl, tr, br], dtype="float32")
+        width, height = height, width
+    out_w = max(1, int(round(ROI_HEIGHT * width / height)))
+    dst = np.array([[0, 0], [out_w - 1, 0], [out_w - 1, ROI_HEIGHT - 1], [0, ROI_HEIGHT - 1]],
+                   dtype="float32")
+    matrix = cv2.getPerspectiveTransform(box, dst)
+    roi = cv2.warpPerspective(image, matrix, (out_w, ROI_HEIGHT))
+    if roi.ndim == 3:
+        roi = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+    # Trim the plate border so it isn't read as I/1 characters
+    pad_x, pad_y = max(1, out_w // 40), max(1, ROI_HEIGHT // 10)
+    roi = roi[pad_y:ROI_HEIGHT - pad_y, pad_x:out_w - pad_x]
+    _, roi = cv2.threshold(roi, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    # Keep dark text on a white background
+    if np.count_nonzero(roi) < roi.size / 2:
+        roi = cv2.bitwise_not(roi)
+    return cv2.copyMakeBorder(roi, 8, 8, 8, 8, cv2.BORDER_CONSTANT, value=255)
+
+
+def extract_plate_rois(image, max_candidates: int = 5):
+    """Return binarized plate ROIs for OCR, best candidate first."""
+    return [crop_plate(image, box) for box in find_plate_candidates(image, max_candidates)]
@@ -0,0 +1,115 @@
+"""Temporal voting and de-duplication for OCR plate reads.
+
+OCR on consecutive frames of the same car gives slightly different strings
+(O/0, B/8, I/1 ...). vote_plate() combines the reads of one vehicle pass
+character by character, and PlateCache suppresses the same plate being
+reported again while the car is still in front of the camera.
+"""
+import threading
+import time
+from collections import Counter
+
+# Characters tesseract commonly confuses on plates, mapped to one canonical form
+CONFUSIONS = {
+    'O': '0', 'Q': '0', 'D': '0',
+    'I': '1', 'L': '1',
+    'Z': '2',
+    'S': '5',
+    'G': '6',
+    'B': '8',
+}
+
+
+def canonical_plate(plate: str) -> str:
+    """Return a confusion-insensitive key for a plate (e.g. 'A8C-1O5' -> 'A8C105')."""
+    plate = plate.upper().replace('-', '').replace(' ', '')
+    return "".join(CONFUSIONS.get(c, c) for c in plate)
+
+
+def vote_plate(reads: list[str | None]) -> tuple[str | None, float]:
+    """Combine several OCR reads of one vehicle into (plate, confidence).
+
+    Reads are grouped by length and the most common length wins. At each
+    position the votes for confusable characters count together, and the
+    most frequent actual character in the winning group is used. Confidence
+    is the weakest position's agreement over all non-empty reads.
+    """
+    reads = [r.upper().replace('-', '') for r in reads if r]
+    if not reads:
+        return None, 0.0
+    lengths = Counter(len(r) for r in reads)
+    best_len = max(lengths, key=lambda n: (lengths[n], n))
+    same_len = [r for r in reads if len(r) == best_len]
+
+    plate = []
+    confidence = 1.0
+    for i in range(best_len):
+        column = [r[i] for r in same_len]
+        groups = Counter(CONFUSIONS.get(c, c) for c in column)
+        key, votes = groups.most_common(1)[0]
+        members = Counter(c for c in column if CONFUSIONS.get(c, c) == key)
+        plate.append(members.most_common(1)[0][0])
+        confidence = min(confidence, votes / len(reads))
+    return "".join(plate), confidence
+
+
+class PlateCache:
+    """Short-lived cache of recently reported plates.
+
+    observe() returns the plate the first time it is seen and None for
+    repeats within `cooldown_s` seconds (each repeat extends the window, so
+    a car idling at the gate stays suppressed). Thread-safe.
+    """
+
+    def __init__(self, cooldown_s: float = 30.0, min_confidence: float = 0.5):
+        self.cooldown_s = cooldown_s
+        self.min_confidence = min_confidence
+        self._seen: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+
+    def observe(self, plate: str | None, confidence: float = 1.0, now: float | None = None) -> str | None:
+        if not plate:
+            return None
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if confidence < self.min_confidence:
+                self.rejected += 1
+                return None
+            self._expire(now)
+            key = canonical_plate(plate)
+            if key in self._seen:
+                self._seen[key] = now
+                self.hits += 1
+                return None
+            self._seen[key] = now
+            self.misses += 1
+            return plate
+
+    def observe_reads(self, reads: list[str | None], now: float | None = None) -> str | None:
+        """Vote over the reads of one vehicle pass, then observe the result."""
+        plate, confidence = vote_plate(reads)
+        return self.observe(plate, confidence, now)
+
+    def forget(self, plate: str):
+        """Allow a plate to be reported again immediately (e.g. after it exits)."""
+        with self._lock:
+            self._seen.pop(canonical_plate(plate), None)
+
+    def _expire(self, now: float):
+        cutoff = now - self.cooldown_s
+        for key in [k for k, t in self._seen.items() if t < cutoff]:
+            del self._seen[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'rejected': self.rejected,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0,
+                'cached_plates': len(self._seen),
+            }
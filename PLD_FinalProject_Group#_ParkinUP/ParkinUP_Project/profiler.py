@@ -0,0 +1,132 @@
+"""Start/stop cProfile and tracemalloc inside a running process.
+
+    from profiler import Profiler
+    prof = Profiler("profiles")
+    prof.toggle()          # start
+    ...                    # let the slow behaviour happen
+    paths = prof.toggle()  # stop: writes .prof, memory diff and summary
+
+Each session writes, under the output directory:
+    parkinup_<stamp>.prof          cProfile stats (open with pstats/snakeviz)
+    parkinup_<stamp>_start.snap    tracemalloc snapshot at start
+    parkinup_<stamp>_end.snap      tracemalloc snapshot at stop
+    parkinup_<stamp>_summary.txt   top-N functions by cumulative time and
+                                   top-N allocation growth between snapshots
+
+cProfile only sees the thread that started it (the Tk main loop in the
+GUI); tracemalloc covers allocations from every thread.
+
+To read a saved profile:
+    python profiler.py profiles/parkinup_<stamp>.prof [--top 30]
+"""
+import argparse
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import tracemalloc
+from datetime import datetime
+
+DEFAULT_TOP = 25
+
+
+def profile_summary(stats: pstats.Stats, top: int = DEFAULT_TOP, sort: str = "cumulative") -> str:
+    out = io.StringIO()
+    stats.stream = out
+    stats.sort_stats(sort).print_stats(top)
+    return out.getvalue()
+
+
+def memory_diff_summary(start: tracemalloc.Snapshot, end: tracemalloc.Snapshot, top: int = DEFAULT_TOP) -> str:
+    """Top-N source lines by allocation growth between two snapshots."""
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen *>")]
+    diff = end.filter_traces(filters).compare_to(start.filter_traces(filters), "lineno")
+    total = sum(stat.size for stat in end.statistics("filename"))
+    lines = [f"Traced memory at stop: {total / 1024:.1f} KiB", f"Top {top} allocation changes (by line):"]
+    for stat in diff[:top]:
+        frame = stat.traceback[0]
+        lines.append(f"{stat.size_diff / 1024:+10.1f} KiB {stat.count_diff:+8d} blocks  "
+                     f"{frame.filename}:{frame.lineno}")
+    return "\n".join(lines)
+
+
+class Profiler:
+    """One cProfile + tracemalloc session at a time."""
+
+    def __init__(self, out_dir: str, top: int = DEFAULT_TOP, nframes: int = 10):
+        self.out_dir = out_dir
+        self.top = top
+        self.nframes = nframes
+        self._profile: cProfile.Profile | None = None
+        self._start_snapshot = None
+        self._stamp = ""
+        self._started_tracemalloc = False
+        self._lock = threading.Lock()
+        self.last_summary = ""
+
+    @property
+    def running(self) -> bool:
+        return self._profile is not None
+
+    def start(self):
+        with self._lock:
+            if self._profile is not None:
+                return
+            self._stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            self._started_tracemalloc = not tracemalloc.is_tracing()
+            if self._started_tracemalloc:
+                tracemalloc.start(self.nframes)
+            self._start_snapshot = tracemalloc.take_snapshot()
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def stop(self) -> dict:
+        """Stop the session and write its files. Returns {'prof', 'summary', ...} paths."""
+        with self._lock:
+            if self._profile is None:
+                return {}
+            self._profile.disable()
+            profile, self._profile = self._profile, None
+            end_snapshot = tracemalloc.take_snapshot()
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+
+            os.makedirs(self.out_dir, exist_ok=True)
+            base = os.path.join(self.out_dir, f"parkinup_{self._stamp}")
+            paths = {'prof': base + ".prof", 'start_snapshot': base + "_start.snap",
+                     'end_snapshot': base + "_end.snap", 'summary': base + "_summary.txt"}
+            profile.dump_stats(paths['prof'])
+            self._start_snapshot.dump(paths['start_snapshot'])
+            end_snapshot.dump(paths['end_snapshot'])
+
+            summary = (f"Profile {self._stamp} -> {datetime.now().strftime('%Y%m%d_%H%M%S')}\n\n"
+                       + profile_summary(pstats.Stats(profile), self.top)
+                       + "\n" + memory_diff_summary(self._start_snapshot, end_snapshot, self.top) + "\n")
+            with open(paths['summary'], 'w', encoding='utf-8') as f:
+                f.write(summary)
+            self._start_snapshot = None
+            self.last_summary = summary
+            return paths
+
+    def toggle(self) -> dict:
+        """Start if idle, else stop. Returns the written paths on stop, {} on start."""
+        if self.running:
+            return self.stop()
+        self.start()
+        return {}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print the top functions of a saved .prof file.")
+    parser.add_argument("prof", help=".prof file written by a profiling session")
+    parser.add_argument("--top", type=int, default=30)
+    parser.add_argument("--sort", default="cumulative", help="pstats sort key (cumulative, tottime, calls)")
+    args = parser.parse_args(argv)
+    print(profile_summary(pstats.Stats(args.prof), args.top, args.sort))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
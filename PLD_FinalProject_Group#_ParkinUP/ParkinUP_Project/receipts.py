@@ -0,0 +1,480 @@
+"""Receipt rendering (text, ESC/POS, PDF, PNG), a print queue and batch export.
+
+Every output is rendered from the same template, compiled once at import:
+layout() turns a receipt dict (as returned by ParkingService.exit) into
+fixed-width lines tagged 'title', 'center', 'row', 'total' or 'rule', and
+each backend only decides how to draw those lines.
+
+    from receipts import PrintQueue, open_printer, render_text
+    print(render_text(receipt))
+    queue = PrintQueue(open_printer("/dev/usb/lp0"))   # or None for the stub printer
+    queue.submit(receipt)                              # returns at once; printed by a worker
+
+Batch export for audits (one pass over payments in the range):
+    python receipts.py export --db parking.db --from 2025-01-01 --to 2025-02-01 \\
+                              --out receipts_jan [--format txt,pdf,escpos,png] [--workers 4]
+    python receipts.py show --db parking.db --payment-id 42 [--format text|escpos]
+"""
+import argparse
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from metrics import metrics
+from optional_libs import load
+from utils import calculate_fee, format_currency, format_duration
+
+RECEIPT_WIDTH = 42
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+FORMATS = ("txt", "pdf", "escpos", "png")
+
+# (kind, left, right); text in {} is filled from receipt_fields()
+TEMPLATE = (
+    ("title", "ParkinUP", ""),
+    ("center", "Automated Parking System", ""),
+    ("rule", "", ""),
+    ("row", "Plate Number:", "{plate}"),
+    ("row", "Time-In:", "{entry_time}"),
+    ("row", "Time-Out:", "{exit_time}"),
+    ("row", "Duration:", "{duration}"),
+    ("row", "Rate:", "{rate}/hour"),
+    ("rule", "", ""),
+    ("total", "TOTAL FEE:", "{total}"),
+    ("rule", "", ""),
+    ("center", "Thank you for parking with us!", ""),
+    ("center", "Transaction ID: {txn_id}", ""),
+)
+
+
+def _compile_part(text: str):
+    # Static text is returned as-is; only parts with fields pay for formatting
+    if "{" not in text:
+        return lambda fields: text
+    return lambda fields, fmt=text.format_map: fmt(fields)
+
+
+_COMPILED = tuple((kind, _compile_part(left), _compile_part(right)) for kind, left, right in TEMPLATE)
+
+
+def transaction_id(receipt: dict) -> str:
+    stamp = receipt['exit_time'].replace("-", "").replace(" ", "").replace(":", "")
+    vehicle_id = receipt.get('vehicle_id')
+    return f"TXN-{stamp}-{vehicle_id}" if vehicle_id else f"TXN-{stamp}"
+
+
+def receipt_fields(receipt: dict) -> dict:
+    return {
+        'plate': receipt['plate'],
+        'entry_time': receipt['entry_time'],
+        'exit_time': receipt['exit_time'],
+        'duration': format_duration(receipt['minutes']),
+        'rate': format_currency(round(receipt.get('rate_per_min', 10 / 60) * 60, 2)),
+        'total': format_currency(receipt['amount']),
+        'txn_id': transaction_id(receipt),
+    }
+
+
+def layout(receipt: dict, width: int = RECEIPT_WIDTH) -> list[tuple[str, str]]:
+    """(kind, text) lines padded to width for monospace output."""
+    fields = receipt_fields(receipt)
+    lines = []
+    for kind, left, right in _COMPILED:
+        if kind == "rule":
+            lines.append((kind, "-" * width))
+        elif kind in ("row", "total"):
+            l, r = left(fields), right(fields)
+            lines.append((kind, l + r.rjust(max(1, width - len(l)))))
+        else:
+            lines.append((kind, left(fields).center(width).rstrip()))
+    return lines
+
+
+# ---------- Backends ----------
+def render_text(receipt: dict, width: int = RECEIPT_WIDTH) -> str:
+    return "\n".join(text for _, text in layout(receipt, width)) + "\n"
+
+
+_ESC_INIT = b"\x1b@"
+_ESC_ALIGN = {'left': b"\x1ba\x00", 'center': b"\x1ba\x01"}
+_ESC_BOLD_ON, _ESC_BOLD_OFF = b"\x1bE\x01", b"\x1bE\x00"
+_ESC_DOUBLE_ON, _ESC_DOUBLE_OFF = b"\x1d!\x11", b"\x1d!\x00"
+_ESC_FEED_CUT = b"\n\n\n\x1dV\x42\x00"
+
+
+def render_escpos(receipt: dict, width: int = RECEIPT_WIDTH) -> bytes:
+    """ESC/POS job for a thermal printer: init, centred header, bold total, feed and partial cut."""
+    out = [_ESC_INIT]
+    for kind, text in layout(receipt, width):
+        line = text.strip() if kind in ("title", "center") else text
+        data = line.encode("ascii", "replace") + b"\n"
+        if kind == "title":
+            out += [_ESC_ALIGN['center'], _ESC_DOUBLE_ON, data, _ESC_DOUBLE_OFF]
+        elif kind == "center":
+            out += [_ESC_ALIGN['center'], data]
+        elif kind == "total":
+            out += [_ESC_ALIGN['left'], _ESC_BOLD_ON, data, _ESC_BOLD_OFF]
+        else:
+            out += [_ESC_ALIGN['left'], data]
+    out.append(_ESC_FEED_CUT)
+    return b"".join(out)
+
+
+def _pdf_escape(text: str) -> bytes:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)").encode("latin-1", "replace")
+
+
+class PdfWriter:
+    """Streams receipts into a PDF, one page each, using the built-in Courier fonts.
+
+    Pages are written as they are added, so a batch of any size needs only
+    the page offsets in memory.
+    """
+
+    FONT_SIZE = 9
+    LEADING = 11
+    MARGIN = 12
+
+    def __init__(self, fileobj, width: int = RECEIPT_WIDTH):
+        self.f = fileobj
+        self.width = width
+        self._offsets: dict[int, int] = {}
+        self._pages: list[int] = []
+        self._next = 5  # 1 catalog, 2 pages, 3-4 fonts
+        self.f.write(b"%PDF-1.4\n")
+        self._object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>")
+        self._object(4, b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier-Bold /Encoding /WinAnsiEncoding >>")
+
+    def _object(self, num: int, body: bytes):
+        self._offsets[num] = self.f.tell()
+        self.f.write(b"%d 0 obj\n" % num + body + b"\nendobj\n")
+
+    def add(self, receipt: dict):
+        lines = layout(receipt, self.width)
+        page_w = self.width * self.FONT_SIZE * 0.6 + 2 * self.MARGIN
+        page_h = len(lines) * self.LEADING + 2 * self.MARGIN
+        ops = [b"BT /F1 %d Tf %d TL %d %.1f Td" % (self.FONT_SIZE, self.LEADING, self.MARGIN,
+                                                   page_h - self.MARGIN - self.FONT_SIZE)]
+        for kind, text in lines:
+            if kind in ("title", "total"):
+                ops.append(b"/F2 %d Tf (%s) Tj T* /F1 %d Tf" % (self.FONT_SIZE, _pdf_escape(text), self.FONT_SIZE))
+            else:
+                ops.append(b"(%s) Tj T*" % _pdf_escape(text))
+        ops.append(b"ET")
+        stream = b"\n".join(ops)
+        content, page = self._next, self._next + 1
+        self._next += 2
+        self._object(content, b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        self._object(page, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.1f %.1f] "
+                           b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>"
+                     % (page_w, page_h, content))
+        self._pages.append(page)
+
+    def close(self):
+        kids = b" ".join(b"%d 0 R" % p for p in self._pages)
+        self._object(2, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self._pages)))
+        self._object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        xref = self.f.tell()
+        self.f.write(b"xref\n0 %d\n0000000000 65535 f \n" % self._next)
+        for num in range(1, self._next):
+            self.f.write(b"%010d 00000 n \n" % self._offsets[num])
+        self.f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (self._next, xref))
+
+
+def render_pdf(receipt: dict, path: str, width: int = RECEIPT_WIDTH):
+    with open(path, 'wb') as f:
+        writer = PdfWriter(f, width)
+        writer.add(receipt)
+        writer.close()
+
+
+_MONO_FONTS = ("DejaVuSansMono.ttf", "consola.ttf", "cour.ttf", "Menlo.ttc", "LiberationMono-Regular.ttf")
+_font = None
+
+
+def _png_font():
+    global _font
+    if _font is None:
+        image_font = load("PIL.ImageFont")
+        for name in _MONO_FONTS:
+            try:
+                _font = image_font.truetype(name, 14)
+                break
+            except OSError:
+                continue
+        else:
+            _font = image_font.load_default()
+    return _font
+
+
+@lru_cache(maxsize=4096)
+def _png_line(text: str, bold: bool):
+    """One rendered line; header, rules and labels repeat on every receipt, so most come from here."""
+    image_mod, draw_mod = load("PIL.Image"), load("PIL.ImageDraw")
+    font = _png_font()
+    left, top, right, bottom = font.getbbox("M" * max(1, len(text)))
+    img = image_mod.new("L", (right - left + 2, bottom - top + 6), 255)
+    draw = draw_mod.Draw(img)
+    draw.text((0, -top + 3), text, fill=0, font=font)
+    if bold:
+        # Poor man's bold that works with the bitmap fallback font too
+        draw.text((1, -top + 3), text, fill=0, font=font)
+    return img
+
+
+def render_png(receipt: dict, path: str, width: int = RECEIPT_WIDTH):
+    """Receipt as a white PNG (needs Pillow)."""
+    image_mod = load("PIL.Image")
+    if image_mod is None or load("PIL.ImageDraw") is None:
+        raise RuntimeError("PNG receipts need Pillow")
+    lines = layout(receipt, width)
+    # Rows and rules span the full width, so any of them gives the canvas width
+    line_w, line_h = _png_line("-" * width, False).size
+    img = image_mod.new("L", (line_w + 32, line_h * len(lines) + 32), 255)
+    for i, (kind, text) in enumerate(lines):
+        if text:
+            img.paste(_png_line(text, kind in ("title", "total")), (16, 16 + i * line_h))
+    img.save(path, compress_level=1)
+
+
+# ---------- Printing ----------
+class FilePrinter:
+    """Writes ESC/POS jobs to a file or a printer device node (e.g. /dev/usb/lp0)."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def write(self, job: bytes):
+        with open(self.path, 'ab') as f:
+            f.write(job)
+
+    def __repr__(self):
+        return f"FilePrinter({self.path!r})"
+
+
+class StubPrinter:
+    """Stands in for a printer during development: keeps the latest jobs in memory."""
+
+    def __init__(self, keep: int = 20):
+        self.keep = keep
+        self.jobs: list[bytes] = []
+
+    def write(self, job: bytes):
+        self.jobs = (self.jobs + [job])[-self.keep:]
+
+    def __repr__(self):
+        return "StubPrinter()"
+
+
+def open_printer(target: str | None):
+    """FilePrinter for a path, StubPrinter when target is empty."""
+    return FilePrinter(target) if target else StubPrinter()
+
+
+class PrintQueue:
+    """Renders and prints receipts on a worker thread so the UI never waits on the printer."""
+
+    def __init__(self, printer, width: int = RECEIPT_WIDTH, maxsize: int = 100):
+        self.printer = printer
+        self.width = width
+        self.printed = 0
+        self.failed = 0
+        self.last_error: Exception | None = None
+        self._queue: queue.Queue = queue.Queue(maxsize)
+        self._worker = threading.Thread(target=self._run, name="receipt-printer", daemon=True)
+        self._worker.start()
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, receipt: dict) -> bool:
+        """Queue receipt for printing; False if the queue is full or closed."""
+        try:
+            self._queue.put_nowait(dict(receipt))
+            return True
+        except queue.Full:
+            metrics.incr("receipt.print_dropped")
+            return False
+
+    def _run(self):
+        while True:
+            receipt = self._queue.get()
+            if receipt is None:
+                return
+            try:
+                with metrics.timer("receipt.print"):
+                    self.printer.write(render_escpos(receipt, self.width))
+                self.printed += 1
+                metrics.incr("receipt.printed")
+            except Exception as e:
+                self.failed += 1
+                self.last_error = e
+                metrics.incr("receipt.print_errors")
+
+    def close(self, timeout: float = 5.0):
+        """Print what is queued (up to timeout), then stop the worker."""
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._worker.join(timeout)
+
+
+# ---------- Batch export ----------
+RECEIPTS_SQL = (
+    "SELECT p.payment_id, p.vehicle_id, p.amount, p.payment_time, v.vehicle_number, v.entry_time, "
+    "v.exit_time, s.slot_number "
+    "FROM payments p JOIN vehicles v ON v.vehicle_id = p.vehicle_id "
+    "LEFT JOIN slots s ON s.slot_id = v.slot_id "
+)
+
+
+def _receipt_from_row(row, rate_per_min: float) -> dict:
+    payment_id, vehicle_id, amount, payment_time, plate, entry_time, exit_time, slot_number = row
+    exit_time = exit_time or payment_time
+    minutes, _ = calculate_fee(entry_time, exit_time, rate_per_min=rate_per_min)
+    return {'payment_id': payment_id, 'vehicle_id': vehicle_id, 'plate': plate, 'slot_number': slot_number,
+            'entry_time': entry_time, 'exit_time': exit_time, 'minutes': minutes, 'amount': amount,
+            'rate_per_min': rate_per_min}
+
+
+def iter_receipts(db_path: str, start: str, end: str, rate_per_min: float = 10 / 60):
+    """Receipts for payments with start <= payment_time < end, in payment order."""
+    conn = sqlite3.connect(db_path)
+    try:
+        cur = conn.execute(RECEIPTS_SQL + "WHERE p.payment_time >= ? AND p.payment_time < ? "
+                                          "ORDER BY p.payment_time, p.payment_id", (start, end))
+        while True:
+            rows = cur.fetchmany(1000)
+            if not rows:
+                return
+            for row in rows:
+                yield _receipt_from_row(row, rate_per_min)
+    finally:
+        conn.close()
+
+
+def get_receipt(db_path: str, payment_id: int, rate_per_min: float = 10 / 60) -> dict | None:
+    conn = sqlite3.connect(db_path)
+    try:
+        row = conn.execute(RECEIPTS_SQL + "WHERE p.payment_id = ?", (payment_id,)).fetchone()
+    finally:
+        conn.close()
+    return _receipt_from_row(row, rate_per_min) if row else None
+
+
+def export(db_path: str, start: str, end: str, out_dir: str, formats=("txt", "pdf"),
+           width: int = RECEIPT_WIDTH, rate_per_min: float = 10 / 60, workers: int = 4) -> dict:
+    """Write receipts for [start, end) to out_dir.
+
+    txt, pdf and escpos go to one combined file each (receipts.txt with a
+    form feed between receipts, receipts.pdf with a page per receipt,
+    receipts.escpos as one print job stream); png writes one file per
+    receipt, rendered in `workers` processes (text drawing holds the GIL).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    begin = time.perf_counter()
+    txt = open(os.path.join(out_dir, "receipts.txt"), 'w', encoding='utf-8') if "txt" in formats else None
+    pdf_file = open(os.path.join(out_dir, "receipts.pdf"), 'wb') if "pdf" in formats else None
+    escpos = open(os.path.join(out_dir, "receipts.escpos"), 'wb') if "escpos" in formats else None
+    pdf = PdfWriter(pdf_file, width) if pdf_file else None
+    png_dir = os.path.join(out_dir, "png") if "png" in formats else None
+    if png_dir:
+        os.makedirs(png_dir, exist_ok=True)
+    count = 0
+    revenue = 0.0
+    pending = set()
+    try:
+        with ProcessPoolExecutor(max_workers=max(1, workers)) if png_dir else nullcontext() as pool:
+            for receipt in iter_receipts(db_path, start, end, rate_per_min):
+                count += 1
+                revenue += receipt['amount']
+                if txt:
+                    if count > 1:
+                        txt.write("\f\n")
+                    txt.write(render_text(receipt, width))
+                if pdf:
+                    pdf.add(receipt)
+                if escpos:
+                    escpos.write(render_escpos(receipt, width))
+                if png_dir:
+                    # Bounded in-flight jobs, as in ocr_batch, so memory stays flat
+                    if len(pending) >= workers * 2:
+                        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for fut in finished:
+                            fut.result()
+                    path = os.path.join(png_dir, f"{transaction_id(receipt)}-{receipt['payment_id']}.png")
+                    pending.add(pool.submit(render_png, receipt, path, width))
+            for fut in pending:
+                fut.result()
+        if pdf:
+            pdf.close()
+    finally:
+        for f in (txt, pdf_file, escpos):
+            if f:
+                f.close()
+    elapsed = time.perf_counter() - begin
+    return {'receipts': count, 'revenue': round(revenue, 2), 'elapsed_s': round(elapsed, 3),
+            'receipts_per_s': round(count / elapsed) if elapsed > 0 else 0, 'formats': list(formats)}
+
+
+def _day(value: str) -> str:
+    """Accept 'YYYY-MM-DD' or a full timestamp; return a timestamp string."""
+    try:
+        return datetime.strptime(value, TIME_FORMAT).strftime(TIME_FORMAT)
+    except ValueError:
+        return datetime.strptime(value, "%Y-%m-%d").strftime(TIME_FORMAT)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render or bulk-export ParkinUP receipts.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    exp = sub.add_parser("export", help="regenerate every receipt paid in a date range")
+    exp.add_argument("--db", required=True)
+    exp.add_argument("--from", dest="start", required=True, help="first day (YYYY-MM-DD or full timestamp)")
+    exp.add_argument("--to", dest="end", help="day after the last (default: --from plus one day)")
+    exp.add_argument("--out", required=True, help="output folder")
+    exp.add_argument("--format", default="txt,pdf", help=f"comma-separated subset of {','.join(FORMATS)}")
+    exp.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="PNG render processes")
+    show = sub.add_parser("show", help="print one receipt")
+    show.add_argument("--db", required=True)
+    show.add_argument("--payment-id", type=int, required=True)
+    show.add_argument("--format", choices=("text", "escpos"), default="text")
+    for p in (exp, show):
+        p.add_argument("--width", type=int, default=RECEIPT_WIDTH, help="characters per line")
+        p.add_argument("--rate", type=float, default=10.0, help="hourly rate shown on receipts")
+    args = parser.parse_args(argv)
+
+    if args.command == "show":
+        receipt = get_receipt(args.db, args.payment_id, args.rate / 60)
+        if receipt is None:
+            print(f"No payment {args.payment_id}", file=sys.stderr)
+            return 1
+        if args.format == "escpos":
+            sys.stdout.buffer.write(render_escpos(receipt, args.width))
+        else:
+            sys.stdout.write(render_text(receipt, args.width))
+        return 0
+
+    formats = tuple(f.strip() for f in args.format.split(",") if f.strip())
+    unknown = [f for f in formats if f not in FORMATS]
+    if unknown:
+        parser.error(f"unknown format(s): {', '.join(unknown)}")
+    start = _day(args.start)
+    end = _day(args.end) if args.end else (datetime.strptime(start, TIME_FORMAT) + timedelta(days=1)).strftime(TIME_FORMAT)
+    summary = export(args.db, start, end, args.out, formats, args.width, args.rate / 60, args.workers)
+    print(f"Exported {summary['receipts']} receipts ({format_currency(summary['revenue'])}) as "
+          f"{', '.join(summary['formats'])} in {summary['elapsed_s']} s "
+          f"=> {summary['receipts_per_s']} receipts/s -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""In-memory interval index over slot reservations.
+
+Reservations on one slot never overlap, so per slot they form a sorted run
+of disjoint [start, end) intervals. ReservationIndex keeps, per slot,
+parallel sorted arrays of starts and ends (epoch seconds), which answers the
+interval-tree questions the gate needs with one bisect each:
+
+    index.conflict(slot_id, start, end)     # reservation overlapping the window, or None
+    index.next_start(slot_id, t)            # when the slot is next needed
+    index.is_held(slot_id, t)               # booked now or within WALK_IN_HOLD_S
+    index.find_slot(slot_ids, start, end)   # first slot free for the window
+    index.earliest_window(slot_ids, 3600, after=t)  # earliest (start, slot) with an hour free
+
+The conflict check relies on disjointness: the only reservation that can
+overlap [start, end) is the last one starting before `end`. The SQL side
+(idx_reservations_slot_start) answers the same query the same way, so the
+database stays the authority when several processes book at once.
+
+ParkingService keeps one index in sync with the reservations table; it
+only holds active reservations that have not ended yet.
+"""
+import bisect
+import threading
+
+# A reservation holder may take their slot this early
+ARRIVAL_GRACE_S = 15 * 60
+# Walk-ins (unknown stay) are not given a slot booked to start within this
+WALK_IN_HOLD_S = 60 * 60
+
+
+class ReservationIndex:
+    """Per-slot sorted, non-overlapping reservation intervals. Thread-safe."""
+
+    def __init__(self):
+        self._starts: dict[int, list[int]] = {}
+        self._ends: dict[int, list[int]] = {}
+        self._ids: dict[int, list[int]] = {}
+        # reservation_id -> (slot_id, plate, start, end)
+        self._by_id: dict[int, tuple[int, str, int, int]] = {}
+        self._by_plate: dict[str, set[int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def load(self, rows):
+        """Replace the contents with (reservation_id, slot_id, plate, start, end) rows."""
+        with self._lock:
+            self._starts.clear()
+            self._ends.clear()
+            self._ids.clear()
+            self._by_id.clear()
+            self._by_plate.clear()
+            for rid, slot_id, plate, start, end in sorted(rows, key=lambda r: (r[1], r[3])):
+                self._starts.setdefault(slot_id, []).append(start)
+                self._ends.setdefault(slot_id, []).append(end)
+                self._ids.setdefault(slot_id, []).append(rid)
+                self._index_locked(rid, slot_id, plate, start, end)
+
+    def _index_locked(self, rid, slot_id, plate, start, end):
+        self._by_id[rid] = (slot_id, plate, start, end)
+        self._by_plate.setdefault(plate, set()).add(rid)
+
+    def add(self, rid: int, slot_id: int, plate: str, start: int, end: int):
+        """Insert a reservation; the caller has checked it does not conflict."""
+        with self._lock:
+            starts = self._starts.setdefault(slot_id, [])
+            i = bisect.bisect_left(starts, start)
+            starts.insert(i, start)
+            self._ends.setdefault(slot_id, []).insert(i, end)
+            self._ids.setdefault(slot_id, []).insert(i, rid)
+            self._index_locked(rid, slot_id, plate, start, end)
+
+    def remove(self, rid: int) -> bool:
+        with self._lock:
+            entry = self._by_id.pop(rid, None)
+            if entry is None:
+                return False
+            slot_id, plate, start, _ = entry
+            starts = self._starts[slot_id]
+            i = bisect.bisect_left(starts, start)
+            del starts[i], self._ends[slot_id][i], self._ids[slot_id][i]
+            plates = self._by_plate[plate]
+            plates.discard(rid)
+            if not plates:
+                del self._by_plate[plate]
+            return True
+
+    def get(self, rid: int):
+        """(slot_id, plate, start, end) or None."""
+        return self._by_id.get(rid)
+
+    # ---------- Queries ----------
+    def conflict(self, slot_id: int, start: int, end: int):
+        """Id of the reservation on slot_id overlapping [start, end), or None."""
+        starts = self._starts.get(slot_id)
+        if not starts:
+            return None
+        with self._lock:
+            i = bisect.bisect_left(starts, end) - 1
+            if i >= 0 and self._ends[slot_id][i] > start:
+                return self._ids[slot_id][i]
+        return None
+
+    def next_start(self, slot_id: int, t: int):
+        """Start of the reservation covering t or the first one after it; None if the slot is free from t on."""
+        starts = self._starts.get(slot_id)
+        if not starts:
+            return None
+        with self._lock:
+            i = bisect.bisect_right(starts, t) - 1
+            if i >= 0 and self._ends[slot_id][i] > t:
+                return starts[i]
+            return starts[i + 1] if i + 1 < len(starts) else None
+
+    def is_held(self, slot_id: int, t: int, hold: int = WALK_IN_HOLD_S) -> bool:
+        """True if slot_id is booked at t or within `hold` seconds after it (kept from walk-ins)."""
+        next_start = self.next_start(slot_id, t)
+        return next_start is not None and next_start < t + hold
+
+    def find_slot(self, slot_ids, start: int, end: int):
+        """First slot in slot_ids with no reservation overlapping [start, end), or None."""
+        for slot_id in slot_ids:
+            if self.conflict(slot_id, start, end) is None:
+                return slot_id
+        return None
+
+    def earliest_window(self, slot_ids, duration: int, after: int):
+        """(start, slot_id) of the earliest window of `duration` seconds at or after `after`, or None."""
+        best = None
+        with self._lock:
+            for slot_id in slot_ids:
+                starts = self._starts.get(slot_id)
+                if not starts:
+                    return after, slot_id
+                ends = self._ends[slot_id]
+                candidate = after
+                i = bisect.bisect_right(starts, candidate) - 1
+                if i >= 0 and ends[i] > candidate:
+                    candidate = ends[i]
+                i += 1
+                # Walk the gaps until one is wide enough
+                while i < len(starts) and starts[i] < candidate + duration:
+                    candidate = ends[i]
+                    i += 1
+                if best is None or candidate < best[0]:
+                    best = (candidate, slot_id)
+        return best
+
+    def for_plate(self, plate: str, t: int, early: int = ARRIVAL_GRACE_S):
+        """(reservation_id, slot_id) of plate's reservation that can be claimed at t, or None."""
+        with self._lock:
+            for rid in self._by_plate.get(plate, ()):
+                slot_id, _, start, end = self._by_id[rid]
+                if start - early <= t < end:
+                    return rid, slot_id
+        return None
+
+    def prune(self, before: int) -> int:
+        """Forget reservations that ended at or before `before`. Returns how many."""
+        with self._lock:
+            expired = [rid for rid, (_, _, _, end) in self._by_id.items() if end <= before]
+        for rid in expired:
+            self.remove(rid)
+        return len(expired)
@@ -0,0 +1,162 @@
+"""One Tk timer for all of the GUI's periodic jobs.
+
+    from scheduler import Scheduler
+    scheduler = Scheduler(root)
+    scheduler.every("refresh-status", 30000, refresh_status, group="dashboard")
+    ...
+    scheduler.cancel_group("dashboard")   # page teardown
+
+Jobs are keyed by name: registering a name again replaces the old job
+instead of starting a second chain. A job stops itself by returning False.
+Only one root.after() is pending at any time; each wake-up runs every job
+that is due within `coalesce_ms`, so e.g. the 30 s status refresh and the
+60 s duration update share one wake-up instead of two.
+
+Job run times go to the metrics registry as "ui.job.<name>"; stats() and
+dump_text() give per-job counts for the metrics panel.
+"""
+import time
+import traceback
+
+from metrics import metrics
+
+DEFAULT_COALESCE_MS = 15
+
+
+class _Job:
+    __slots__ = ('name', 'interval', 'callback', 'group', 'due', 'runs', 'total', 'max', 'errors')
+
+    def __init__(self, name: str, interval: float, callback, group, due: float):
+        self.name = name
+        self.interval = interval
+        self.callback = callback
+        self.group = group
+        self.due = due
+        self.runs = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.errors = 0
+
+
+class Scheduler:
+    """Named repeating jobs multiplexed onto a single Tk after() timer."""
+
+    def __init__(self, root, coalesce_ms: int = DEFAULT_COALESCE_MS):
+        self.root = root
+        self.coalesce = coalesce_ms / 1000.0
+        self._jobs: dict[str, _Job] = {}
+        self._after_id = None
+        self._armed_for = None
+        self._in_tick = False
+        self.wakeups = 0
+        self.coalesced = 0
+
+    # ---------- Registration ----------
+    def every(self, name: str, interval_ms: int, callback, group: str | None = None, run_now: bool = False):
+        """Run callback every interval_ms, replacing any job with the same name."""
+        now = time.monotonic()
+        interval = interval_ms / 1000.0
+        self._jobs[name] = _Job(name, interval, callback, group, now if run_now else now + interval)
+        self._arm()
+
+    def cancel(self, name: str) -> bool:
+        removed = self._jobs.pop(name, None) is not None
+        if removed:
+            self._arm()
+        return removed
+
+    def cancel_group(self, group: str) -> int:
+        """Cancel every job registered under group (page teardown). Returns how many."""
+        names = [name for name, job in self._jobs.items() if job.group == group]
+        for name in names:
+            del self._jobs[name]
+        if names:
+            self._arm()
+        return len(names)
+
+    def cancel_all(self):
+        self._jobs.clear()
+        self._arm()
+
+    def is_active(self, name: str) -> bool:
+        return name in self._jobs
+
+    @property
+    def active(self) -> int:
+        return len(self._jobs)
+
+    # ---------- Timer ----------
+    def _arm(self):
+        if self._in_tick:
+            return  # _tick re-arms once every due job has run
+        due = min((job.due for job in self._jobs.values()), default=None)
+        if due == self._armed_for:
+            return
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        self._armed_for = due
+        if due is not None:
+            delay_ms = max(0, int((due - time.monotonic()) * 1000))
+            self._after_id = self.root.after(delay_ms, self._tick)
+
+    def _tick(self):
+        self._after_id = None
+        self._armed_for = None
+        self._in_tick = True
+        try:
+            now = time.monotonic()
+            due = [job for job in self._jobs.values() if job.due <= now + self.coalesce]
+            self.wakeups += 1
+            if len(due) > 1:
+                self.coalesced += len(due) - 1
+            for job in due:
+                # An earlier job in this batch may have cancelled or replaced it
+                if self._jobs.get(job.name) is not job:
+                    continue
+                self._run(job)
+        finally:
+            self._in_tick = False
+        self._arm()
+
+    def _run(self, job: _Job):
+        start = time.perf_counter()
+        keep = True
+        try:
+            keep = job.callback() is not False
+        except Exception:
+            job.errors += 1
+            metrics.incr(f"ui.job.{job.name}.errors")
+            traceback.print_exc()
+        elapsed = time.perf_counter() - start
+        job.runs += 1
+        job.total += elapsed
+        job.max = max(job.max, elapsed)
+        metrics.observe(f"ui.job.{job.name}", elapsed)
+        if not keep:
+            if self._jobs.get(job.name) is job:
+                del self._jobs[job.name]
+            return
+        # Fixed rate, but never queue up catch-up runs after a stall
+        job.due = max(job.due + job.interval, time.monotonic())
+
+    # ---------- Reporting ----------
+    def stats(self) -> list[dict]:
+        return [{
+            'name': job.name,
+            'group': job.group,
+            'interval_ms': round(job.interval * 1000),
+            'runs': job.runs,
+            'mean_ms': round(job.total / job.runs * 1000.0, 3) if job.runs else 0.0,
+            'max_ms': round(job.max * 1000.0, 3),
+            'total_ms': round(job.total * 1000.0, 1),
+            'errors': job.errors,
+        } for job in sorted(self._jobs.values(), key=lambda j: j.name)]
+
+    def dump_text(self) -> str:
+        lines = [f"scheduler: {self.active} active jobs, {self.wakeups} wake-ups, {self.coalesced} coalesced runs",
+                 f"{'job':<24}{'group':<14}{'every ms':>10}{'runs':>8}{'mean ms':>10}{'max ms':>10}{'total ms':>10}"]
+        for s in self.stats():
+            lines.append(f"{s['name']:<24}{s['group'] or '-':<14}{s['interval_ms']:>10}{s['runs']:>8}"
+                         f"{s['mean_ms']:>10.3f}{s['max_ms']:>10.3f}{s['total_ms']:>10.1f}")
+        return "\n".join(lines)
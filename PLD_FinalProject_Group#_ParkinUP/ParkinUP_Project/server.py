@@ -0,0 +1,309 @@
+"""Local HTTP/JSON API for gate controllers, pay kiosks and signage.
+
+Usage:
+    python server.py [--host 127.0.0.1] [--port 8080] [--db parking.db] [--workers 8] [--journal DIR]
+                     [--policy first-free|nearest|fill-level|balanced]
+
+Endpoints (JSON in, JSON out):
+    POST /park        {"plate": "ABC1234", "owner": "", "type": "standard"} -> session
+    POST /exit        {"plate": "ABC1234"}               -> receipt (with transaction_id)
+                      (both take an optional "request_id"; a retry with the same one
+                       returns the first result with "replayed": true)
+    GET  /quote?plate=ABC1234                            -> fee if exiting now
+    GET  /occupancy                                      -> slot counts
+    GET  /occupancy?at=2025-01-07 08:15:00               -> occupancy at a past instant
+    GET  /occupancy/history?from=...&to=...&resolution=hour -> occupancy buckets
+    POST /reserve     {"plate": "ABC1234", "start": "...", "end": "...", "slot": null} -> reservation
+    POST /reservations/cancel {"reservation_id": 7}     -> cancelled
+    GET  /reservations?limit=50                          -> upcoming reservations
+    GET  /reservations/earliest?minutes=120[&after=...]  -> earliest bookable window
+    GET  /events?limit=50                                -> recent park/exit events
+    GET  /metrics                                        -> per-route latency stats (the http.* timers)
+    GET  /debug/metrics                                  -> service/SQL/OCR timers and counters
+
+The event loop only parses HTTP; every database call runs on a thread pool
+through the same ParkingService the GUI uses.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from allocation import POLICIES, SLOT_TYPES
+from journal import Journal, seed_from_db
+from metrics import metrics
+from occupancy_ts import RESOLUTIONS, TIME_FORMAT, seed_if_empty as seed_occupancy, to_epoch
+from parking_service import (AlreadyParked, DatabaseBusy, NoSlotAvailable, NotParked, NotReserved, ParkingError,
+                             ParkingService, ReservationConflict)
+from utils import init_db
+
+DB_PATH = os.path.join(os.path.dirname(__file__), "parking.db")
+MAX_BODY = 64 * 1024
+MAX_HISTORY_BUCKETS = 10000
+MAX_REQUEST_ID = 128
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class ParkingServer:
+    def __init__(self, service: ParkingService, workers: int = 8):
+        self.service = service
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db")
+        self._routes = {
+            ('POST', '/park'): self.park,
+            ('POST', '/exit'): self.exit,
+            ('GET', '/quote'): self.quote,
+            ('GET', '/occupancy'): self.occupancy,
+            ('GET', '/occupancy/history'): self.occupancy_history,
+            ('POST', '/reserve'): self.reserve,
+            ('POST', '/reservations/cancel'): self.cancel_reservation,
+            ('GET', '/reservations'): self.reservations,
+            ('GET', '/reservations/earliest'): self.earliest_reservation,
+            ('GET', '/events'): self.events,
+            ('GET', '/metrics'): self.get_metrics,
+            ('GET', '/debug/metrics'): self.get_debug_metrics,
+        }
+
+    async def _db(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+
+    # ---------- Handlers ----------
+    async def park(self, query, body):
+        plate = _require_plate(body.get('plate'))
+        vehicle_type = body.get('type') or "standard"
+        if vehicle_type not in SLOT_TYPES:
+            raise HTTPError(400, f"type must be one of {', '.join(SLOT_TYPES)}")
+        return await self._db(self.service.park, plate, str(body.get('owner') or ""), vehicle_type,
+                              _request_id(body.get('request_id')))
+
+    async def exit(self, query, body):
+        return await self._db(self.service.exit, _require_plate(body.get('plate')),
+                              _request_id(body.get('request_id')))
+
+    async def quote(self, query, body):
+        return await self._db(self.service.quote, _require_plate(query.get('plate')))
+
+    async def occupancy(self, query, body):
+        if query.get('at'):
+            return await self._db(self.service.occupancy_at, _require_time(query['at']))
+        return await self._db(self.service.occupancy)
+
+    async def occupancy_history(self, query, body):
+        start = _require_time(query.get('from'))
+        end = _require_time(query.get('to'))
+        resolution = query.get('resolution') or "hour"
+        if resolution not in RESOLUTIONS:
+            raise HTTPError(400, f"resolution must be one of {', '.join(RESOLUTIONS)}")
+        if (to_epoch(end) - to_epoch(start)) // RESOLUTIONS[resolution] > MAX_HISTORY_BUCKETS:
+            raise HTTPError(400, f"at most {MAX_HISTORY_BUCKETS} buckets per request")
+        return {'buckets': await self._db(self.service.occupancy_history, start, end, resolution)}
+
+    async def reserve(self, query, body):
+        plate = _require_plate(body.get('plate'))
+        start = _require_time(body.get('start'))
+        end = _require_time(body.get('end'))
+        return await self._db(self.service.reserve, plate, start, end, body.get('slot') or None)
+
+    async def cancel_reservation(self, query, body):
+        reservation_id = body.get('reservation_id')
+        if not isinstance(reservation_id, int):
+            raise HTTPError(400, "reservation_id must be an integer")
+        return await self._db(self.service.cancel_reservation, reservation_id)
+
+    async def reservations(self, query, body):
+        try:
+            limit = max(1, min(500, int(query.get('limit') or 50)))
+        except ValueError:
+            raise HTTPError(400, "limit must be an integer") from None
+        rows = await self._db(self.service.upcoming_reservations, limit)
+        return {'reservations': [{'reservation_id': rid, 'plate': plate, 'slot_number': slot_no,
+                                  'start_time': start, 'end_time': end}
+                                 for rid, plate, slot_no, start, end in rows]}
+
+    async def earliest_reservation(self, query, body):
+        try:
+            minutes = int(query.get('minutes') or 60)
+        except ValueError:
+            raise HTTPError(400, "minutes must be an integer") from None
+        if minutes <= 0:
+            raise HTTPError(400, "minutes must be positive")
+        after = _require_time(query['after']) if query.get('after') else None
+        return {'window': await self._db(self.service.earliest_reservation, minutes, after)}
+
+    async def events(self, query, body):
+        try:
+            limit = max(1, min(500, int(query.get('limit') or 50)))
+        except ValueError:
+            raise HTTPError(400, "limit must be an integer") from None
+        return {'events': await self._db(self.service.recent_events, limit)}
+
+    async def get_metrics(self, query, body):
+        snap = metrics.snapshot()
+        return {name[len("http."):]: dict(stats, errors=snap['counters'].get(f"{name}.errors", 0))
+                for name, stats in snap['timers'].items() if name.startswith("http.")}
+
+    async def get_debug_metrics(self, query, body):
+        return metrics.snapshot()
+
+    # ---------- HTTP plumbing ----------
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request_line = await reader.readline()
+                except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+                    break
+                if not request_line:
+                    break
+                start = time.perf_counter()
+                keep_alive, route, status, payload = await self._handle_request(request_line, reader)
+                body = json.dumps(payload).encode('utf-8')
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('ascii') + body)
+                await writer.drain()
+                metrics.observe(f"http.{route}", time.perf_counter() - start)
+                if status >= 400:
+                    metrics.incr(f"http.{route}.errors")
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_request(self, request_line: bytes, reader: asyncio.StreamReader):
+        keep_alive = True
+        route = "invalid"
+        try:
+            try:
+                method, target, version = request_line.decode('latin-1').split()
+            except ValueError:
+                raise HTTPError(400, "malformed request line") from None
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode('latin-1').partition(":")
+                headers[name.strip().lower()] = value.strip()
+            connection = headers.get('connection', '').lower()
+            keep_alive = connection != 'close' and (version == 'HTTP/1.1' or connection == 'keep-alive')
+
+            declared = headers.get('content-length') or "0"
+            if not declared.isdecimal():
+                # No way to tell where the body ends, so the connection can't be reused
+                keep_alive = False
+                raise HTTPError(400, "invalid Content-Length")
+            length = int(declared)
+            if length > MAX_BODY:
+                keep_alive = False
+                raise HTTPError(413, "request body too large")
+            raw = await reader.readexactly(length) if length else b""
+
+            url = urlsplit(target)
+            route = url.path
+            handler = self._routes.get((method.upper(), url.path))
+            if handler is None:
+                known = any(path == url.path for _, path in self._routes)
+                raise HTTPError(405 if known else 404, f"no route for {method} {url.path}")
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            try:
+                body = json.loads(raw) if raw else {}
+            except ValueError:
+                raise HTTPError(400, "body must be JSON") from None
+            if not isinstance(body, dict):
+                raise HTTPError(400, "body must be a JSON object")
+            return keep_alive, route, 200, await handler(query, body)
+        except HTTPError as e:
+            return keep_alive, route, e.status, {'error': str(e)}
+        except (NotParked, NotReserved) as e:
+            return keep_alive, route, 404, {'error': str(e)}
+        except (NoSlotAvailable, AlreadyParked, ReservationConflict) as e:
+            return keep_alive, route, 409, {'error': str(e)}
+        except DatabaseBusy as e:
+            return keep_alive, route, 503, {'error': str(e)}
+        except ParkingError as e:
+            return keep_alive, route, 400, {'error': str(e)}
+        except asyncio.IncompleteReadError:
+            return False, route, 400, {'error': "incomplete request body"}
+        except Exception as e:
+            return keep_alive, route, 500, {'error': f"{type(e).__name__}: {e}"}
+
+    async def serve(self, host: str, port: int, ready=None):
+        server = await asyncio.start_server(self.handle_connection, host, port, backlog=1024)
+        bound = server.sockets[0].getsockname()
+        print(f"ParkinUP API listening on http://{bound[0]}:{bound[1]}", flush=True)
+        if ready is not None:
+            ready(bound)
+        async with server:
+            await server.serve_forever()
+
+
+def _require_plate(value) -> str:
+    if not isinstance(value, str) or not value.strip():
+        raise HTTPError(400, "plate is required")
+    return value.strip()
+
+
+def _request_id(value):
+    """Optional client request ID for idempotent retries; None when absent."""
+    if value is None or value == "":
+        return None
+    if not isinstance(value, str) or len(value) > MAX_REQUEST_ID:
+        raise HTTPError(400, f"request_id must be a string of at most {MAX_REQUEST_ID} characters")
+    return value
+
+
+def _require_time(value) -> str:
+    """'YYYY-MM-DD HH:MM:SS' or 'YYYY-MM-DD' (midnight), normalized to the former."""
+    for fmt in (TIME_FORMAT, "%Y-%m-%d"):
+        try:
+            return datetime.strptime((value or "").strip(), fmt).strftime(TIME_FORMAT)
+        except ValueError:
+            pass
+    raise HTTPError(400, "time must be 'YYYY-MM-DD HH:MM:SS' or 'YYYY-MM-DD'")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the ParkinUP local HTTP/JSON API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database (default: parking.db next to this file)")
+    parser.add_argument("--workers", type=int, default=8, help="database worker threads")
+    parser.add_argument("--policy", choices=tuple(POLICIES),
+                        help="slot allocation policy (default: $PARKINUP_ALLOCATION or first-free)")
+    parser.add_argument("--journal", metavar="DIR", help="append every state change to this event journal")
+    args = parser.parse_args(argv)
+
+    init_db(args.db, total_slots=20)
+    seed_occupancy(args.db)
+    journal = None
+    if args.journal:
+        journal = Journal(args.journal)
+        if journal.is_empty():
+            seed_from_db(journal, args.db)
+    server = ParkingServer(ParkingService(args.db, journal=journal, policy=args.policy), workers=args.workers)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if journal is not None:
+            journal.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,10 @@ import os
 import sqlite3
 from datetime import datetime, timedelta
 import tkinter as tk
-from tkinter import ttk
 
-from utils import calculate_fee, format_currency
+from receipts import layout, render_text
+from ui import show_receipt_dialog
+from utils import calculate_fee
 
 DB_PATH = os.path.join(os.path.dirname(__file__), "parking.db")
 
@@ -53,68 +54,14 @@ minutes, amount = calculate_fee(entry_time, now_str, rate_per_min= (10.0/60.0))
 
 conn.close()
 
-# Show receipt window (reuse format from main.show_receipt)
+# Show receipt window (same template as main.show_receipt)
+receipt = {'vehicle_id': vid, 'plate': plate, 'slot_number': slot_no, 'entry_time': entry_time,
+           'exit_time': now_str, 'minutes': minutes, 'amount': amount, 'rate_per_min': 10.0 / 60.0}
+print(render_text(receipt))
+
 root = tk.Tk()
 root.withdraw()
-win = tk.Toplevel()
-win.title("ParkinUP - Sample Receipt")
-win.geometry("420x420")
-win.resizable(False, False)
-frame = tk.Frame(win, bg="#ffffff", bd=12)
-frame.pack(expand=True, fill="both")
-
-title = tk.Label(frame, text="ParkinUP", font=("Segoe UI", 18, "bold"), bg="#ffffff")
-title.pack()
-subtitle = tk.Label(frame, text="Automated Parking System", font=("Segoe UI", 10), bg="#ffffff")
-subtitle.pack()
-
-sep = ttk.Separator(frame, orient="horizontal")
-sep.pack(fill="x", pady=8)
-
-body = tk.Frame(frame, bg="#ffffff")
-body.pack(fill="both", expand=True, padx=6)
-mono = ("Courier", 10)
-
-def row(label_text, value_text):
-    r = tk.Frame(body, bg="#ffffff")
-    r.pack(fill="x", pady=2)
-    tk.Label(r, text=label_text, font=mono, bg="#ffffff").pack(side="left")
-    tk.Label(r, text=value_text, font=mono, bg="#ffffff").pack(side="right")
-
-row("Plate Number:", plate)
-row("Time-In:", entry_time)
-row("Time-Out:", now_str)
-if minutes >= 60:
-    hrs = minutes // 60
-    mins = minutes % 60
-    dur_text = f"{hrs} hr {mins} min" if mins else f"{hrs} hr"
-else:
-    dur_text = f"{minutes} min"
-row("Duration:", dur_text)
-per_hour = 10.00
-row("Rate:", f"{format_currency(per_hour)}/hour")
-
-sep2 = ttk.Separator(body, orient="horizontal")
-sep2.pack(fill="x", pady=8)
-
-total_frame = tk.Frame(body, bg="#ffffff")
-total_frame.pack(fill="x")
-tk.Label(total_frame, text="TOTAL FEE:", font=("Segoe UI", 12, "bold"), bg="#ffffff").pack(side="left")
-tk.Label(total_frame, text=f"{format_currency(amount)}", font=("Segoe UI", 12, "bold"), bg="#ffffff").pack(side="right")
-
-sep3 = ttk.Separator(frame, orient="horizontal")
-sep3.pack(fill="x", pady=8)
-
-txn_id = f"TXN-{datetime.now().strftime('%Y%m%d%H%M%S')}-{vid}"
-thank = tk.Label(frame, text="Thank you for parking with us!", font=("Segoe UI", 9), bg="#ffffff")
-thank.pack()
-tx = tk.Label(frame, text=f"Transaction ID: {txn_id}", font=("Segoe UI", 9), bg="#ffffff")
-tx.pack()
-
-btn = tk.Button(frame, text="Close", command=win.destroy, bg="#0b74d1", fg="white", width=12)
-btn.pack(pady=10)
-
+win = show_receipt_dialog(root, layout(receipt), title="ParkinUP - Sample Receipt")
 win.protocol("WM_DELETE_WINDOW", root.quit)
-# show window
-root.deiconify()
+win.bind("<Destroy>", lambda e: e.widget is win and root.quit())
 root.mainloop()
@@ -0,0 +1,420 @@
+"""Headless traffic simulator and load generator for capacity planning.
+
+Usage:
+    python simulate_traffic.py [--hours 24] [--arrivals poisson|rush] [--rate 60]
+                               [--dwell exp|lognormal|uniform|fixed] [--dwell-mean 90]
+                               [--slots 100] [--terminals 4] [--speed 0] [--seed 1]
+                               [--start 2025-01-06] [--db parking.db] [--json]
+                               [--policy nearest] [--layout slots.json]
+
+A day of traffic is generated up front: arrival times from a Poisson process
+(constant --rate cars/hour) or a rush-hour profile (morning and evening peaks
+scaled to --rate), each car with a dwell time drawn from the chosen
+distribution. The park/exit events are then driven through ParkingService by
+--terminals concurrent worker threads against a scratch copy of --db, so the
+real parking.db is never modified. Each event runs with a VirtualClock
+pinned to its simulated time (starting at midnight of --start), so entry and
+exit stamps and fees are those of the simulated day, and a month of traffic
+replays in seconds. --speed N paces events at N simulated seconds per real
+second; 0 runs them as fast as possible.
+
+Events go to the terminals in batches whose outcome cannot depend on which
+thread gets there first: a batch never holds more parks than there were
+free slots when it started, nor two events for one plate, and it finishes
+before the next one starts. So the same --seed, --start and --db give the
+same outcomes and revenue for any --terminals; on a nearly full lot the
+batches shrink to single events. (Which slot a car gets can still differ
+between runs with several terminals.)
+
+The report gives throughput, p50/p99 latency per operation, write-lock wait
+time and consistency checks on occupancy and revenue after the run. The
+service journals every event (as the GUI does) into the scratch folder, and
+the run also checks that replaying that journal gives the same database
+and that the occupancy time series is consistent with itself and the slots.
+"""
+import argparse
+import heapq
+import itertools
+import json
+import math
+import os
+import queue
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from allocation import POLICIES, apply_layout, load_layout
+from clock import VirtualClock
+from journal import Journal, seed_from_db, verify as verify_journal
+from metrics import percentile
+from occupancy_ts import verify as verify_occupancy
+from parking_service import NoSlotAvailable, ParkingError, ParkingService
+from utils import format_currency, init_db
+
+DB_PATH = os.path.join(os.path.dirname(__file__), "parking.db")
+
+# Relative arrival intensity per hour of day: peaks at 07-09 and 17-19
+RUSH_PROFILE = [0.2, 0.1, 0.1, 0.1, 0.2, 0.4, 0.9, 1.8, 2.0, 1.2, 0.8, 0.9,
+                1.1, 1.0, 0.8, 0.9, 1.3, 1.9, 1.7, 1.0, 0.7, 0.5, 0.4, 0.3]
+_RUSH_MEAN = sum(RUSH_PROFILE) / len(RUSH_PROFILE)
+
+PARK = "park"
+EXIT = "exit"
+
+
+# ---------- Traffic generation ----------
+def poisson_arrivals(rng: random.Random, rate_per_hour: float, hours: float) -> list[float]:
+    """Arrival times in simulated seconds for a homogeneous Poisson process."""
+    times, t, end = [], 0.0, hours * 3600.0
+    rate = rate_per_hour / 3600.0
+    while rate > 0:
+        t += rng.expovariate(rate)
+        if t >= end:
+            break
+        times.append(t)
+    return times
+
+
+def rush_arrivals(rng: random.Random, rate_per_hour: float, hours: float,
+                  profile: list[float] = RUSH_PROFILE) -> list[float]:
+    """Non-homogeneous Poisson arrivals following an hour-of-day profile (by thinning).
+
+    The profile is scaled so the daily average rate is rate_per_hour.
+    """
+    scale = rate_per_hour / _RUSH_MEAN
+    peak = max(profile) * scale
+    times = []
+    for t in poisson_arrivals(rng, peak, hours):
+        if rng.random() * peak < profile[int(t // 3600) % 24] * scale:
+            times.append(t)
+    return times
+
+
+def dwell_sampler(kind: str, mean_min: float, rng: random.Random):
+    """Return a function drawing dwell times in simulated seconds."""
+    mean_s = mean_min * 60.0
+    if kind == "exp":
+        return lambda: rng.expovariate(1.0 / mean_s)
+    if kind == "lognormal":
+        sigma = 0.75
+        mu = math.log(mean_s) - sigma * sigma / 2
+        return lambda: rng.lognormvariate(mu, sigma)
+    if kind == "uniform":
+        return lambda: rng.uniform(0.25 * mean_s, 1.75 * mean_s)
+    if kind == "fixed":
+        return lambda: mean_s
+    raise ValueError(f"unknown dwell distribution: {kind}")
+
+
+def build_schedule(arrivals: list[float], dwell, plate_prefix: str) -> list[tuple[float, int, str, str]]:
+    """Time-ordered (sim_time, seq, kind, plate) park and exit events."""
+    events = []
+    seq = itertools.count()
+    for i, t in enumerate(arrivals):
+        plate = f"{plate_prefix}{i:06d}"
+        events.append((t, next(seq), PARK, plate))
+        events.append((t + max(60.0, dwell()), next(seq), EXIT, plate))
+    heapq.heapify(events)
+    return [heapq.heappop(events) for _ in range(len(events))]
+
+
+def plate_prefix(db_path: str, seed: int) -> str:
+    """First seed-derived plate prefix not yet used in db_path (plates are unique across vehicles)."""
+    conn = sqlite3.connect(db_path)
+    try:
+        for n in itertools.count():
+            prefix = f"S{seed % 100:02d}{n:04d}"
+            if conn.execute("SELECT 1 FROM vehicles WHERE vehicle_number LIKE ? LIMIT 1",
+                            (prefix + "%",)).fetchone() is None:
+                return prefix
+    finally:
+        conn.close()
+
+
+def free_slots(db_path: str) -> int:
+    """Free slots a standard car can take: not accessible and not held for a booking."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM slots WHERE is_occupied = 0 AND slot_type != 'accessible' "
+                            "AND slot_id NOT IN (SELECT slot_id FROM reservations WHERE status = 'active')"
+                            ).fetchone()[0]
+    finally:
+        conn.close()
+
+
+# ---------- Scratch database ----------
+def make_scratch_db(source: str, slots: int, workdir: str) -> str:
+    """Copy source (if present) into workdir and make sure it has `slots` slots."""
+    path = os.path.join(workdir, "parking.db")
+    if os.path.exists(source):
+        src = sqlite3.connect(source)
+        dst = sqlite3.connect(path)
+        try:
+            src.backup(dst)
+        finally:
+            src.close()
+            dst.close()
+    init_db(path, total_slots=slots)
+    ParkingService(path).add_slots(slots)
+    return path
+
+
+def db_snapshot(db_path: str) -> dict:
+    conn = sqlite3.connect(db_path)
+    try:
+        cur = conn.cursor()
+        occupied = cur.execute("SELECT COALESCE(SUM(is_occupied), 0) FROM slots").fetchone()[0]
+        active = cur.execute("SELECT COUNT(*) FROM vehicles WHERE exit_time IS NULL").fetchone()[0]
+        double = cur.execute("""SELECT COUNT(*) FROM (SELECT slot_id FROM vehicles WHERE exit_time IS NULL
+                                GROUP BY slot_id HAVING COUNT(*) > 1)""").fetchone()[0]
+        orphan = cur.execute("""SELECT COUNT(*) FROM slots s WHERE s.is_occupied = 1 AND NOT EXISTS
+                                (SELECT 1 FROM vehicles v WHERE v.slot_id = s.slot_id AND v.exit_time IS NULL)""").fetchone()[0]
+        payments, revenue = cur.execute("SELECT COUNT(*), COALESCE(SUM(amount), 0) FROM payments").fetchone()
+    finally:
+        conn.close()
+    return {'occupied': occupied, 'active': active, 'double_booked': double, 'orphan_slots': orphan,
+            'payments': payments, 'revenue': revenue}
+
+
+# ---------- Terminals ----------
+class Terminal(threading.Thread):
+    """One gate terminal: takes events off the shared queue and runs them."""
+
+    def __init__(self, name: str, service: ParkingService, work: queue.Queue, sim):
+        super().__init__(name=name, daemon=True)
+        self.service = service
+        self.clock = service.clock
+        self.work = work
+        self.sim = sim
+
+    def run(self):
+        while True:
+            event = self.work.get()
+            if event is None:
+                return
+            try:
+                self.handle(event)
+            finally:
+                self.work.task_done()
+
+    def handle(self, event):
+        sim_time, _, kind, plate = event
+        # Its park ran in an earlier batch; skip cars that never got in
+        if kind == EXIT and plate not in self.sim.parked:
+            return
+        start = time.perf_counter()
+        outcome, result = "ok", None
+        try:
+            with self.clock.pinned(self.sim.start + timedelta(seconds=int(sim_time))):
+                result = self.service.park(plate, "Simulated") if kind == PARK else self.service.exit(plate)
+        except NoSlotAvailable:
+            outcome = "full"
+        except ParkingError:
+            outcome = "error"
+        except Exception as e:
+            # A bug, not a gate outcome: keep going so the run ends and the check fails
+            outcome = "exception"
+            self.sim.exceptions.append(f"{type(e).__name__}: {e}")
+        self.sim.record(kind, plate, outcome, time.perf_counter() - start, result)
+
+
+class TrafficSimulation:
+    def __init__(self, service: ParkingService, schedule, terminals: int, speed: float, start: datetime,
+                 free: int):
+        self.service = service
+        self.start = start
+        self.schedule = schedule
+        self.terminals = terminals
+        self.speed = speed
+        # Slots a simulated (standard) car could take; only changes between batches
+        self.free = free
+        self.parked: set[str] = set()
+        self.latencies: dict[str, list[float]] = {PARK: [], EXIT: []}
+        self.outcomes: dict[str, int] = {}
+        self.amounts: list[float] = []
+        self.exceptions: list[str] = []
+        self.peak_occupied = 0
+        self._occupied = 0
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, plate: str, outcome: str, seconds: float, result):
+        with self._lock:
+            self.latencies[kind].append(seconds * 1000.0)
+            key = f"{kind}_{outcome}"
+            self.outcomes[key] = self.outcomes.get(key, 0) + 1
+            if outcome == "ok" and kind == PARK:
+                self.parked.add(plate)
+                self.free -= 1
+                self._occupied += 1
+                self.peak_occupied = max(self.peak_occupied, self._occupied)
+            elif outcome == "ok":
+                self.parked.discard(plate)
+                self.free += 1
+                self._occupied -= 1
+                self.amounts.append(result['amount'])
+
+    def run(self) -> float:
+        work: queue.Queue = queue.Queue(maxsize=self.terminals * 4)
+        threads = [Terminal(f"terminal-{i + 1}", self.service, work, self) for i in range(self.terminals)]
+        for t in threads:
+            t.start()
+        start = time.perf_counter()
+        batch, plates, parks = [], set(), 0
+        for event in self.schedule:
+            kind, plate = event[2], event[3]
+            delay = event[0] / self.speed - (time.perf_counter() - start) if self.speed > 0 else 0
+            if batch and (delay > 0 or plate in plates or (kind == PARK and parks >= self.free)):
+                self._dispatch(batch, work)
+                batch, plates, parks = [], set(), 0
+            if delay > 0:
+                time.sleep(delay)
+            batch.append(event)
+            plates.add(plate)
+            parks += kind == PARK
+        self._dispatch(batch, work)
+        for _ in threads:
+            work.put(None)
+        for t in threads:
+            t.join()
+        return time.perf_counter() - start
+
+    @staticmethod
+    def _dispatch(batch: list, work: queue.Queue):
+        """Hand a batch to the terminals and wait until all of it has run."""
+        for event in batch:
+            work.put(event)
+        work.join()
+
+
+def check_consistency(before: dict, after: dict, sim: TrafficSimulation, occupancy: dict) -> dict:
+    """Named invariants that must hold after a run; each maps to True/False."""
+    parks = sim.outcomes.get("park_ok", 0)
+    exits = sim.outcomes.get("exit_ok", 0)
+    return {
+        'occupied_matches_active': after['occupied'] == after['active'],
+        'no_double_booked_slots': after['double_booked'] == 0,
+        'no_orphan_occupied_slots': after['orphan_slots'] == 0,
+        'active_matches_parks_minus_exits': after['active'] - before['active'] == parks - exits,
+        'payments_match_exits': after['payments'] - before['payments'] == exits,
+        'revenue_matches_receipts': round(after['revenue'] - before['revenue'], 2) == round(sum(sim.amounts), 2),
+        'no_unexpected_exceptions': not sim.exceptions,
+        'occupancy_series_consistent': (occupancy['broken_links'] == 0 and occupancy['rollup_mismatches'] == 0
+                                        and occupancy['latest'] == after['occupied']),
+    }
+
+
+def simulate(args) -> dict:
+    rng = random.Random(args.seed)
+    if args.arrivals == "rush":
+        arrivals = rush_arrivals(rng, args.rate, args.hours)
+    else:
+        arrivals = poisson_arrivals(rng, args.rate, args.hours)
+    dwell = dwell_sampler(args.dwell, args.dwell_mean, rng)
+
+    with tempfile.TemporaryDirectory(prefix="parkinup_sim_") as workdir:
+        db_path = make_scratch_db(args.db, args.slots, workdir)
+        if args.layout:
+            apply_layout(db_path, load_layout(args.layout))
+        schedule = build_schedule(arrivals, dwell, plate_prefix(db_path, args.seed))
+        start = datetime.strptime(args.start, "%Y-%m-%d")
+        journal = Journal(os.path.join(workdir, "journal"))
+        seed_from_db(journal, db_path)
+        # Each terminal thread keeps its own connection, as a gate terminal would
+        service = ParkingService(db_path, clock=VirtualClock(start), policy=args.policy, journal=journal,
+                                 reuse_connections=True)
+        before = db_snapshot(db_path)
+        sim = TrafficSimulation(service, schedule, max(1, args.terminals), args.speed, start, free_slots(db_path))
+        try:
+            elapsed = sim.run()
+        finally:
+            service.close()
+            journal.close()
+        after = db_snapshot(db_path)
+        journaled = verify_journal(journal.directory, db_path)
+        conn = sqlite3.connect(db_path)
+        try:
+            occupancy = verify_occupancy(conn)
+        finally:
+            conn.close()
+        lock = service.lock_stats()
+        lot_size = service.occupancy()['total']
+        if args.keep_db:
+            shutil.copyfile(db_path, args.keep_db)
+
+    ops = {}
+    for kind, samples in sim.latencies.items():
+        samples.sort()
+        ops[kind] = {'count': len(samples), 'p50_ms': round(percentile(samples, 50), 3),
+                     'p99_ms': round(percentile(samples, 99), 3),
+                     'max_ms': round(samples[-1], 3) if samples else 0.0}
+    total_ops = sum(op['count'] for op in ops.values())
+    checks = check_consistency(before, after, sim, occupancy)
+    checks['journal_matches_db'] = all(expected == actual for expected, actual in journaled.values())
+    return {
+        'config': {k: v for k, v in vars(args).items() if k not in ('json', 'keep_db')},
+        'arrivals': len(arrivals),
+        'elapsed_s': round(elapsed, 3),
+        'ops_per_s': round(total_ops / elapsed, 1) if elapsed > 0 else 0.0,
+        'ops': ops,
+        'outcomes': sim.outcomes,
+        'lot_size': lot_size,
+        'peak_occupied': sim.peak_occupied,
+        'revenue': round(sum(sim.amounts), 2),
+        'lock': lock,
+        'before': before,
+        'after': after,
+        'exceptions': sim.exceptions[:10],
+        'checks': checks,
+        'consistent': all(checks.values()),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate parking traffic against a scratch copy of the database.")
+    parser.add_argument("--hours", type=float, default=24.0, help="simulated hours of traffic")
+    parser.add_argument("--arrivals", choices=("poisson", "rush"), default="poisson")
+    parser.add_argument("--rate", type=float, default=60.0, help="mean arrivals per hour")
+    parser.add_argument("--dwell", choices=("exp", "lognormal", "uniform", "fixed"), default="lognormal")
+    parser.add_argument("--dwell-mean", type=float, default=90.0, help="mean dwell time in minutes")
+    parser.add_argument("--slots", type=int, default=100, help="lot size")
+    parser.add_argument("--terminals", type=int, default=4, help="concurrent gate terminals")
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="simulated seconds per real second (0 = as fast as possible)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--start", default="2025-01-06", help="simulated first day, YYYY-MM-DD")
+    parser.add_argument("--db", default=DB_PATH, help="database to copy as the starting state")
+    parser.add_argument("--policy", choices=tuple(POLICIES), help="slot allocation policy (see allocation.py)")
+    parser.add_argument("--layout", help="slot zones/levels/types JSON applied to the scratch database")
+    parser.add_argument("--keep-db", help="save the scratch database here after the run")
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    args = parser.parse_args(argv)
+
+    report = simulate(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0 if report['consistent'] else 1
+
+    print(f"{report['arrivals']} arrivals over {args.hours:g} h ({args.arrivals}, {args.dwell} dwell "
+          f"mean {args.dwell_mean:g} min), {args.slots} slots, {args.terminals} terminals")
+    print(f"Ran in {report['elapsed_s']} s => {report['ops_per_s']} ops/s; outcomes {report['outcomes']}; "
+          f"peak occupancy {report['peak_occupied']}/{report['lot_size']}; "
+          f"revenue {format_currency(report['revenue'])}")
+    for kind, op in report['ops'].items():
+        print(f"  {kind:<5} n={op['count']:<6} p50 {op['p50_ms']:>8} ms  p99 {op['p99_ms']:>8} ms  max {op['max_ms']:>8} ms")
+    lock = report['lock']
+    print(f"  lock  waits={lock['acquisitions']} total {lock['wait_total_ms']} ms  "
+          f"mean {lock['wait_mean_ms']} ms  max {lock['wait_max_ms']} ms")
+    for error in report['exceptions']:
+        print(f"  exception: {error}")
+    for name, ok in report['checks'].items():
+        print(f"  [{'ok' if ok else 'FAIL'}] {name}")
+    return 0 if report['consistent'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
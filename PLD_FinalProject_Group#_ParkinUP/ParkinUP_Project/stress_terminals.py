@@ -0,0 +1,274 @@
+"""Multiprocess stress test: N gate terminals parking and exiting on one database.
+
+Usage:
+    python stress_terminals.py [--terminals 8] [--ops 300] [--slots 40] [--exit-share 0.45]
+                               [--retry-share 0.1] [--busy-timeout 5] [--seed 1] [--db parking.db]
+                               [--keep-db FILE] [--json]
+
+Each terminal is a separate process with its own ParkingService (and so its
+own, soon stale, in-memory allocator) on a scratch copy of --db. All start
+together and run --ops operations as fast as they can: parks of new plates,
+and exits of plates picked from the newest active sessions, so terminals
+regularly race to exit the same car or take the same slot. Every call
+carries a request ID, and --retry-share of the successful ones are sent
+again as a gate would after a timeout; those must come back as replays of
+the first result. All terminals append to one shared event journal. A small
+--busy-timeout (e.g. 0.001) makes lock waits give up early to exercise the
+retry path.
+
+Afterwards the database is checked: no slot was ever held by two sessions
+at once, every exit has exactly one payment, counts and revenue match what
+the terminals reported, every retry was replayed rather than run again,
+no terminal saw an unexpected database error, and replaying the shared
+journal rebuilds the same database.
+The run exits non-zero if any check fails.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from journal import Journal, seed_from_db, verify as verify_journal
+from metrics import percentile
+from parking_service import (BUSY_TIMEOUT_S, AlreadyParked, DatabaseBusy, NoSlotAvailable, NotParked,
+                             ParkingService)
+from simulate_traffic import DB_PATH, db_snapshot, make_scratch_db
+from utils import format_currency
+
+PARK = "park"
+EXIT = "exit"
+
+
+def terminal(index: int, db_path: str, journal_dir: str, ops: int, exit_share: float, retry_share: float,
+             busy_timeout: float, seed: int, start, results):
+    """One terminal process: run `ops` random parks/exits, then report what it did."""
+    report = {'terminal': index, 'outcomes': {}, 'latencies': {PARK: [], EXIT: []}, 'parked': 0, 'exited': 0,
+              'amount': 0.0, 'replay_mismatches': 0, 'lock': {}, 'errors': []}
+    try:
+        report.update(run_terminal(index, db_path, journal_dir, ops, exit_share, retry_share, busy_timeout, seed,
+                                   start))
+    except Exception as e:
+        # Don't leave the other terminals waiting at the start line
+        start.abort()
+        report['errors'].append(f"{type(e).__name__}: {e}")
+    results.put(report)
+
+
+def run_terminal(index: int, db_path: str, journal_dir: str, ops: int, exit_share: float, retry_share: float,
+                 busy_timeout: float, seed: int, start) -> dict:
+    # Loading the indexes is not under test, so only the terminal's own work gets the short timeout
+    service = ParkingService(db_path, journal=Journal(journal_dir))
+    service.busy_timeout = busy_timeout
+    rng = random.Random(seed * 1000 + index)
+    outcomes = Counter()
+    latencies = {PARK: [], EXIT: []}
+    parked, exited, amount, mismatches = 0, 0, 0.0, 0
+    errors = []
+    # Everyone has loaded its indexes before anyone writes
+    start.wait()
+    for n in range(ops):
+        kind = EXIT if rng.random() < exit_share else PARK
+        if kind == EXIT:
+            try:
+                active = service.active_sessions(limit=10)
+            except sqlite3.OperationalError:
+                # Only reachable with a tiny --busy-timeout; picking a car is not under test
+                outcomes['pick_busy'] += 1
+                continue
+            if not active:
+                kind = PARK
+        request_id = f"T{index:02d}-{seed}-{n:05d}"
+        if kind == PARK:
+            call = lambda: service.park(request_id, request_id=request_id)  # noqa: E731
+        else:
+            plate = rng.choice(active)[0]
+            call = lambda: service.exit(plate, request_id=request_id)  # noqa: E731
+        t0 = time.perf_counter()
+        try:
+            result = call()
+            if kind == PARK:
+                parked += 1
+            else:
+                amount += result['amount']
+                exited += 1
+            outcomes[kind] += 1
+            if rng.random() < retry_share:
+                # The gate never saw the answer and sends the same request again
+                again = call()
+                outcomes['retried'] += 1
+                if not again.get('replayed') or dict(again, replayed=False) != dict(result, replayed=False):
+                    mismatches += 1
+        except NoSlotAvailable:
+            outcomes['full'] += 1
+        except NotParked:
+            # Another terminal exited it first
+            outcomes['lost_exit_race'] += 1
+        except AlreadyParked:
+            outcomes['already_parked'] += 1
+        except DatabaseBusy:
+            outcomes['busy'] += 1
+        except sqlite3.Error as e:
+            outcomes['error'] += 1
+            errors.append(f"{type(e).__name__}: {e}")
+        latencies[kind].append((time.perf_counter() - t0) * 1000.0)
+    service.journal.close()
+    return {'outcomes': dict(outcomes), 'latencies': latencies, 'parked': parked, 'exited': exited,
+            'amount': round(amount, 2), 'replay_mismatches': mismatches, 'lock': service.lock_stats(),
+            'errors': errors[:5]}
+
+
+def high_water(db_path: str) -> tuple[int, int]:
+    """Largest vehicle_id and payment_id, so checks only look at rows made by the run."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return (conn.execute("SELECT COALESCE(MAX(vehicle_id), 0) FROM vehicles").fetchone()[0],
+                conn.execute("SELECT COALESCE(MAX(payment_id), 0) FROM payments").fetchone()[0])
+    finally:
+        conn.close()
+
+
+def check_invariants(db_path: str, journal_dir: str, vehicle_mark: int, payment_mark: int,
+                     reports: list[dict]) -> dict:
+    after = db_snapshot(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        cur = conn.cursor()
+        # Sessions on one slot, in creation order: each must have ended before the next began
+        overlaps = cur.execute("""SELECT COUNT(*) FROM vehicles a JOIN vehicles b
+                                  ON a.slot_id = b.slot_id AND a.vehicle_id < b.vehicle_id
+                                  WHERE b.vehicle_id > ? AND (a.exit_time IS NULL OR a.exit_time > b.entry_time)""",
+                               (vehicle_mark,)).fetchone()[0]
+        sessions, closed = cur.execute("SELECT COUNT(*), COUNT(exit_time) FROM vehicles WHERE vehicle_id > ?",
+                                       (vehicle_mark,)).fetchone()
+        unpaid_or_twice = cur.execute("""SELECT COUNT(*) FROM vehicles v WHERE v.vehicle_id > ?
+                                         AND v.exit_time IS NOT NULL
+                                         AND (SELECT COUNT(*) FROM payments p WHERE p.vehicle_id = v.vehicle_id) != 1""",
+                                      (vehicle_mark,)).fetchone()[0]
+        payments, revenue = cur.execute("SELECT COUNT(*), COALESCE(SUM(amount), 0) FROM payments WHERE payment_id > ?",
+                                        (payment_mark,)).fetchone()
+    finally:
+        conn.close()
+    journaled = verify_journal(journal_dir, db_path)
+    parked = sum(r['parked'] for r in reports)
+    exited = sum(r['exited'] for r in reports)
+    return {
+        'no_slot_double_claimed': overlaps == 0 and after['double_booked'] == 0,
+        'occupied_matches_active': after['occupied'] == after['active'] and after['orphan_slots'] == 0,
+        'sessions_match_parks': sessions == parked,
+        'one_payment_per_exit': unpaid_or_twice == 0 and payments == closed == exited,
+        'revenue_matches_receipts': round(revenue, 2) == round(sum(r['amount'] for r in reports), 2),
+        'retries_replayed': not any(r['replay_mismatches'] for r in reports),
+        'no_database_errors': not any(r['errors'] for r in reports),
+        'journal_matches_db': all(expected == actual for expected, actual in journaled.values()),
+    }
+
+
+def stress(args) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory(prefix="parkinup_stress_") as workdir:
+        db_path = make_scratch_db(args.db, args.slots, workdir)
+        vehicle_mark, payment_mark = high_water(db_path)
+        journal_dir = os.path.join(workdir, "journal")
+        journal = Journal(journal_dir)
+        try:
+            seed_from_db(journal, db_path)
+        finally:
+            journal.close()
+        start, results = ctx.Barrier(args.terminals + 1), ctx.Queue()
+        procs = [ctx.Process(target=terminal, args=(i, db_path, journal_dir, args.ops, args.exit_share,
+                                                    args.retry_share, args.busy_timeout, args.seed, start, results))
+                 for i in range(args.terminals)]
+        for p in procs:
+            p.start()
+        try:
+            start.wait()
+        except threading.BrokenBarrierError:
+            pass
+        t0 = time.perf_counter()
+        reports = [results.get() for _ in procs]
+        elapsed = time.perf_counter() - t0
+        for p in procs:
+            p.join()
+        checks = check_invariants(db_path, journal_dir, vehicle_mark, payment_mark, reports)
+        if args.keep_db:
+            dst = sqlite3.connect(args.keep_db)
+            src = sqlite3.connect(db_path)
+            try:
+                src.backup(dst)
+            finally:
+                src.close()
+                dst.close()
+
+    outcomes = Counter()
+    lock = Counter()
+    ops = {}
+    for r in reports:
+        outcomes.update(r['outcomes'])
+        lock.update({k: r['lock'].get(k, 0) for k in ('busy_retries', 'busy_failures', 'slot_conflicts')})
+    for kind in (PARK, EXIT):
+        samples = sorted(x for r in reports for x in r['latencies'][kind])
+        ops[kind] = {'count': len(samples), 'p50_ms': round(percentile(samples, 50), 3),
+                     'p99_ms': round(percentile(samples, 99), 3),
+                     'max_ms': round(samples[-1], 3) if samples else 0.0}
+    total = sum(op['count'] for op in ops.values())
+    return {
+        'config': {k: v for k, v in vars(args).items() if k not in ('json', 'keep_db')},
+        'elapsed_s': round(elapsed, 3),
+        'ops_per_s': round(total / elapsed, 1) if elapsed > 0 else 0.0,
+        'ops': ops,
+        'outcomes': dict(outcomes),
+        'conflicts': dict(lock),
+        'revenue': round(sum(r['amount'] for r in reports), 2),
+        'errors': [e for r in reports for e in r['errors']][:10],
+        'checks': checks,
+        'consistent': all(checks.values()),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run N terminal processes against one scratch database "
+                                                 "and check the invariants afterwards.")
+    parser.add_argument("--terminals", type=int, default=8, help="concurrent terminal processes")
+    parser.add_argument("--ops", type=int, default=300, help="operations per terminal")
+    parser.add_argument("--slots", type=int, default=40, help="lot size")
+    parser.add_argument("--exit-share", type=float, default=0.45, help="fraction of operations that are exits")
+    parser.add_argument("--retry-share", type=float, default=0.1,
+                        help="fraction of successful operations resent with the same request ID")
+    parser.add_argument("--busy-timeout", type=float, default=BUSY_TIMEOUT_S,
+                        help="seconds a connection waits for a locked database before retrying")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--db", default=DB_PATH, help="database to copy as the starting state")
+    parser.add_argument("--keep-db", help="save the scratch database here after the run")
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    args = parser.parse_args(argv)
+
+    report = stress(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0 if report['consistent'] else 1
+
+    print(f"{args.terminals} terminals x {args.ops} ops on {args.slots} slots "
+          f"(busy timeout {args.busy_timeout:g} s)")
+    print(f"Ran in {report['elapsed_s']} s => {report['ops_per_s']} ops/s; outcomes {report['outcomes']}; "
+          f"revenue {format_currency(report['revenue'])}")
+    for kind, op in report['ops'].items():
+        print(f"  {kind:<5} n={op['count']:<6} p50 {op['p50_ms']:>8} ms  p99 {op['p99_ms']:>8} ms  max {op['max_ms']:>8} ms")
+    conflicts = report['conflicts']
+    print(f"  busy retries={conflicts.get('busy_retries', 0)} gave up={conflicts.get('busy_failures', 0)}  "
+          f"slot conflicts={conflicts.get('slot_conflicts', 0)}")
+    for error in report['errors']:
+        print(f"  error: {error}")
+    for name, ok in report['checks'].items():
+        print(f"  [{'ok' if ok else 'FAIL'}] {name}")
+    return 0 if report['consistent'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,6 +2,8 @@ import os
 import tkinter as tk
 from tkinter import messagebox, font
 
+from metrics import metrics
+
 try:
     from PIL import Image, ImageTk
     PIL_AVAILABLE_UI = True
@@ -44,6 +46,93 @@ FONTS = {
     'label': ('Segoe UI', 11),
 }
 
+_HERE = os.path.dirname(__file__)
+# The logo lives in ../docs in the repo, docs/ when the project folder is copied on its own
+LOGO_PATHS = (os.path.join(_HERE, "..", "docs", "logo.png"), os.path.join(_HERE, "docs", "logo.png"))
+
+_photo_cache: dict = {}
+
+
+def load_photo(paths, size=None):
+    """PhotoImage for the first existing file in paths, resized to size, loaded once.
+
+    The cache also keeps the PhotoImage referenced, so labels showing it never
+    lose their image to garbage collection.
+    """
+    if isinstance(paths, str):
+        paths = (paths,)
+    key = (tuple(paths), size)
+    photo = _photo_cache.get(key)
+    if photo is None:
+        path = next((p for p in paths if os.path.exists(p)), paths[-1])
+        img = Image.open(path)
+        if size is not None:
+            img = img.resize(size, Image.Resampling.LANCZOS)
+        photo = _photo_cache[key] = ImageTk.PhotoImage(img)
+    return photo
+
+
+class PageManager:
+    """Builds each page once into its own frame and raises it on navigation.
+
+    Pages are stacked in the same place inside root; show() raises the
+    requested one and calls its on_show hook (refresh data-bound widgets,
+    start timers) after calling the previous page's on_hide. history keeps
+    the order pages were shown in for back().
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._builders: dict = {}
+        self._frames: dict = {}
+        self.current = None
+        self.history: list[str] = []
+
+    def register(self, name, build, on_show=None, on_hide=None):
+        """build(frame) fills the page's frame; it runs on the first show() only."""
+        self._builders[name] = (build, on_show, on_hide)
+
+    def frame(self, name):
+        frame = self._frames.get(name)
+        if frame is None:
+            build = self._builders[name][0]
+            with metrics.timer(f"ui.page.build.{name}"):
+                frame = tk.Frame(self.root)
+                frame.place(relx=0, rely=0, relwidth=1, relheight=1)
+                build(frame)
+            self._frames[name] = frame
+        return frame
+
+    def show(self, name):
+        with metrics.timer(f"ui.page.show.{name}"):
+            if self.current is not None and self.current != name:
+                on_hide = self._builders[self.current][2]
+                if on_hide:
+                    on_hide()
+            frame = self.frame(name)
+            frame.tkraise()
+            frame.focus_set()
+            self.current = name
+            if not self.history or self.history[-1] != name:
+                self.history.append(name)
+            on_show = self._builders[name][1]
+            if on_show:
+                on_show()
+        return frame
+
+    def back(self):
+        if len(self.history) > 1:
+            self.history.pop()
+            self.show(self.history.pop())
+
+    def invalidate(self, name):
+        """Drop a built page so the next show() rebuilds it."""
+        frame = self._frames.pop(name, None)
+        if frame is not None:
+            frame.destroy()
+        if self.current == name:
+            self.current = None
+
 def create_homepage(root, on_start_now, on_learn_more):
     """Create the modern React-style homepage."""
     # Clear any existing widgets
@@ -68,15 +157,8 @@ def create_homepage(root, on_start_now, on_learn_more):
 
     if PIL_AVAILABLE_UI:
         try:
-            logo_path = os.path.join(os.path.dirname(__file__), "..", "docs", "logo.png")
-            if not os.path.exists(logo_path):
-                 # Try another common location just in case
-                 logo_path = os.path.join(os.path.dirname(__file__), "docs", "logo.png")
-            
-            logo_img = Image.open(logo_path)
-            # Adjust size to fit in the 100px height frame with some padding
-            logo_img = logo_img.resize((210, 80), Image.Resampling.LANCZOS)
-            logo_photo = ImageTk.PhotoImage(logo_img)
+            # Sized to fit in the 100px height frame with some padding
+            logo_photo = load_photo(LOGO_PATHS, (210, 80))
             logo_label = tk.Label(logo_frame, image=logo_photo, bg=COLORS['white'])
             logo_label.image = logo_photo  # Keep a reference
             logo_label.pack()
@@ -276,13 +358,7 @@ def create_login_page(root, on_login, on_back):
 
     if PIL_AVAILABLE_UI:
         try:
-            logo_path = os.path.join(os.path.dirname(__file__), "..", "docs", "logo.png")
-            if not os.path.exists(logo_path):
-                 logo_path = os.path.join(os.path.dirname(__file__), "docs", "logo.png")
-            
-            logo_img = Image.open(logo_path)
-            logo_img = logo_img.resize((210, 80), Image.Resampling.LANCZOS)
-            logo_photo = ImageTk.PhotoImage(logo_img)
+            logo_photo = load_photo(LOGO_PATHS, (210, 80))
             logo_label = tk.Label(logo_frame, image=logo_photo, bg=COLORS['white'])
             logo_label.image = logo_photo  # Keep a reference
             logo_label.pack()
@@ -491,3 +567,42 @@ def show_parking_slots_overview(parent, slots_data):
     close_btn.pack(side="right")
     close_btn.bind("<Enter>", lambda e, b=close_btn: b.config(bg=COLORS['gray_700']))
     close_btn.bind("<Leave>", lambda e, b=close_btn: b.config(bg=COLORS['gray_900']))
+
+
+def show_receipt_dialog(parent, lines, logo=None, actions=(), title="ParkinUP - Receipt"):
+    """Show receipt lines from receipts.layout() in one monospace Text widget.
+
+    logo, if given, replaces the 'title' line; actions are (label, command)
+    buttons shown next to Close.
+    """
+    win = tk.Toplevel(parent)
+    win.title(title)
+    win.resizable(False, False)
+    win.configure(bg=COLORS['white'])
+
+    text = tk.Text(win, font=("Courier", 10), bg=COLORS['white'], relief='flat', bd=0,
+                   width=max(len(t) for _, t in lines), height=len(lines) + (3 if logo else 0),
+                   padx=18, pady=12, cursor="arrow")
+    text.tag_configure("title", font=('Segoe UI', 18, 'bold'), justify="center")
+    text.tag_configure("center", justify="center")
+    text.tag_configure("total", font=("Courier", 11, 'bold'))
+    text.tag_configure("rule", foreground=COLORS['gray_500'])
+    for kind, line in lines:
+        if kind == "title" and logo is not None:
+            text.image_create("end", image=logo)
+            text.insert("end", "\n")
+            text.tag_add("center", "end-2l", "end-1l")
+        else:
+            text.insert("end", (line.strip() if kind in ("title", "center") else line) + "\n", kind)
+    text.config(state='disabled')
+    text.pack(fill="both", expand=True)
+    text.image = logo  # Keep a reference
+
+    buttons = tk.Frame(win, bg=COLORS['white'])
+    buttons.pack(pady=(0, 12))
+    for label, command in actions:
+        tk.Button(buttons, text=label, command=command, bg=COLORS['white'], fg=COLORS['gray_900'],
+                  font=('Segoe UI', 10), relief='solid', bd=1, width=10).pack(side="left", padx=4)
+    tk.Button(buttons, text="Close", command=win.destroy, bg=COLORS['blue_600'], fg="white", width=12,
+              font=('Segoe UI', 10, 'bold'), relief='flat', bd=0).pack(side="left", padx=4)
+    return win
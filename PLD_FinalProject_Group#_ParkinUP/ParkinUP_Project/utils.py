@@ -1,74 +1,172 @@
 import os
 import sqlite3
 from datetime import datetime
+from functools import lru_cache
 
-# Optional OCR lib
-pytesseract = None
-try:
-    import pytesseract
-except ImportError:
-    pass
+from clock import get_clock
+from metrics import metrics
+from optional_libs import load
 
-PIL_Image = None
-try:
-    from PIL import Image
-    PIL_Image = Image
-except ImportError:
-    pass
+
+# Schema migrations, applied in order; PRAGMA user_version records the last one
+# applied so an up-to-date database is checked with a single pragma read.
+SCHEMA_MIGRATIONS = [
+    (1, [
+        """CREATE TABLE IF NOT EXISTS slots (
+            slot_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            slot_number TEXT UNIQUE NOT NULL,
+            is_occupied INTEGER DEFAULT 0
+        );""",
+        """CREATE TABLE IF NOT EXISTS vehicles (
+            vehicle_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            owner_name TEXT,
+            vehicle_number TEXT UNIQUE,
+            slot_id INTEGER,
+            entry_time TEXT,
+            exit_time TEXT,
+            FOREIGN KEY(slot_id) REFERENCES slots(slot_id)
+        );""",
+        """CREATE TABLE IF NOT EXISTS payments (
+            payment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            vehicle_id INTEGER,
+            amount REAL,
+            payment_time TEXT,
+            FOREIGN KEY(vehicle_id) REFERENCES vehicles(vehicle_id)
+        );""",
+    ]),
+    # Occupancy time series (see occupancy_ts.py)
+    (2, [
+        """CREATE TABLE IF NOT EXISTS occupancy_events (
+            event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ts INTEGER NOT NULL,
+            delta INTEGER NOT NULL,
+            occupied INTEGER NOT NULL
+        );""",
+        "CREATE INDEX IF NOT EXISTS idx_occupancy_events_ts ON occupancy_events (ts);",
+        """CREATE TABLE IF NOT EXISTS occupancy_rollup (
+            resolution INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            open_occ INTEGER NOT NULL,
+            min_occ INTEGER NOT NULL,
+            max_occ INTEGER NOT NULL,
+            close_occ INTEGER NOT NULL,
+            occ_seconds INTEGER NOT NULL,
+            last_ts INTEGER NOT NULL,
+            events INTEGER NOT NULL,
+            PRIMARY KEY (resolution, bucket)
+        ) WITHOUT ROWID;""",
+    ]),
+    # Slot reservations (see reservations.py); the partial indexes cover only
+    # bookings that can still conflict
+    (3, [
+        """CREATE TABLE IF NOT EXISTS reservations (
+            reservation_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            slot_id INTEGER NOT NULL,
+            plate TEXT NOT NULL,
+            start_time TEXT NOT NULL,
+            end_time TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'active',
+            vehicle_id INTEGER,
+            FOREIGN KEY(slot_id) REFERENCES slots(slot_id)
+        );""",
+        """CREATE INDEX IF NOT EXISTS idx_reservations_slot_start
+            ON reservations (slot_id, start_time) WHERE status = 'active';""",
+        """CREATE INDEX IF NOT EXISTS idx_reservations_start
+            ON reservations (start_time) WHERE status = 'active';""",
+    ]),
+    # Slot attributes for the allocation policies (see allocation.py)
+    (4, [
+        "ALTER TABLE slots ADD COLUMN zone TEXT NOT NULL DEFAULT 'A';",
+        "ALTER TABLE slots ADD COLUMN level INTEGER NOT NULL DEFAULT 1;",
+        "ALTER TABLE slots ADD COLUMN slot_type TEXT NOT NULL DEFAULT 'standard';",
+        "ALTER TABLE slots ADD COLUMN distance REAL NOT NULL DEFAULT 0;",
+    ]),
+    # Results of park/exit calls made with a client request ID, so a retried
+    # call is answered from here instead of running twice (see ParkingService)
+    (5, [
+        """CREATE TABLE IF NOT EXISTS request_log (
+            request_id TEXT PRIMARY KEY,
+            operation TEXT NOT NULL,
+            plate TEXT NOT NULL,
+            result TEXT NOT NULL,
+            created INTEGER NOT NULL
+        ) WITHOUT ROWID;""",
+        "CREATE INDEX IF NOT EXISTS idx_request_log_created ON request_log (created);",
+    ]),
+    # Park looks up the arriving plate's booking in the database, since
+    # another terminal may have made it
+    (6, [
+        """CREATE INDEX IF NOT EXISTS idx_reservations_plate
+            ON reservations (plate, start_time) WHERE status = 'active';""",
+    ]),
+]
+SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
 
 
 def init_db(db_path: str, total_slots: int = 20):
-    """Ensure DB tables exist and seed a default number of slots if none present."""
+    """Ensure DB tables exist and seed a default number of slots if none present.
+
+    Migrations newer than the database's user_version are applied once; an
+    up-to-date database costs one pragma read and one slot lookup. The
+    database is switched to WAL so terminals reading it are never blocked by
+    another terminal's write (the setting is stored in the file; all
+    terminals must be on the same host).
+    """
     conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS slots (
-        slot_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        slot_number TEXT UNIQUE NOT NULL,
-        is_occupied INTEGER DEFAULT 0
-    );""")
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS vehicles (
-        vehicle_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        owner_name TEXT,
-        vehicle_number TEXT UNIQUE,
-        slot_id INTEGER,
-        entry_time TEXT,
-        exit_time TEXT,
-        FOREIGN KEY(slot_id) REFERENCES slots(slot_id)
-    );""")
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS payments (
-        payment_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        vehicle_id INTEGER,
-        amount REAL,
-        payment_time TEXT,
-        FOREIGN KEY(vehicle_id) REFERENCES vehicles(vehicle_id)
-    );""")
-    # Seed slots if none exist
-    cur.execute("SELECT COUNT(*) FROM slots")
-    count = cur.fetchone()[0] or 0
-    if count == 0 and total_slots > 0:
-        for i in range(1, total_slots + 1):
-            slot_name = f"Slot-{i}"
-            cur.execute("INSERT OR IGNORE INTO slots (slot_number, is_occupied) VALUES (?, 0)", (slot_name,))
-    conn.commit()
-    conn.close()
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        cur = conn.cursor()
+        version = cur.execute("PRAGMA user_version").fetchone()[0]
+        for target, statements in SCHEMA_MIGRATIONS:
+            if target > version:
+                for sql in statements:
+                    cur.execute(sql)
+                cur.execute(f"PRAGMA user_version = {int(target)}")
+        # Seed slots if none exist
+        if total_slots > 0 and cur.execute("SELECT 1 FROM slots LIMIT 1").fetchone() is None:
+            cur.executemany("INSERT OR IGNORE INTO slots (slot_number, is_occupied) VALUES (?, 0)",
+                            ((f"Slot-{i}",) for i in range(1, total_slots + 1)))
+        conn.commit()
+    finally:
+        conn.close()
 
 
 def calculate_fee(entry_time_str: str, exit_time_str: str | None = None, rate_per_min: float = 10/60):
-    """Return (minutes, amount). If exit_time_str is None uses now."""
+    """Return (minutes, amount). If exit_time_str is None uses the current clock time."""
     entry_dt = datetime.strptime(entry_time_str, "%Y-%m-%d %H:%M:%S")
     if exit_time_str:
         exit_dt = datetime.strptime(exit_time_str, "%Y-%m-%d %H:%M:%S")
     else:
-        exit_dt = datetime.now()
+        exit_dt = get_clock().now()
     minutes = int((exit_dt - entry_dt).total_seconds() / 60)
     minutes = max(1, minutes)
     amount = round(minutes * rate_per_min, 2)
     return minutes, amount
 
 
+def format_duration(minutes: int) -> str:
+    """'45 min', '2 hr' or '2 hr 5 min'."""
+    if minutes >= 60:
+        hrs = minutes // 60
+        mins = minutes % 60
+        return f"{hrs} hr {mins} min" if mins else f"{hrs} hr"
+    return f"{minutes} min"
+
+
+def active_session_rows(sessions, now: datetime) -> list[tuple]:
+    """Dashboard table rows (plate, slot, time-in, duration, status) for active sessions.
+
+    `sessions` are (vehicle_number, slot_number, entry_time, owner_name) rows
+    as returned by ParkingService.active_sessions.
+    """
+    rows = []
+    for vehicle_number, slot_number, entry_time_str, _owner in sessions:
+        entry_time = datetime.strptime(entry_time_str, "%Y-%m-%d %H:%M:%S")
+        duration_minutes = int((now - entry_time).total_seconds() / 60)
+        rows.append((vehicle_number, slot_number, entry_time_str, format_duration(duration_minutes), "Parked"))
+    return rows
+
+
 def format_currency(amount: float, symbol: str = "P") -> str:
     return f"{symbol}{round(amount,2)}"
 
@@ -86,20 +184,88 @@ def parse_plate_from_filename(path: str) -> str:
     return os.path.splitext(name)[0]
 
 
+# Tesseract settings for a single cropped plate line
+PLATE_OCR_CONFIG = "--psm 7 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+
+
+def _match_plate(text: str) -> str | None:
+    """Return the first plate-like token (alphanumeric, contains a digit) in OCR text."""
+    import re
+    matches = re.findall(r'[A-Z0-9]{3,}', text.upper().replace('-', ''))
+    for match in matches:
+        if any(c.isdigit() for c in match):
+            return match
+    return None
+
+
+@lru_cache(maxsize=1)
+def tesseract_available() -> bool:
+    """True if pytesseract imports and the tesseract binary runs; checked once per process.
+    Without the binary every image_to_string call still saves the image to a temp PNG before failing."""
+    pytesseract = load("pytesseract")
+    if pytesseract is None:
+        return False
+    try:
+        pytesseract.get_tesseract_version()
+        return True
+    except Exception:
+        return False
+
+
+def ocr_plate_regions(image_path: str) -> str | None:
+    """Localize plate regions with OpenCV and OCR only those crops.
+    Returns None if the locator is unavailable or nothing plate-like was read."""
+    if not tesseract_available():
+        return None
+    import plate_locator
+    if not plate_locator.LOCATOR_AVAILABLE:
+        return None
+    return ocr_frame(plate_locator.load_image(image_path))
+
+
+def ocr_frame(image) -> str | None:
+    """OCR the plate regions of an in-memory BGR frame (e.g. from the camera).
+    Unlike ocr_stub there is no simulated fallback: returns None if no plate was read."""
+    if image is None or not tesseract_available():
+        return None
+    pytesseract = load("pytesseract")
+    import plate_locator
+    if not plate_locator.LOCATOR_AVAILABLE:
+        return None
+    with metrics.timer("ocr.frame"):
+        for roi in plate_locator.extract_plate_rois(image):
+            text = pytesseract.image_to_string(roi, config=PLATE_OCR_CONFIG)
+            plate = _match_plate(text)
+            if plate:
+                return plate
+    return None
+
+
+@metrics.timed("ocr.stub")
 def ocr_stub(image_path: str | None = None) -> str:
     """OCR using pytesseract if available, else simulated: if image_path provided, try to extract a token from filename.
+    Plate regions are localized first so tesseract only sees the cropped plates;
+    the whole image is OCR'd only when no candidate region reads as a plate.
     Otherwise return a deterministic simulated plate string.
     """
-    if pytesseract is not None and PIL_Image is not None and image_path:
+    use_ocr = bool(image_path) and tesseract_available()
+    if use_ocr:
+        try:
+            plate = ocr_plate_regions(image_path)
+            if plate:
+                return plate
+        except Exception:
+            pass
+    PIL_Image = load("PIL.Image") if use_ocr else None
+    if PIL_Image is not None:
         try:
+            pytesseract = load("pytesseract")
             img = PIL_Image.open(image_path)
             text = pytesseract.image_to_string(img)
             # Extract alphanumeric text that looks like a plate
-            import re
-            matches = re.findall(r'[A-Z0-9]{3,}', text.upper())
-            for match in matches:
-                if any(c.isdigit() for c in match):
-                    return match
+            plate = _match_plate(text)
+            if plate:
+                return plate
         except Exception:
             pass
     # Fallback to filename parsing or simulation
@@ -110,5 +276,5 @@ def ocr_stub(image_path: str | None = None) -> str:
         except Exception:
             pass
     # deterministic simulated plate using timestamp
-    ts = datetime.now().strftime("%H%M%S")
+    ts = get_clock().now().strftime("%H%M%S")
     return f"SIM{ts}"